@@ -0,0 +1,5 @@
+"""应用数据路径"""
+from pathlib import Path
+
+# 应用数据目录（索引、缓存等），与虚拟环境目录分开，避免被扫描到
+APP_DATA_DIR = Path.home() / '.venv_manager'
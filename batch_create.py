@@ -0,0 +1,199 @@
+"""按清单批量创建虚拟环境
+
+清单可以是 JSON、TOML 或 YAML 文件，例如 (TOML)::
+
+    [defaults]
+    python = "/usr/bin/python3.11"
+
+    [[envs]]
+    name = "ci/py311-django"
+    requirements = ["django>=4.2", "pytest"]
+
+    [[envs]]
+    name = "ci/py311-flask"
+    requirements_file = "flask-requirements.txt"
+
+多个环境并行创建（数量可配置）。依赖的写法与 requirements 文件相同，
+由 requirements_import 按各环境的解释器解析出完整的文件列表，下载到本地
+wheel 缓存（先写临时文件再改名）后离线安装；多个环境需要同一个文件时只下载一次。
+"""
+import json
+import shlex
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from create_pipeline import WHEEL_CACHE_DIR, SEED_PACKAGES, find_cached_wheel, download_to_cache
+from interpreter_probe import probe_interpreter, marker_environment
+from requirements_import import DownloadRegistry, RequirementsImporter, parse_requirement_lines
+
+# 清单中的单个环境: 名称（相对基础路径）, 解释器路径（None 表示当前解释器）,
+# 依赖行（requirements 文件语法）, 相对路径的基准目录（清单所在目录）
+ManifestEnv = namedtuple('ManifestEnv', 'name python requirements base_dir')
+
+# 单个环境的创建结果: 名称, 是否成功, 说明, 用时（秒）, 各阶段结果
+EnvResult = namedtuple('EnvResult', 'name ok message duration stages')
+
+
+def _parse_manifest_data(path, text):
+    suffix = path.suffix.lower()
+    if suffix == '.json':
+        return json.loads(text)
+    if suffix == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise Exception("读取 TOML 清单需要 Python 3.11+ 或安装 tomli")
+        return tomllib.loads(text)
+    if suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise Exception("读取 YAML 清单需要安装 PyYAML")
+        return yaml.safe_load(text)
+    raise Exception(f"不支持的清单格式: {path.suffix}（支持 .json / .toml / .yaml）")
+
+
+def load_manifest(path):
+    """读取清单文件
+
+    顶层可以直接是环境列表，也可以是包含 envs（或 venvs）和可选 defaults 的字典。
+    每个环境支持 name、python、requirements（列表）、requirements_file（相对清单文件）。
+
+    Returns:
+        list[ManifestEnv]
+    """
+    path = Path(path)
+    data = _parse_manifest_data(path, path.read_text(encoding='utf-8'))
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get('defaults') or {}
+        data = data.get('envs', data.get('venvs'))
+    if not isinstance(data, list):
+        raise Exception("清单格式错误: 需要环境列表（envs）")
+
+    envs = []
+    seen = set()
+    for entry in data:
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        entry = {**defaults, **entry}
+        name = str(entry.get('name') or '').strip()
+        if not name:
+            raise Exception("清单格式错误: 环境缺少 name")
+        if name in seen:
+            raise Exception(f"清单中环境名称重复: {name}")
+        seen.add(name)
+
+        requirements = entry.get('requirements') or []
+        if isinstance(requirements, str):
+            requirements = [requirements]
+        requirements = [str(r).strip() for r in requirements if str(r).strip()]
+        req_file = entry.get('requirements_file')
+        if req_file:
+            # 与 requirements 文件中的 -r 相同，由解析器处理嵌套、续行、哈希等写法
+            requirements.append(f"-r {shlex.quote(str(req_file))}")
+        parsed = parse_requirement_lines(requirements, path.parent, label=path.name)
+        if parsed.errors:
+            raise Exception(f"环境 {name} 的依赖有误:\n" + '\n'.join(parsed.errors))
+        envs.append(ManifestEnv(name, entry.get('python') or None, requirements, path.parent))
+    return envs
+
+
+class BatchCreator:
+    """并行创建清单中的虚拟环境
+
+    Args:
+        venv_manager: VenvManager 实例
+        envs: [ManifestEnv]
+        max_parallel: 同时创建的环境数量
+        upgrade_pip: 是否升级预装的 pip、setuptools、wheel
+        symlinks: 可选，True 使用符号链接，False 复制解释器
+        wheel_dir: 共享的 wheel 缓存目录
+        on_progress: 可选回调 on_progress(环境名称, 百分比, 信息)，在工作线程中调用
+        is_cancelled: 可选回调，返回 True 时不再开始新的环境
+    """
+
+    def __init__(self, venv_manager, envs, max_parallel=4, upgrade_pip=False, symlinks=None,
+                 wheel_dir=WHEEL_CACHE_DIR, on_progress=None, is_cancelled=None):
+        self.venv_manager = venv_manager
+        self.envs = list(envs)
+        self.max_parallel = max(1, max_parallel)
+        self.upgrade_pip = upgrade_pip
+        self.symlinks = symlinks
+        self.wheel_dir = Path(wheel_dir)
+        self.on_progress = on_progress or (lambda name, value, message: None)
+        self.is_cancelled = is_cancelled or (lambda: False)
+
+        # 各环境共享的下载登记，同一个文件只下载一次
+        self._registry = DownloadRegistry()
+
+    def _prefetch_seed_wheels(self):
+        """缓存中没有 pip 时先下载一次预装包，所有环境都可以离线安装 pip"""
+        if find_cached_wheel('pip', self.wheel_dir) is not None:
+            return
+        try:
+            download_to_cache(sys.executable, ['--only-binary=:all:', *SEED_PACKAGES], self.wheel_dir)
+        except Exception:
+            # 下载失败时每个环境各自退回 ensurepip
+            pass
+
+    def _install_step(self, env):
+        """生成安装依赖的后续步骤"""
+        def install(env_python):
+            # 环境标记按新环境的解释器求值
+            info = probe_interpreter(env_python)
+            parsed = parse_requirement_lines(env.requirements, env.base_dir, marker_environment(info))
+            if not parsed.requirements:
+                return "没有适用于该解释器的依赖"
+            importer = RequirementsImporter(
+                str(env_python), parsed, self.wheel_dir, registry=self._registry,
+                progress=lambda value, message: self.on_progress(env.name, 70 + value // 4, message))
+            ok, message = importer.run()
+            if not ok:
+                raise Exception(message)
+            return message
+        return install
+
+    def _create_one(self, env):
+        start = time.perf_counter()
+        if self.is_cancelled():
+            return EnvResult(env.name, False, "已取消", 0.0, [])
+        post_steps = [('requirements', '安装依赖', self._install_step(env))] if env.requirements else []
+        try:
+            stages = self.venv_manager.create_venv(
+                env.name,
+                python_path=env.python,
+                upgrade_pip=self.upgrade_pip,
+                symlinks=self.symlinks,
+                post_steps=post_steps,
+                progress=lambda value, message: self.on_progress(env.name, value, message)
+            )
+        except Exception as e:
+            self.on_progress(env.name, 100, "失败")
+            return EnvResult(env.name, False, str(e), time.perf_counter() - start, [])
+
+        failed = [s for s in stages if not s.ok and s.name == 'requirements']
+        message = failed[0].message if failed else "创建成功"
+        self.on_progress(env.name, 100, "失败" if failed else "完成")
+        return EnvResult(env.name, not failed, message, time.perf_counter() - start, stages)
+
+    def run(self):
+        """创建全部环境，返回与清单顺序一致的 [EnvResult]"""
+        self._prefetch_seed_wheels()
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(self.envs) or 1)) as executor:
+            return list(executor.map(self._create_one, self.envs))
+
+
+def format_results(results):
+    """格式化批量创建结果"""
+    ok = sum(1 for r in results if r.ok)
+    lines = [f"成功 {ok} 个，失败 {len(results) - ok} 个"]
+    for r in results:
+        lines.append(f"{'✓' if r.ok else '✗'} {r.name} ({r.duration:.1f} 秒): {r.message}")
+    return '\n'.join(lines)
@@ -0,0 +1,160 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+                           QLineEdit, QMessageBox, QTableWidget, QTableWidgetItem,
+                           QHeaderView, QAbstractItemView, QFileDialog, QSpinBox)
+from PyQt5.QtCore import Qt
+from components import ProgressWidget
+from batch_create import load_manifest
+from requirements_import import parse_requirement_lines
+from workers import VenvWorker
+
+
+class BatchCreateDialog(QDialog):
+    """按清单批量创建虚拟环境"""
+
+    def __init__(self, venv_manager, config, parent=None):
+        super().__init__(parent)
+        self.venv_manager = venv_manager
+        self.config = config
+        self.envs = []
+        self.rows = {}  # {环境名称: 表格行}
+        self.worker = None
+        self.created = False
+        # 移除帮助按钮
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.init_ui()
+
+    def init_ui(self):
+        self.setWindowTitle('批量创建虚拟环境')
+        self.setGeometry(320, 320, 760, 460)
+
+        layout = QVBoxLayout(self)
+
+        # 清单文件选择
+        file_layout = QHBoxLayout()
+        file_layout.addWidget(QLabel('清单:'))
+        self.manifest_path = QLineEdit()
+        self.manifest_path.setReadOnly(True)
+        self.manifest_path.setPlaceholderText('选择 JSON / TOML / YAML 清单文件')
+        file_layout.addWidget(self.manifest_path)
+        browse_btn = QPushButton('浏览...')
+        browse_btn.clicked.connect(self.choose_manifest)
+        file_layout.addWidget(browse_btn)
+        layout.addLayout(file_layout)
+
+        # 环境列表
+        self.env_table = QTableWidget(0, 4)
+        self.env_table.setHorizontalHeaderLabels(['名称', '解释器', '依赖数', '状态'])
+        self.env_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.env_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.env_table.setAlternatingRowColors(True)
+        self.env_table.verticalHeader().setVisible(False)
+        self.env_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        layout.addWidget(self.env_table)
+
+        # 并行数和按钮
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(QLabel('并行数:'))
+        self.parallel = QSpinBox()
+        self.parallel.setRange(1, 32)
+        self.parallel.setValue(self.config.get('batch_parallel'))
+        btn_layout.addWidget(self.parallel)
+        btn_layout.addStretch()
+
+        self.start_btn = QPushButton('开始创建')
+        self.start_btn.setEnabled(False)
+        self.start_btn.clicked.connect(self.start)
+        btn_layout.addWidget(self.start_btn)
+
+        self.cancel_btn = QPushButton('取消')
+        self.cancel_btn.setToolTip('不再开始新的环境，正在创建的环境会继续完成')
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel)
+        btn_layout.addWidget(self.cancel_btn)
+        layout.addLayout(btn_layout)
+
+        self.progress_widget = ProgressWidget()
+        layout.addWidget(self.progress_widget)
+
+    def choose_manifest(self):
+        """选择并读取清单文件"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, '选择清单文件', '', '清单文件 (*.json *.toml *.yaml *.yml);;所有文件 (*.*)')
+        if not path:
+            return
+        try:
+            self.envs = load_manifest(path)
+        except Exception as e:
+            QMessageBox.critical(self, '错误', f'读取清单失败: {str(e)}')
+            return
+
+        self.manifest_path.setText(path)
+        self.env_table.setRowCount(len(self.envs))
+        self.rows = {}
+        for row, env in enumerate(self.envs):
+            self.rows[env.name] = row
+            self.env_table.setItem(row, 0, QTableWidgetItem(env.name))
+            self.env_table.setItem(row, 1, QTableWidgetItem(env.python or '当前解释器'))
+            count = len(parse_requirement_lines(env.requirements, env.base_dir).requirements)
+            self.env_table.setItem(row, 2, QTableWidgetItem(str(count)))
+            self.env_table.setItem(row, 3, QTableWidgetItem('等待'))
+        self.env_table.resizeColumnsToContents()
+        self.start_btn.setEnabled(bool(self.envs))
+
+    def start(self):
+        """开始批量创建"""
+        if self.worker and self.worker.isRunning():
+            return
+        self.start_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.worker = VenvWorker('batch_create', self.venv_manager, config=self.config,
+                                 envs=self.envs, max_parallel=self.parallel.value())
+        self.worker.progress.connect(self.progress_widget.update_progress)
+        self.worker.env_progress.connect(self.update_env_progress)
+        self.worker.result_ready.connect(self._show_results)
+        self.worker.finished.connect(self._handle_result)
+        self.worker.start()
+
+    def cancel(self):
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+
+    def update_env_progress(self, name, value, message):
+        """更新单个环境的状态"""
+        row = self.rows.get(name)
+        if row is not None:
+            self.env_table.item(row, 3).setText(f'{value}% {message}' if value < 100 else message)
+
+    def _show_results(self, results):
+        """显示每个环境的最终结果"""
+        for result in results:
+            row = self.rows.get(result.name)
+            if row is None:
+                continue
+            text = f'完成 ({result.duration:.1f} 秒)' if result.ok else f'失败: {result.message}'
+            item = self.env_table.item(row, 3)
+            item.setText(text)
+            item.setToolTip(result.message)
+            if result.ok:
+                self.created = True
+
+    def _handle_result(self, success, msg):
+        self.cancel_btn.setEnabled(False)
+        self.start_btn.setEnabled(False)
+        self.progress_widget.status_label.setText(msg.splitlines()[0] if msg else '')
+        if not success:
+            QMessageBox.warning(self, '批量创建', msg)
+
+    def closeEvent(self, event):
+        if self.worker and self.worker.isRunning():
+            QMessageBox.warning(self, '警告', '批量创建仍在进行，请等待完成')
+            event.ignore()
+            return
+        super().closeEvent(event)
+
+    def reject(self):
+        # Esc 键同样需要等待后台任务完成
+        if self.worker and self.worker.isRunning():
+            QMessageBox.warning(self, '警告', '批量创建仍在进行，请等待完成')
+            return
+        super().reject()
@@ -0,0 +1,93 @@
+"""VenvItemDelegate 绘制性能测试
+
+模拟滚动长列表：每次把可见的一屏行绘制到离屏图像上，比较每次绘制前清空
+缓存（相当于没有缓存）和使用缓存两种情况下每行的平均绘制时间。
+
+用法:
+    python benchmarks/paint_delegate.py [--rows 5000] [--visible 30] [--passes 3]
+
+没有显示环境时可以设置 QT_QPA_PLATFORM=offscreen。
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QRect
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QApplication, QStyleOptionViewItem
+
+from components import VenvItemDelegate, VenvListModel
+from venv_store import VenvStore
+
+ROW_HEIGHT = 20
+ROW_WIDTH = 600
+
+
+def build_model(rows):
+    store = VenvStore()
+    model = VenvListModel()
+    model.show_python_version = True
+    model.show_details = True
+    versions = ['Python 3.8.18', 'Python 3.10.13', 'Python 3.11.7', 'Python 3.12.1']
+    for i in range(rows):
+        record, _ = store.add(f'/home/user/root{i % 3}', f'projects/group{i % 40}/project{i}/.venv',
+                              versions[i % len(versions)])
+        record.size = 1024 * 1024 * (20 + i % 300)
+        record.package_count = 5 + i % 80
+        record.health = ('ok', 'warning', 'broken')[i % 7 % 3] if i % 7 < 3 else None
+        model.add_record(record)
+    model.flush()
+    return model
+
+
+def run(delegate, model, visible, passes, clear_each_paint):
+    """按一屏一屏滚动的方式绘制所有行，返回 (绘制行数, 用时)"""
+    image = QImage(ROW_WIDTH, ROW_HEIGHT * visible, QImage.Format_ARGB32_Premultiplied)
+    option = QStyleOptionViewItem()
+    option.font = QApplication.font()
+    option.palette = QApplication.palette()
+    rows = model.rowCount()
+    painted = 0
+    start = time.perf_counter()
+    for _ in range(passes):
+        # 每次滚动一行，可见的行全部重绘
+        for top in range(0, max(1, rows - visible)):
+            painter = QPainter(image)
+            for offset in range(visible):
+                if clear_each_paint:
+                    delegate.clear_caches()
+                option.rect = QRect(0, offset * ROW_HEIGHT, ROW_WIDTH, ROW_HEIGHT)
+                delegate.paint(painter, option, model.index(top + offset))
+                delegate.sizeHint(option, model.index(top + offset))
+                painted += 1
+            painter.end()
+    return painted, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='VenvItemDelegate 绘制性能测试')
+    parser.add_argument('--rows', type=int, default=2000, help='列表行数')
+    parser.add_argument('--visible', type=int, default=30, help='一屏显示的行数')
+    parser.add_argument('--passes', type=int, default=1, help='从头滚动到尾的次数')
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    model = build_model(args.rows)
+
+    results = []
+    for name, clear in (('无缓存', True), ('有缓存', False)):
+        delegate = VenvItemDelegate()
+        delegate.show_root = True
+        painted, elapsed = run(delegate, model, args.visible, args.passes, clear)
+        results.append(elapsed / painted)
+        print(f"{name}: {painted} 次绘制, 用时 {elapsed:.2f} 秒, 每行 {elapsed / painted * 1e6:.1f} 微秒")
+    print(f"加速比: {results[0] / results[1]:.2f}x")
+    del app
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""命令行入口（无界面）
+
+用法:
+    python cli.py batch-create manifest.toml [--parallel 4] [--base-path DIR]
+    python cli.py list [--versions] [--json] [--rescan]
+    python cli.py move SOURCE TARGET
+    python cli.py daemon [--status | --stop]
+    python cli.py inventory-export inventory.sqlite [--host NAME]
+    python cli.py inventory-merge merged.sqlite host1.sqlite host2.sqlite ...
+    python cli.py inventory-query merged.sqlite "numpy<2" [--host NAME]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from batch_create import BatchCreator, load_manifest, format_results
+from config_manager import ConfigManager
+from create_pipeline import resolve_symlinks
+from host_inventory import export_inventory, merge_inventories, HostInventory
+from index_daemon import serve, connect_indexer
+from log_setup import setup_logging
+from scanner import VenvScanner
+from venv_manager import VenvManager
+from venv_relocate import move_venv
+from venv_store import VenvStore
+
+
+def _make_manager(args, config):
+    venv_manager = VenvManager()
+    venv_manager.set_base_path(args.base_path or config.get('base_path'))
+    if not args.base_path:
+        venv_manager.set_extra_roots(config.get('scan_roots'))
+    return venv_manager
+
+
+def _list_from_indexer(venv_manager, depth, rescan=False):
+    """从后台索引服务获取虚拟环境列表，服务没有运行时返回 None"""
+    client = connect_indexer()
+    if client is None:
+        return None
+    with client:
+        venvs = client.call('list_venvs', roots=[str(r) for r in venv_manager.get_roots()], depth=depth,
+                            rescan=rescan)
+    store = VenvStore()
+    for venv in venvs:
+        store.add(venv['root'], venv['rel_path'], venv['python_version'])
+    return store
+
+
+def _scan_store(venv_manager, snapshot, depth):
+    """扫描虚拟环境，优先使用后台索引服务"""
+    store = None
+    if snapshot.use_indexer:
+        store = _list_from_indexer(venv_manager, depth)
+    if store is None:
+        scanner = VenvScanner(venv_manager.get_roots(), depth, snapshot.max_threads,
+                              adaptive=snapshot.scan_adaptive)
+        store = VenvStore()
+        for result in scanner.iter_scan():
+            store.add_scan_result(result)
+    return store
+
+
+def _invalidate_indexer(roots=None):
+    """修改环境后通知后台索引服务丢弃旧的扫描结果（服务没有运行时忽略）"""
+    client = connect_indexer()
+    if client is None:
+        return
+    try:
+        with client:
+            client.call('invalidate', roots=roots)
+    except Exception:
+        pass
+
+
+def cmd_list(args, config):
+    """扫描并列出虚拟环境（后台索引服务在运行时直接向它查询）"""
+    venv_manager = _make_manager(args, config)
+    snapshot = config.snapshot()
+    store = None
+    if not args.no_daemon and not args.versions and snapshot.use_indexer:
+        start = time.perf_counter()
+        store = _list_from_indexer(venv_manager, args.depth or snapshot.scan_depth, args.rescan)
+    if store is not None:
+        _print_records(args, store)
+        if not args.json:
+            print(f"共 {len(store)} 个虚拟环境（来自后台索引服务，用时 "
+                  f"{(time.perf_counter() - start) * 1000:.1f} 毫秒）", file=sys.stderr)
+        return 0
+
+    get_version = None
+    if args.versions:
+        get_version = lambda path: venv_manager.get_python_version(Path(path))
+    scanner = VenvScanner(venv_manager.get_roots(), args.depth or snapshot.scan_depth,
+                          snapshot.max_threads, get_version=get_version,
+                          adaptive=snapshot.scan_adaptive)
+    store = VenvStore()
+    for result in scanner.iter_scan():
+        store.add_scan_result(result)
+
+    _print_records(args, store)
+    if not args.json:
+        summary = scanner.summary
+        print(f"共 {len(store)} 个虚拟环境，用时 {summary.duration:.2f} 秒，"
+              f"{summary.workers} 个线程（最多 {summary.peak_workers} 个）", file=sys.stderr)
+    return 0
+
+
+def _print_records(args, store):
+    records = sorted(store, key=lambda r: (r.root, r.rel_path))
+    if args.json:
+        for record in records:
+            print(json.dumps(record.to_dict(), ensure_ascii=False))
+    else:
+        for record in records:
+            line = str(record.full_path)
+            if record.python_version:
+                line += f"\t{record.python_version}"
+            print(line)
+
+
+def cmd_daemon(args, config):
+    """运行后台索引服务（前台运行，可由系统服务或 & 放到后台），或查询、停止已运行的服务"""
+    if args.status or args.stop:
+        client = connect_indexer()
+        if client is None:
+            print("后台索引服务没有运行", file=sys.stderr)
+            return 1
+        with client:
+            if args.stop:
+                client.call('shutdown')
+                print("后台索引服务已停止")
+            else:
+                print(json.dumps(client.call('status'), ensure_ascii=False, indent=2))
+        return 0
+    venv_manager = _make_manager(args, config)
+    snapshot = config.snapshot()
+    print("后台索引服务已启动，按 Ctrl+C 停止", file=sys.stderr)
+    serve([str(r) for r in venv_manager.get_roots()], snapshot.scan_depth,
+          snapshot.max_threads, snapshot.scan_adaptive)
+    return 0
+
+
+def cmd_inventory_export(args, config):
+    """导出本机的环境清单（供多主机合并）"""
+    venv_manager = _make_manager(args, config)
+    snapshot = config.snapshot()
+    store = _scan_store(venv_manager, snapshot, snapshot.scan_depth)
+    venv_paths = sorted(str(record.full_path) for record in store)
+    count, errors = export_inventory(venv_paths, args.dest, host=args.host,
+                                     max_workers=snapshot.max_threads)
+    for path, error in sorted(errors.items()):
+        print(f"读取失败: {path}: {error}", file=sys.stderr)
+    print(f"已导出 {count} 个虚拟环境的清单到 {args.dest}")
+    return 0 if not errors else 1
+
+
+def cmd_inventory_merge(args, config):
+    """把多台主机导出的清单合并到一个文件"""
+    stats = merge_inventories(args.sources, args.dest)
+    print(f"已合并 {stats['hosts']} 台主机（跳过 {stats['skipped']} 份较旧的清单），"
+          f"共 {stats['venvs']} 个虚拟环境、{stats['packages']} 个不同的包")
+    return 0
+
+
+def cmd_inventory_query(args, config):
+    """查询合并后的清单"""
+    inventory = HostInventory(args.inventory)
+    if args.query:
+        for pkg in inventory.query(args.query, args.host):
+            print(f"{pkg.host}\t{pkg.venv}\t{pkg.name}=={pkg.version}")
+    else:
+        for venv in inventory.venvs(args.host):
+            print(f"{venv.host}\t{venv.venv}\t{venv.python_version or ''}\t{venv.package_count}")
+    return 0
+
+
+def cmd_move(args, config):
+    """移动或重命名虚拟环境（相对路径基于基础路径）"""
+    base_path = Path(args.base_path or config.get('base_path'))
+    result = move_venv(base_path / args.source, base_path / args.target)
+    _invalidate_indexer()
+    print(f"已移动到 {result.path}（{'跨文件系统复制' if result.copied else '重命名'}，"
+          f"改写 {len(result.relocated.rewritten)} 个文件）")
+    for path in result.relocated.skipped:
+        print(f"无法改写: {path}", file=sys.stderr)
+    return 0
+
+
+def cmd_batch_create(args, config):
+    """按清单批量创建虚拟环境"""
+    envs = load_manifest(args.manifest)
+    venv_manager = _make_manager(args, config)
+    snapshot = config.snapshot()
+
+    def on_progress(name, value, message):
+        print(f"[{name}] {value:3d}% {message}", flush=True)
+
+    creator = BatchCreator(venv_manager, envs,
+                           max_parallel=args.parallel or snapshot.batch_parallel,
+                           upgrade_pip=snapshot.auto_upgrade_pip,
+                           symlinks=resolve_symlinks(snapshot.venv_symlinks),
+                           on_progress=None if args.quiet else on_progress)
+    results = creator.run()
+    _invalidate_indexer()
+    print(format_results(results))
+    return 0 if all(r.ok for r in results) else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='venv_manager', description='Python 虚拟环境管理器（命令行）')
+    parser.add_argument('--base-path', help='虚拟环境基础路径，默认使用界面中的设置')
+    subparsers = parser.add_subparsers(dest='command')
+
+    batch = subparsers.add_parser('batch-create', help='按清单批量创建虚拟环境')
+    batch.add_argument('manifest', help='JSON / TOML / YAML 清单文件')
+    batch.add_argument('-j', '--parallel', type=int, default=0, help='同时创建的环境数量')
+    batch.add_argument('-q', '--quiet', action='store_true', help='不输出每个环境的进度')
+    batch.set_defaults(func=cmd_batch_create)
+
+    list_parser = subparsers.add_parser('list', help='扫描并列出虚拟环境')
+    list_parser.add_argument('--versions', action='store_true', help='同时获取Python版本')
+    list_parser.add_argument('--depth', type=int, default=0, help='扫描深度，默认使用界面中的设置')
+    list_parser.add_argument('--json', action='store_true', help='每个环境输出一行 JSON')
+    list_parser.add_argument('--no-daemon', action='store_true', help='不使用后台索引服务，直接扫描')
+    list_parser.add_argument('--rescan', action='store_true', help='要求后台索引服务重新扫描，不使用已有结果')
+    list_parser.set_defaults(func=cmd_list)
+
+    move = subparsers.add_parser('move', help='移动或重命名虚拟环境（不重新安装包）')
+    move.add_argument('source', help='虚拟环境路径')
+    move.add_argument('target', help='新路径')
+    move.set_defaults(func=cmd_move)
+
+    daemon = subparsers.add_parser('daemon', help='运行后台索引服务（界面和命令行会自动使用）')
+    daemon.add_argument('--status', action='store_true', help='显示正在运行的服务状态')
+    daemon.add_argument('--stop', action='store_true', help='停止正在运行的服务')
+    daemon.set_defaults(func=cmd_daemon)
+
+    inv_export = subparsers.add_parser('inventory-export', help='导出本机的环境清单（可在其他机器上合并）')
+    inv_export.add_argument('dest', help='目标清单文件（.sqlite）')
+    inv_export.add_argument('--host', help='主机名，默认为本机名')
+    inv_export.set_defaults(func=cmd_inventory_export)
+
+    inv_merge = subparsers.add_parser('inventory-merge', help='合并多台主机导出的清单')
+    inv_merge.add_argument('dest', help='合并后的清单文件（已存在时追加，同一主机保留最新的清单）')
+    inv_merge.add_argument('sources', nargs='+', help='各主机导出的清单文件')
+    inv_merge.set_defaults(func=cmd_inventory_merge)
+
+    inv_query = subparsers.add_parser('inventory-query', help='查询清单中哪些主机的哪些环境安装了指定的包')
+    inv_query.add_argument('inventory', help='清单文件')
+    inv_query.add_argument('query', nargs='?', help='包名和版本约束，如 numpy<2；省略时列出所有环境')
+    inv_query.add_argument('--host', help='只查询指定主机')
+    inv_query.set_defaults(func=cmd_inventory_query)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 2
+    config = ConfigManager()
+    setup_logging(config.get('log_level'), config.get('log_json'))
+    try:
+        return args.func(args, config)
+    except Exception as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
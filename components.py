@@ -1,12 +1,20 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                            QLabel, QLineEdit, QProgressBar, QSizePolicy, QComboBox, QFileDialog, QMessageBox,
-                           QStyledItemDelegate, QStyle)
-from PyQt5.QtCore import Qt, QRect, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QPainter, QFontMetrics
+                           QStyledItemDelegate, QStyle, QDialog, QTableWidget, QTableWidgetItem,
+                           QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QRect, QPropertyAnimation, QEasingCurve, QAbstractListModel,
+                          QModelIndex, QSortFilterProxyModel, QTimer)
+from PyQt5.QtGui import QPainter, QFontMetrics, QColor, QStaticText, QTransform
 import sys
 import os
 from pathlib import Path
 import subprocess
+from datetime import datetime
+from interpreter_probe import probe_interpreter, describe_interpreter
+from dist_metadata import format_size
+from log_setup import get_logger
+
+logger = get_logger('components')
 
 class PathSelector(QWidget):
     """路径选择组件"""
@@ -91,6 +99,39 @@ class ButtonGroup(QWidget):
                 self.buttons[text] = btn
                 layout.addWidget(btn)
 
+class ResultTableDialog(QDialog):
+    """以表格形式展示操作结果的对话框"""
+    def __init__(self, title, headers, rows, summary='', parent=None):
+        super().__init__(parent)
+        # 移除帮助按钮
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setWindowTitle(title)
+        self.setGeometry(320, 320, 720, 420)
+        
+        layout = QVBoxLayout(self)
+        if summary:
+            layout.addWidget(QLabel(summary))
+        
+        self.table = QTableWidget(len(rows), len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(str(value)))
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+        
+        close_btn = QPushButton('关闭')
+        close_btn.clicked.connect(self.accept)
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
 class PythonSelector(QWidget):
     """Python解释器选择组件"""
     def __init__(self, parent=None):
@@ -132,19 +173,10 @@ class PythonSelector(QWidget):
         self.python_combo.clear()
         
         # 获取当前Python信息
-        try:
-            current_python = sys.executable
-            result = subprocess.run(
-                [current_python, '--version'],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                version = result.stdout.strip()
-                self.python_combo.addItem(f"{version} (当前环境)", None)
-            else:
-                self.python_combo.addItem('使用当前Python', None)
-        except:
+        info = probe_interpreter(sys.executable)
+        if info:
+            self.python_combo.addItem(f"{info['version']} (当前环境)", None)
+        else:
             self.python_combo.addItem('使用当前Python', None)
             
         self.python_combo.addItem('手动选择...', 'manual')
@@ -168,13 +200,9 @@ class PythonSelector(QWidget):
             if python_path:
                 try:
                     # 验证选择的是否为有效的Python解释器
-                    result = subprocess.run(
-                        [python_path, '--version'],
-                        capture_output=True,
-                        text=True
-                    )
-                    if result.returncode == 0:
-                        version = result.stdout.strip()
+                    info = probe_interpreter(python_path)
+                    if info:
+                        version = info['version']
                         # 首先检查是否已存在于列表中
                         for i in range(self.python_combo.count()):
                             item_text = self.python_combo.itemText(i)
@@ -227,9 +255,9 @@ class PythonSelector(QWidget):
                 pass
                 
         except Exception as e:
-            # 只打印非权限相关的错误
+            # 只记录非权限相关的错误
             if not isinstance(e, PermissionError):
-                print(f"扫描路径 {path_pattern} 时出错: {str(e)}")
+                logger.warning(f"扫描路径 {path_pattern} 时出错: {str(e)}")
     
     def _get_search_paths(self):
         """获取需要扫描的路径列表"""
@@ -280,37 +308,273 @@ class PythonSelector(QWidget):
             
             if python_path.exists() and os.access(python_path, os.X_OK):  # 检查执行权限
                 try:
-                    # 获取版本信息
-                    result = os.popen(f'"{python_path}" --version 2>&1').read().strip()
-                    if result and 'python' in result.lower():
+                    # 获取版本信息（探测结果按解释器缓存，重复扫描不会再启动进程）
+                    info = probe_interpreter(python_path)
+                    if info:
                         # 检查是否已经添加过相同的解释器
-                        version_str = f"{result} ({python_path})"
+                        version_str = f"{info['version']} ({python_path})"
                         for i in range(self.python_combo.count()):
                             if self.python_combo.itemText(i) == version_str:
                                 return
                         self.python_combo.addItem(version_str, str(python_path))
+                        self.python_combo.setItemData(self.python_combo.count() - 1,
+                                                      describe_interpreter(info), Qt.ToolTipRole)
                 except:
                     pass
                     
         except Exception as e:
             # 忽略权限错误
             if not isinstance(e, PermissionError):
-                print(f"处理Python路径 {path} 时出错: {str(e)}")
+                logger.warning(f"处理Python路径 {path} 时出错: {str(e)}")
     
     def get_selected_python(self):
         """获取选中的Python解释器路径"""
         return self.python_combo.currentData() 
 
+class VenvListModel(QAbstractListModel):
+    """虚拟环境列表模型，数据直接来自 VenvStore 中的 VenvRecord
+
+    数据角色: UserRole 相对路径, +1 Python版本, +2 根目录, +3 健康状态（已归档为 archived）,
+    +4 VenvRecord 本身, +5 大小和包数量。扫描时逐条添加的记录先缓存起来，
+    在下一次事件循环中合并成一次插入，避免每条记录都触发一次视图更新。
+    """
+    RecordRole = Qt.UserRole + 4
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._records = []
+        self._rows = {}  # {VenvRecord: 行号}
+        self._pending = []
+        self.show_python_version = False
+        self.show_details = False  # 显示大小和包数量
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.flush)
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._records)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self._records[index.row()]
+        if role in (Qt.DisplayRole, Qt.UserRole):
+            return record.rel_path
+        if role == Qt.UserRole + 1:
+            return record.python_version if self.show_python_version else None
+        if role == Qt.UserRole + 2:
+            return record.root
+        if role == Qt.UserRole + 3:
+            return 'archived' if record.archive else record.health
+        if role == Qt.UserRole + 5:
+            if not self.show_details or record.package_count is None:
+                return None
+            return f"{format_size(record.size)} · {record.package_count} 个包"
+        if role == Qt.ToolTipRole:
+            lines = list(record.issues or ())
+            if record.archive:
+                archived_at = datetime.fromtimestamp(record.archive.archived_at)
+                lines.append(f"已归档: {archived_at:%Y-%m-%d %H:%M}（{format_size(record.archive.archive_size)}）")
+                lines.append(record.archive.archive)
+            if record.last_used:
+                lines.append(f"最近使用: {datetime.fromtimestamp(record.last_used):%Y-%m-%d %H:%M}")
+            if record.created:
+                lines.append(f"创建时间: {datetime.fromtimestamp(record.created):%Y-%m-%d %H:%M}")
+            return '\n'.join(lines) or None
+        if role == self.RecordRole:
+            return record
+        return None
+    
+    def record(self, row):
+        return self._records[row]
+    
+    def records(self):
+        return list(self._records)
+    
+    def add_record(self, record):
+        """添加记录（合并到下一次事件循环中插入）"""
+        if record in self._rows:
+            self.record_changed(record)
+            return
+        self._pending.append(record)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(0)
+    
+    def flush(self):
+        """立即插入缓存的记录"""
+        self._flush_timer.stop()
+        pending = []
+        for record in self._pending:
+            if record not in self._rows:
+                self._rows[record] = None
+                pending.append(record)
+        self._pending = []
+        if not pending:
+            return
+        start = len(self._records)
+        self.beginInsertRows(QModelIndex(), start, start + len(pending) - 1)
+        for row, record in enumerate(pending, start):
+            self._records.append(record)
+            self._rows[record] = row
+        self.endInsertRows()
+    
+    def record_changed(self, record):
+        """记录的字段有更新，通知视图重绘该行"""
+        row = self._rows.get(record)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+    
+    def refresh_all(self):
+        """所有行都需要重绘（如显示设置变化）"""
+        if self._records:
+            self.dataChanged.emit(self.index(0), self.index(len(self._records) - 1))
+    
+    def remove_records(self, records):
+        """移除记录"""
+        self.flush()
+        rows = sorted({self._rows[r] for r in records if self._rows.get(r) is not None}, reverse=True)
+        if not rows:
+            return
+        # 合并连续的行，一次移除一段
+        end = rows[0]
+        for i, row in enumerate(rows):
+            if i + 1 < len(rows) and rows[i + 1] == row - 1:
+                continue
+            self.beginRemoveRows(QModelIndex(), row, end)
+            del self._records[row:end + 1]
+            self.endRemoveRows()
+            if i + 1 < len(rows):
+                end = rows[i + 1]
+        self._rows = {record: row for row, record in enumerate(self._records)}
+
+
+class VenvFilterProxyModel(QSortFilterProxyModel):
+    """按路径排序，并按路径或Python版本过滤"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.filter_text = ''
+        self.setDynamicSortFilter(True)
+        self.sort(0)
+    
+    def set_filter_text(self, text):
+        self.filter_text = text.lower()
+        self.invalidateFilter()
+    
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.filter_text:
+            return True
+        record = self.sourceModel().record(source_row)
+        return (self.filter_text in record.rel_path.lower()
+                or (record.python_version and self.filter_text in record.python_version.lower()))
+    
+    def lessThan(self, left, right):
+        model = self.sourceModel()
+        return model.record(left.row()).rel_path < model.record(right.row()).rel_path
+
+
 class VenvItemDelegate(QStyledItemDelegate):
-    """自定义列表项代理,用于在最右侧显示Python版本"""
+    """自定义列表项代理,用于在最右侧显示Python版本、所属根目录、健康状态以及大小和包数量
+
+    滚动长列表时每一行都会反复重绘，因此字体度量、文本宽度、省略后的文本、
+    排好版的文字（QStaticText）和 sizeHint 都按字体缓存，重绘时只做字典查找。
+    缓存超过 MAX_CACHE 条时整体清空。
+    """
+    
+    # 健康状态标记: 状态 -> (文字, 背景色)
+    HEALTH_BADGES = {
+        'broken': ('损坏', QColor(211, 47, 47)),
+        'warning': ('警告', QColor(245, 124, 0)),
+        'archived': ('归档', QColor(117, 117, 117)),
+    }
+    MAX_CACHE = 20000
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.show_root = False  # 扫描多个根目录时显示根目录列
+        self.clear_caches()
+    
+    def clear_caches(self):
+        """清空所有缓存（字体或样式变化时）"""
+        self._metrics = {}      # {字体: QFontMetrics}
+        self._widths = {}       # {(字体, 文本): 宽度}
+        self._elided = {}       # {(字体, 文本, 省略方式, 可用宽度): 省略后的文本}
+        self._versions = {}     # {Python版本: "[版本]"}
+        self._static = {}       # {(字体, 文本): QStaticText}
+        self._size_hints = {}   # {(字体, 文本): QSize}
+    
+    def _font_metrics(self, font):
+        key = font.key()
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = QFontMetrics(font)
+        return key, metrics
+    
+    def _text_width(self, font_key, metrics, text):
+        key = (font_key, text)
+        width = self._widths.get(key)
+        if width is None:
+            if len(self._widths) > self.MAX_CACHE:
+                self._widths.clear()
+            width = self._widths[key] = metrics.horizontalAdvance(text)
+        return width
+    
+    def _elided_text(self, font_key, metrics, text, mode, width):
+        key = (font_key, text, mode, width)
+        elided = self._elided.get(key)
+        if elided is None:
+            if len(self._elided) > self.MAX_CACHE:
+                self._elided.clear()
+            elided = self._elided[key] = metrics.elidedText(text, mode, width)
+        return elided
+    
+    def _draw_text(self, painter, font, font_key, metrics, rect, text, align):
+        """用缓存的 QStaticText 绘制单行文本（水平方向左、右或居中对齐，垂直居中）"""
+        key = (font_key, text)
+        static = self._static.get(key)
+        if static is None:
+            if len(self._static) > self.MAX_CACHE:
+                self._static.clear()
+            static = QStaticText(text)
+            static.setTextFormat(Qt.PlainText)
+            static.prepare(QTransform(), font)
+            self._static[key] = static
+        width = self._text_width(font_key, metrics, text)
+        if align == Qt.AlignRight:
+            x = rect.x() + rect.width() - width
+        elif align == Qt.AlignHCenter:
+            x = rect.x() + (rect.width() - width) // 2
+        else:
+            x = rect.x()
+        y = rect.y() + (rect.height() - metrics.height()) // 2
+        painter.drawStaticText(x, y, static)
+
+    def _version_text(self, python_version):
+        text = self._versions.get(python_version)
+        if text is None:
+            text = self._versions[python_version] = f"[{python_version}]"
+        return text
+    
+    def sizeHint(self, option, index):
+        key = (option.font.key(), index.data())
+        size = self._size_hints.get(key)
+        if size is None:
+            if len(self._size_hints) > self.MAX_CACHE:
+                self._size_hints.clear()
+            size = self._size_hints[key] = super().sizeHint(option, index)
+        return size
     
     def paint(self, painter, option, index):
         # 获取项目数据
         venv_path = index.data()
         python_version = index.data(Qt.UserRole + 1)
+        root = index.data(Qt.UserRole + 2) if self.show_root else None
+        badge = self.HEALTH_BADGES.get(index.data(Qt.UserRole + 3))
+        details = index.data(Qt.UserRole + 5)
         
-        # 如果没有Python版本信息，使用默认绘制
-        if not python_version:
+        # 如果没有Python版本、根目录、健康状态和大小信息，使用默认绘制
+        if not python_version and not root and not badge and not details:
             super().paint(painter, option, index)
             return
             
@@ -318,31 +582,81 @@ class VenvItemDelegate(QStyledItemDelegate):
         painter.save()
         
         # 绘制选中状态背景
-        if option.state & QStyle.State_Selected:
+        selected = option.state & QStyle.State_Selected
+        if selected:
             painter.fillRect(option.rect, option.palette.highlight())
             painter.setPen(option.palette.highlightedText().color())
         else:
             painter.setPen(option.palette.text().color())
+        dim_color = None if selected else option.palette.color(option.palette.Disabled, option.palette.Text)
             
         # 计算文本区域
         text_rect = QRect(option.rect)
         text_rect.setWidth(text_rect.width() - 5)  # 右边留出一点空间
+        font_key, font_metrics = self._font_metrics(option.font)
+        right = text_rect.right()
         
-        # 获取版本文本的宽度
-        version_text = f"[{python_version}]"
-        font_metrics = QFontMetrics(option.font)
-        version_width = font_metrics.horizontalAdvance(version_text)
+        # 绘制版本文本（右对齐）
+        if python_version:
+            version_text = self._version_text(python_version)
+            version_width = self._text_width(font_key, font_metrics, version_text)
+            version_rect = QRect(text_rect)
+            version_rect.setLeft(right - version_width)
+            self._draw_text(painter, option.font, font_key, font_metrics, version_rect, version_text, Qt.AlignRight)
+            right -= version_width + 10
+        
+        # 绘制健康状态标记（版本左侧）
+        if badge:
+            badge_text, badge_color = badge
+            badge_width = self._text_width(font_key, font_metrics, badge_text) + 8
+            badge_height = font_metrics.height()
+            badge_rect = QRect(right - badge_width, text_rect.center().y() - badge_height // 2 + 1,
+                               badge_width, badge_height)
+            painter.save()
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(badge_color)
+            painter.drawRoundedRect(badge_rect, 3, 3)
+            painter.setPen(Qt.white)
+            self._draw_text(painter, option.font, font_key, font_metrics, badge_rect, badge_text, Qt.AlignHCenter)
+            painter.restore()
+            right -= badge_width + 10
+        
+        # 绘制大小和包数量（健康状态左侧）
+        if details:
+            details_width = self._text_width(font_key, font_metrics, details)
+            details_rect = QRect(text_rect)
+            details_rect.setLeft(right - details_width)
+            details_rect.setRight(right)
+            if dim_color is not None:
+                painter.save()
+                painter.setPen(dim_color)
+            self._draw_text(painter, option.font, font_key, font_metrics, details_rect, details, Qt.AlignRight)
+            if dim_color is not None:
+                painter.restore()
+            right -= details_width + 10
         
-        # 绘制路径文本（左对齐）
+        # 绘制根目录文本（版本左侧，最多占三分之一宽度）
+        if root:
+            root_text = self._elided_text(font_key, font_metrics, root, Qt.ElideMiddle, text_rect.width() // 3)
+            root_width = self._text_width(font_key, font_metrics, root_text)
+            root_rect = QRect(text_rect)
+            root_rect.setLeft(right - root_width)
+            root_rect.setRight(right)
+            if dim_color is not None:
+                painter.save()
+                painter.setPen(dim_color)
+            self._draw_text(painter, option.font, font_key, font_metrics, root_rect, root_text, Qt.AlignRight)
+            if dim_color is not None:
+                painter.restore()
+            right -= root_width + 10
+        
+        # 绘制路径文本（左对齐，超出可用宽度时省略末尾）
         path_rect = QRect(text_rect)
         path_rect.setLeft(text_rect.left())
-        path_rect.setRight(text_rect.right() - version_width - 10)  # 为版本文本留出空间
-        painter.drawText(path_rect, Qt.AlignLeft | Qt.AlignVCenter, venv_path)
-        
-        # 绘制版本文本（右对齐）
-        version_rect = QRect(text_rect)
-        version_rect.setLeft(text_rect.right() - version_width)
-        painter.drawText(version_rect, Qt.AlignRight | Qt.AlignVCenter, version_text)
+        path_rect.setRight(right)  # 为右侧文本留出空间
+        path_text = self._elided_text(font_key, font_metrics, venv_path, Qt.ElideRight, path_rect.width())
+        self._draw_text(painter, option.font, font_key, font_metrics, path_rect, path_text, Qt.AlignLeft)
         
         # 恢复画笔状态
-        painter.restore()
\ No newline at end of file
+        painter.restore()
@@ -1,12 +1,65 @@
 from PyQt5.QtCore import QSettings
 import json
+import threading
+from dataclasses import dataclass, fields
 from pathlib import Path
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """配置快照
+
+    只读、类型已转换的配置副本。ConfigManager 每次修改配置都会生成新的快照并
+    整体替换引用，工作线程持有的快照永远不会被修改，因此读取时无需加锁。
+    """
+    base_path: str
+    auto_refresh: bool
+    scan_depth: int
+    max_threads: int
+    auto_upgrade_pip: bool
+    show_pkg_size: bool
+    show_python_version: bool
+    window_geometry: Optional[str]
+    last_used_paths: Tuple[str, ...]
+    index_url: str
+    index_cache_ttl: int
+    scan_roots: Tuple[str, ...]
+    venv_symlinks: str
+    parallel_post_create: bool
+    batch_parallel: int
+    log_level: str
+    log_json: bool
+    prefetch_packages: bool
+    show_venv_details: bool
+    scan_adaptive: bool
+    archive_dir: str
+    archive_compression: str
+    snapshot_before_changes: bool
+    snapshot_keep: int
+    use_indexer: bool
+
+    def get(self, key, default=None):
+        """兼容 ConfigManager.get 的读取方式"""
+        return getattr(self, key, default)
+
 
 class ConfigManager:
-    """配置管理类"""
+    """配置管理类
+
+    配置在启动时一次性读入内存，之后的读取只访问内存缓存；写入先更新缓存，
+    再由后台定时器合并成一次 QSettings 写入和一次 sync（写回缓存）。
+    """
+    FLUSH_DELAY = 0.5  # 合并写入的延迟（秒）
+
     def __init__(self):
         self.settings = QSettings('VenvManager', 'Settings')
+        self._lock = threading.Lock()
+        self._pending = {}          # 等待写入 QSettings 的值（已序列化）
+        self._flush_timer = None
         self.load_defaults()
+        self._values = self._load_all()
+        self._snapshot = self._build_snapshot()
 
     def load_defaults(self):
         """加载默认配置"""
@@ -20,16 +73,26 @@ class ConfigManager:
             'show_python_version': False,             # 显示Python版本
             'window_geometry': None,                  # 窗口位置和大小
             'last_used_paths': [],                    # 最近使用的路径
+            'index_url': 'https://pypi.org/simple/',  # 检查更新使用的简单索引（可为本地目录或镜像）
+            'index_cache_ttl': 3600,                  # 索引页面缓存有效期（秒）
+            'scan_roots': [],                         # 除基础路径外额外扫描的根目录
+            'venv_symlinks': 'auto',                  # 创建方式: auto / symlinks / copies
+            'parallel_post_create': True,             # 创建后的步骤并行执行
+            'batch_parallel': 4,                      # 批量创建时同时创建的环境数
+            'log_level': 'INFO',                      # 日志级别
+            'log_json': False,                        # 以 JSON 行格式写入日志
+            'prefetch_packages': True,                # 选中环境时后台预读包列表
+            'show_venv_details': True,                # 列表中显示环境大小和包数量
+            'scan_adaptive': True,                    # 按文件系统延迟自动调整扫描线程数
+            'archive_dir': '',                        # 归档目录（为空时使用 ~/.venv_manager/archives）
+            'archive_compression': 'xz',              # 归档压缩方式: xz / gz
+            'snapshot_before_changes': True,          # 安装、升级、卸载包前建立快照
+            'snapshot_keep': 5,                       # 每个环境最多保留的快照数
+            'use_indexer': True,                      # 后台索引服务在运行时向它查询
         }
 
-    def get(self, key, default=None):
-        """获取配置值"""
-        if default is None:
-            default = self.defaults.get(key)
-        
-        value = self.settings.value(key, default)
-        
-        # 类型转换
+    def _convert(self, value, default):
+        """把 QSettings 中读出的原始值转换为默认值对应的类型"""
         if isinstance(default, bool):
             # 确保布尔值正确转换
             if isinstance(value, str):
@@ -38,21 +101,91 @@ class ConfigManager:
         elif isinstance(default, int):
             return int(value)
         elif isinstance(default, list):
+            if isinstance(value, list):
+                return value
             try:
                 return json.loads(value) if value else default
             except:
                 return default
         return value
 
+    def _load_all(self):
+        """从 QSettings 一次性读取全部已知配置"""
+        values = {}
+        for key, default in self.defaults.items():
+            try:
+                values[key] = self._convert(self.settings.value(key, default), default)
+            except (TypeError, ValueError):
+                values[key] = default
+        return values
+
+    def _build_snapshot(self):
+        values = {}
+        for f in fields(ConfigSnapshot):
+            value = self._values.get(f.name, self.defaults.get(f.name))
+            # 列表转为元组，保证快照不可变
+            values[f.name] = tuple(value) if isinstance(value, list) else value
+        return ConfigSnapshot(**values)
+
+    def snapshot(self):
+        """获取当前配置快照（可在任意线程中无锁读取）"""
+        return self._snapshot
+
+    def get(self, key, default=None):
+        """获取配置值"""
+        if key in self._values:
+            value = self._values[key]
+            # 列表返回副本，避免调用方修改缓存
+            return list(value) if isinstance(value, list) else value
+
+        if default is None:
+            default = self.defaults.get(key)
+        return self._convert(self.settings.value(key, default), default)
+
     def set(self, key, value):
         """设置配置值"""
-        if isinstance(value, (list, dict)):
-            value = json.dumps(value)
-        elif isinstance(value, bool):
-            # 确保布尔值被正确存储
-            value = 'true' if value else 'false'
-        self.settings.setValue(key, value)
-        self.settings.sync()
+        self.update({key: value})
+
+    def update(self, values):
+        """批量设置配置值，只触发一次写回"""
+        with self._lock:
+            new_values = dict(self._values)
+            for key, value in values.items():
+                if isinstance(value, list):
+                    value = list(value)
+                new_values[key] = value
+                if isinstance(value, (list, dict)):
+                    value = json.dumps(value)
+                elif isinstance(value, bool):
+                    # 确保布尔值被正确存储
+                    value = 'true' if value else 'false'
+                self._pending[key] = value
+            self._values = new_values
+            self._snapshot = self._build_snapshot()
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """安排一次延迟写回（调用方需持有锁）"""
+        if self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.FLUSH_DELAY, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self):
+        """把待写入的配置写入 QSettings 并同步一次"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            # QSettings 对象不能跨线程共享，每次写回使用独立实例
+            settings = QSettings('VenvManager', 'Settings')
+            for key, value in pending.items():
+                settings.setValue(key, value)
+            settings.sync()
 
     def save_window_geometry(self, window):
         """保存窗口位置和大小"""
@@ -78,5 +211,12 @@ class ConfigManager:
 
     def clear(self):
         """清除所有设置"""
-        self.settings.clear()
-        self.settings.sync() 
\ No newline at end of file
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._pending = {}
+            self.settings.clear()
+            self.settings.sync()
+            self._values = dict(self.defaults)
+            self._snapshot = self._build_snapshot()
@@ -0,0 +1,267 @@
+"""虚拟环境创建流水线
+
+创建过程由若干声明式阶段组成，每个步骤只执行一次：
+  1. create   以 --without-pip 创建环境（可选符号链接或复制解释器）
+  2. seed     安装 pip（以及 setuptools、wheel）：本地缓存中有 wheel 时直接
+              用缓存的 pip wheel 离线安装，否则退回 ensurepip；需要升级时
+              （无论是否使用了缓存）再执行一次 pip install --upgrade，并把最新
+              版本下载到缓存；不升级时不访问网络，setuptools、
+              wheel 只从本地缓存安装
+  3. 后续步骤  互不依赖的步骤（预热解释器信息、缓存 wheel、安装依赖等），
+              可以并行执行
+
+每个阶段都会记录耗时，便于定位慢在哪一步。
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import venv
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app_paths import APP_DATA_DIR
+from interpreter_probe import probe_interpreter
+from dist_metadata import python_executable, Version, InvalidVersion
+
+# 本地 wheel 缓存目录
+WHEEL_CACHE_DIR = APP_DATA_DIR / 'wheels'
+SEED_PACKAGES = ('pip', 'setuptools', 'wheel')
+
+# 流水线阶段: 名称, 显示名称, 执行函数, 是否必需（失败时中止创建）
+Stage = namedtuple('Stage', 'name label func required')
+
+# 阶段执行结果: 名称, 显示名称, 耗时（秒）, 是否成功, 说明
+StageResult = namedtuple('StageResult', 'name label duration ok message')
+
+
+class PipelineError(Exception):
+    """必需阶段执行失败"""
+
+    def __init__(self, message, results):
+        super().__init__(message)
+        self.results = results
+
+
+def _wheel_version(filename):
+    try:
+        return Version(filename.split('-')[1])
+    except (IndexError, InvalidVersion):
+        return None
+
+
+def find_cached_wheel(package, wheel_dir=WHEEL_CACHE_DIR):
+    """在本地缓存中查找纯 Python wheel（取版本号最高的一个）"""
+    try:
+        candidates = [(_wheel_version(n), n) for n in os.listdir(wheel_dir)
+                      if n.endswith('-py3-none-any.whl')
+                      and n.split('-')[0].lower().replace('_', '-') == package]
+    except OSError:
+        return None
+    candidates = [(version, n) for version, n in candidates if version is not None]
+    if not candidates:
+        return None
+    return Path(wheel_dir) / max(candidates)[1]
+
+
+def download_to_cache(python, args, wheel_dir=WHEEL_CACHE_DIR):
+    """用 pip download 下载到缓存目录
+
+    先下载到缓存目录旁的私有临时目录，完成后逐个 os.replace 到缓存中，
+    同时执行的 pip install --find-links 不会读到写了一半的文件。
+
+    Args:
+        python: 执行 pip 的解释器
+        args: pip download 的其余参数（包名、选项）
+        wheel_dir: 缓存目录
+
+    Returns:
+        list[str]: 下载的文件名
+    """
+    wheel_dir = Path(wheel_dir)
+    wheel_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.download-', dir=wheel_dir.parent)
+    try:
+        _run([python, '-m', 'pip', 'download', '--quiet', '--disable-pip-version-check',
+              '--dest', tmp_dir, *args])
+        names = os.listdir(tmp_dir)
+        for name in names:
+            os.replace(os.path.join(tmp_dir, name), wheel_dir / name)
+        return names
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def resolve_symlinks(mode):
+    """把配置中的创建方式转换为 venv 的 symlinks 参数"""
+    if mode == 'symlinks':
+        return True
+    if mode == 'copies':
+        return False
+    # auto: 与 venv 模块默认行为一致，Windows 上复制，其余平台使用符号链接
+    return os.name != 'nt'
+
+
+def _run(cmd):
+    """执行命令，失败时抛出包含 stderr 的异常"""
+    try:
+        subprocess.run([str(c) for c in cmd], check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise Exception((e.stderr or e.stdout or str(e)).strip())
+
+
+class CreatePipeline:
+    """虚拟环境创建流水线
+
+    Args:
+        venv_path: 新环境路径
+        python_path: 可选，用于创建环境的解释器，默认使用当前解释器
+        with_pip: 是否安装 pip
+        seed_packages: 需要预装的包，默认 pip、setuptools、wheel（不升级时除 pip 外只从本地缓存安装）
+        upgrade: 是否把预装的包升级到最新版本（需要联网）
+        symlinks: True 使用符号链接，False 复制解释器
+        parallel: 后续步骤是否并行执行
+        wheel_dir: 本地 wheel 缓存目录
+        post_steps: 额外的后续步骤 [(名称, 显示名称, 函数)]，函数参数为新环境的解释器路径
+        progress: 可选回调 progress(百分比, 信息)
+    """
+
+    def __init__(self, venv_path, python_path=None, with_pip=True, seed_packages=SEED_PACKAGES,
+                 upgrade=False, symlinks=None, parallel=True, wheel_dir=WHEEL_CACHE_DIR,
+                 post_steps=(), progress=None):
+        self.venv_path = Path(venv_path)
+        self.python_path = python_path
+        self.with_pip = with_pip
+        self.seed_packages = tuple(seed_packages)
+        self.upgrade = upgrade
+        self.symlinks = resolve_symlinks('auto') if symlinks is None else symlinks
+        self.parallel = parallel
+        self.wheel_dir = Path(wheel_dir)
+        self.post_steps = list(post_steps)
+        self.progress = progress or (lambda value, message: None)
+        self.env_python = python_executable(self.venv_path)
+
+    # ---- 阶段实现 ----
+
+    def _create(self):
+        if self.python_path:
+            _run([self.python_path, '-m', 'venv', '--without-pip',
+                  '--symlinks' if self.symlinks else '--copies', self.venv_path])
+        else:
+            venv.create(self.venv_path, with_pip=False, symlinks=self.symlinks)
+        return '符号链接' if self.symlinks else '复制'
+
+    def _seed(self):
+        cached = [p for p in self.seed_packages if find_cached_wheel(p, self.wheel_dir) is not None]
+        pip_wheel = find_cached_wheel('pip', self.wheel_dir)
+        if pip_wheel is not None:
+            # 直接运行缓存中的 pip wheel 离线安装，不需要 ensurepip
+            try:
+                _run([self.env_python, str(pip_wheel / 'pip'), 'install', '--no-index',
+                      '--find-links', self.wheel_dir, '--disable-pip-version-check', '--quiet',
+                      *cached])
+                base = f'使用本地缓存安装 {", ".join(cached)}'
+            except Exception:
+                # 缓存的 wheel 与目标解释器不兼容时退回 ensurepip
+                cached = []
+                pip_wheel = None
+            if pip_wheel is not None:
+                # 缓存可能已经过时，需要升级时仍然联网升级一次
+                return self._upgrade(base) if self.upgrade else base
+
+        _run([self.env_python, '-m', 'ensurepip', '--default-pip'])
+        if self.upgrade:
+            return self._upgrade('ensurepip')
+
+        # 不升级时不访问网络：其余预装包只从本地缓存安装，缓存中没有的跳过
+        extra = [p for p in cached if p != 'pip']
+        if not extra:
+            return 'ensurepip'
+        try:
+            _run([self.env_python, '-m', 'pip', 'install', '--no-index', '--find-links', self.wheel_dir,
+                  '--disable-pip-version-check', '--quiet', *extra])
+        except Exception as e:
+            return f'ensurepip（从本地缓存安装 {", ".join(extra)} 失败: {e}）'
+        return f'ensurepip，并从本地缓存安装 {", ".join(extra)}'
+
+    def _upgrade(self, base):
+        """把预装的包升级到最新版本（需要联网），失败时保留已安装的版本"""
+        # 升级和安装其余预装包合并为一次 pip 调用
+        try:
+            _run([self.env_python, '-m', 'pip', 'install', '--disable-pip-version-check', '--quiet',
+                  '--upgrade', *self.seed_packages])
+        except Exception as e:
+            return f'{base}（升级 {", ".join(self.seed_packages)} 失败: {e}）'
+        return f'{base}，并升级 {", ".join(self.seed_packages)}'
+
+    def _probe(self, env_python):
+        # 预热解释器探测缓存，之后列表和包管理器可以直接显示版本
+        info = probe_interpreter(env_python)
+        return info['version'] if info else '未知版本'
+
+    def _cache_wheels(self, env_python):
+        # 把预装的包下载到本地缓存，下次创建环境时可以离线安装
+        download_to_cache(env_python, ['--only-binary=:all:', *self.seed_packages], self.wheel_dir)
+        return f'已缓存到 {self.wheel_dir}'
+
+    # ---- 流水线 ----
+
+    def build_stages(self):
+        """生成阶段列表，返回 (必需的顺序阶段, 可并行的后续阶段)"""
+        stages = [Stage('create', '创建环境', self._create, True)]
+        if self.with_pip:
+            stages.append(Stage('seed', '安装pip', self._seed, True))
+
+        post = [Stage('probe', '读取解释器信息', lambda: self._probe(self.env_python), False)]
+        if self.with_pip and self.upgrade:
+            # 每次升级时都刷新缓存，之后离线创建的环境也能用上较新的版本
+            post.append(Stage('cache_wheels', '缓存wheel', lambda: self._cache_wheels(self.env_python), False))
+        for name, label, func in self.post_steps:
+            post.append(Stage(name, label, (lambda f=func: f(self.env_python)), False))
+        return stages, post
+
+    def _run_stage(self, stage):
+        start = time.perf_counter()
+        try:
+            message = stage.func() or ''
+            ok = True
+        except Exception as e:
+            message = str(e)
+            ok = False
+        return StageResult(stage.name, stage.label, time.perf_counter() - start, ok, message)
+
+    def run(self):
+        """执行流水线，返回 [StageResult]；必需阶段失败时抛出 PipelineError"""
+        stages, post = self.build_stages()
+        total = len(stages) + len(post)
+        results = []
+
+        for i, stage in enumerate(stages):
+            self.progress(int(i * 90 / total) + 5, f"正在{stage.label}...")
+            result = self._run_stage(stage)
+            results.append(result)
+            if not result.ok and stage.required:
+                raise PipelineError(f"{stage.label}失败: {result.message}", results)
+
+        if post:
+            self.progress(int(len(stages) * 90 / total) + 5, "正在执行后续步骤...")
+            if self.parallel and len(post) > 1:
+                with ThreadPoolExecutor(max_workers=len(post)) as executor:
+                    results.extend(executor.map(self._run_stage, post))
+            else:
+                results.extend(self._run_stage(stage) for stage in post)
+
+        return results
+
+
+def format_stage_times(results):
+    """格式化各阶段耗时"""
+    lines = []
+    for r in results:
+        status = '' if r.ok else ' (失败)'
+        detail = f" - {r.message}" if r.message else ''
+        lines.append(f"{r.label}: {r.duration:.2f} 秒{status}{detail}")
+    lines.append(f"总计: {sum(r.duration for r in results):.2f} 秒")
+    return '\n'.join(lines)
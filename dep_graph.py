@@ -0,0 +1,177 @@
+"""虚拟环境内的依赖关系图
+
+直接读取已安装发行包的 Requires-Dist（egg-info 读取 requires.txt），
+按目标解释器的环境标记求值后建立正向和反向邻接表。构建只需读取元数据
+头部，之后"谁依赖 X"、"哪些包没有被依赖"等查询都是字典查找。
+"""
+import os
+from collections import deque
+
+from dist_metadata import (Requirement, InvalidRequirement, canonicalize_name,
+                           iter_distributions, read_metadata, python_executable)
+from interpreter_probe import probe_interpreter, marker_environment
+
+# 安装工具本身，计算孤立包时默认排除
+BOOTSTRAP_PACKAGES = ('pip', 'setuptools', 'wheel')
+
+
+def _read_requires_txt(dist_path):
+    """读取 egg-info/requires.txt，转换为 Requires-Dist 格式的字符串列表"""
+    requires = []
+    section = None
+    try:
+        with open(os.path.join(dist_path, 'requires.txt'), 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('[') and line.endswith(']'):
+                    section = line[1:-1]
+                    continue
+                if section is None:
+                    requires.append(line)
+                    continue
+                # [extra:marker] / [:marker] / [extra]
+                extra, _, marker = section.partition(':')
+                markers = []
+                if extra:
+                    markers.append(f'extra == "{extra}"')
+                if marker:
+                    markers.append(f'({marker})')
+                requires.append(f"{line} ; {' and '.join(markers)}")
+    except OSError:
+        pass
+    return requires
+
+
+def _evaluate(req, env, extra=''):
+    """在给定环境（及 extra）下对依赖的环境标记求值"""
+    if req.marker is None:
+        return True
+    if env is None:
+        # 没有解释器信息时只排除 extra 依赖
+        return 'extra' not in str(req.marker)
+    try:
+        return req.marker.evaluate({**env, 'extra': extra})
+    except Exception:
+        return True
+
+
+class DependencyGraph:
+    """已安装包的依赖关系图
+
+    Args:
+        packages: {规范化包名: (显示名称, 版本)}
+        requirements: {规范化包名: [Requirement]}，该包的全部 Requires-Dist
+        marker_env: 环境标记变量，None 时不按平台过滤（只排除 extra 依赖）
+    """
+
+    def __init__(self, packages, requirements, marker_env=None):
+        self.packages = packages
+        self.marker_env = marker_env
+        self.requires = {name: set() for name in packages}
+        self.required_by = {name: set() for name in packages}
+        # 已声明但未安装的依赖 {包名: {缺失的依赖名}}
+        self.missing = {}
+
+        for name, reqs in requirements.items():
+            for req in reqs:
+                if not _evaluate(req, marker_env):
+                    continue
+                self._add_edge(name, req, requirements)
+
+    def _add_edge(self, name, req, requirements):
+        dep = canonicalize_name(req.name)
+        if dep == name:
+            return
+        if dep not in self.packages:
+            self.missing.setdefault(name, set()).add(dep)
+            return
+        self.requires[name].add(dep)
+        self.required_by[dep].add(name)
+        # 依赖带 extras 时（如 requests[socks]），extra 对应的依赖也记在请求方名下
+        for extra in req.extras:
+            for extra_req in requirements.get(dep, []):
+                if extra_req.marker is not None and _evaluate(extra_req, self.marker_env, extra) \
+                        and not _evaluate(extra_req, self.marker_env):
+                    extra_dep = canonicalize_name(extra_req.name)
+                    if extra_dep in self.packages and extra_dep != name:
+                        self.requires[name].add(extra_dep)
+                        self.required_by[extra_dep].add(name)
+
+    @classmethod
+    def from_venv(cls, venv_path, marker_env=None):
+        """从虚拟环境的安装元数据构建依赖图
+
+        Args:
+            venv_path: 虚拟环境路径
+            marker_env: 可选，环境标记变量；默认探测虚拟环境的解释器获取
+        """
+        if marker_env is None:
+            marker_env = marker_environment(probe_interpreter(python_executable(venv_path)))
+
+        packages = {}
+        requirements = {}
+        for dist in iter_distributions(venv_path):
+            if dist.name in packages:
+                continue
+            packages[dist.name] = (dist.display_name, dist.version)
+            if dist.path.endswith('.dist-info'):
+                lines = (read_metadata(dist.path) or {}).get('requires-dist', [])
+            else:
+                lines = _read_requires_txt(dist.path)
+            reqs = []
+            for line in lines:
+                try:
+                    reqs.append(Requirement(line))
+                except InvalidRequirement:
+                    continue
+            requirements[dist.name] = reqs
+        return cls(packages, requirements, marker_env)
+
+    def display_name(self, name):
+        name = canonicalize_name(name)
+        return self.packages.get(name, (name, ''))[0]
+
+    def _walk(self, name, edges, recursive):
+        name = canonicalize_name(name)
+        if not recursive:
+            return set(edges.get(name, ()))
+        seen = set()
+        queue = deque(edges.get(name, ()))
+        while queue:
+            current = queue.popleft()
+            if current in seen or current == name:
+                continue
+            seen.add(current)
+            queue.extend(edges.get(current, ()))
+        return seen
+
+    def dependencies(self, name, recursive=False):
+        """X 依赖哪些包"""
+        return self._walk(name, self.requires, recursive)
+
+    def dependents(self, name, recursive=False):
+        """哪些包依赖 X"""
+        return self._walk(name, self.required_by, recursive)
+
+    def orphans(self, exclude=BOOTSTRAP_PACKAGES):
+        """没有被任何包依赖的包（通常是手动安装的顶层包）"""
+        return sorted(name for name, deps in self.required_by.items()
+                      if not deps and name not in exclude)
+
+    def removable_with(self, name):
+        """卸载 X 之后不再被任何包需要的依赖（不含安装工具）"""
+        name = canonicalize_name(name)
+        removed = {name}
+        changed = True
+        while changed:
+            changed = False
+            for dep in self.dependencies(name, recursive=True):
+                if dep in removed or dep in BOOTSTRAP_PACKAGES:
+                    continue
+                if self.required_by[dep] <= removed:
+                    removed.add(dep)
+                    changed = True
+        removed.discard(name)
+        return sorted(removed)
@@ -0,0 +1,249 @@
+"""直接读取虚拟环境 site-packages 中的安装元数据
+
+不启动解释器、不调用 pip，只解析 *.dist-info / *.egg-info 目录，
+供包索引、环境对比等需要批量读取多个环境的功能使用。
+"""
+import json
+import os
+import re
+from collections import namedtuple
+from pathlib import Path
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.specifiers import SpecifierSet, InvalidSpecifier
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    # 未安装 packaging 时使用 pip 自带的副本
+    from pip._vendor.packaging.requirements import Requirement, InvalidRequirement
+    from pip._vendor.packaging.specifiers import SpecifierSet, InvalidSpecifier
+    from pip._vendor.packaging.version import Version, InvalidVersion
+
+
+# 已安装的发行包
+# name: 规范化包名, display_name: 元数据中的原始包名, path: dist-info 目录,
+# location: 所在 site-packages, mtime: dist-info 目录修改时间, size: 安装大小（字节，未计算时为 None）
+DistInfo = namedtuple('DistInfo', 'name display_name version path location mtime size')
+
+_NORMALIZE_RE = re.compile(r'[-_.]+')
+
+
+def canonicalize_name(name):
+    """按 PEP 503 规范化包名"""
+    return _NORMALIZE_RE.sub('-', name).lower()
+
+
+def format_size(total_size):
+    """把字节数转换为易读的大小字符串"""
+    units = ['B', 'KB', 'MB', 'GB']
+    size = float(total_size)
+    unit_index = 0
+
+    while size >= 1024 and unit_index < len(units) - 1:
+        size /= 1024
+        unit_index += 1
+
+    return f"{size:.1f} {units[unit_index]}"
+
+
+def python_executable(venv_path):
+    """获取虚拟环境中的Python解释器路径"""
+    venv_path = Path(venv_path)
+    if os.name == 'nt':
+        return venv_path / 'Scripts' / 'python.exe'
+    return venv_path / 'bin' / 'python'
+
+
+def find_site_packages(venv_path):
+    """查找虚拟环境中的 site-packages 目录"""
+    venv_path = Path(venv_path)
+    if os.name == 'nt':
+        candidates = [venv_path / 'Lib' / 'site-packages']
+    else:
+        candidates = []
+        for lib in ('lib', 'lib64'):
+            lib_dir = venv_path / lib
+            try:
+                with os.scandir(lib_dir) as it:
+                    for entry in it:
+                        if entry.name.startswith('python') and entry.is_dir():
+                            candidates.append(Path(entry.path) / 'site-packages')
+            except OSError:
+                continue
+
+    result = []
+    seen = set()
+    for path in candidates:
+        try:
+            real = os.path.realpath(path)
+        except OSError:
+            continue
+        # lib64 通常是指向 lib 的符号链接，去掉重复项
+        if real in seen or not os.path.isdir(real):
+            continue
+        seen.add(real)
+        result.append(path)
+    return result
+
+
+def read_pyvenv_cfg(venv_path):
+    """读取 pyvenv.cfg，返回键值字典"""
+    cfg = {}
+    try:
+        with open(Path(venv_path) / 'pyvenv.cfg', 'r', encoding='utf-8') as f:
+            for line in f:
+                if '=' in line:
+                    key, value = line.split('=', 1)
+                    cfg[key.strip().lower()] = value.strip()
+    except OSError:
+        pass
+    return cfg
+
+
+def read_metadata(dist_path, stop_at_body=True):
+    """解析 METADATA / PKG-INFO 的头部字段
+
+    只读取头部（遇到第一个空行即停止），长描述不会被读入内存。
+    可重复的字段（如 Requires-Dist）以列表形式返回。
+    """
+    dist_path = Path(dist_path)
+    meta_file = dist_path / ('METADATA' if dist_path.suffix == '.dist-info' else 'PKG-INFO')
+    headers = {}
+    multi = ('requires-dist', 'provides-extra', 'classifier')
+    try:
+        with open(meta_file, 'r', encoding='utf-8', errors='replace') as f:
+            key = None
+            for line in f:
+                if line in ('\n', '\r\n'):
+                    if stop_at_body:
+                        break
+                    continue
+                if line[0] in ' \t' and key:
+                    # 折行的字段值
+                    continue
+                if ':' not in line:
+                    continue
+                key, value = line.split(':', 1)
+                key = key.strip().lower()
+                value = value.strip()
+                if key in multi:
+                    headers.setdefault(key, []).append(value)
+                else:
+                    headers.setdefault(key, value)
+    except OSError:
+        return None
+    return headers
+
+
+def distribution_size(dist_path, location):
+    """根据 RECORD 计算发行包的安装大小（字节）"""
+    record = Path(dist_path) / 'RECORD'
+    total = 0
+    try:
+        with open(record, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                parts = line.rstrip('\r\n').rsplit(',', 2)
+                if len(parts) != 3:
+                    continue
+                rel_path, _, size = parts
+                if size:
+                    try:
+                        total += int(size)
+                        continue
+                    except ValueError:
+                        pass
+                # RECORD 未记录大小（如 .pyc），退回到 stat
+                try:
+                    total += os.stat(os.path.join(location, rel_path)).st_size
+                except OSError:
+                    pass
+    except OSError:
+        return 0
+    return total
+
+
+def _parse_dist_dir_name(entry_name):
+    """从 dist-info/egg-info 目录名中解析包名和版本（元数据缺失时的后备）"""
+    stem = entry_name.rsplit('.', 1)[0]
+    name, _, version = stem.partition('-')
+    return name, version.split('-py')[0]
+
+
+def iter_distributions(venv_path, with_size=False, known_mtimes=None):
+    """遍历虚拟环境中已安装的发行包
+
+    Args:
+        venv_path: 虚拟环境路径
+        with_size: 是否通过 RECORD 计算安装大小
+        known_mtimes: 可选，{dist-info路径: mtime}；修改时间未变的条目以
+            version=None 的 DistInfo 返回，调用方可沿用旧记录
+    """
+    for location in find_site_packages(venv_path):
+        try:
+            entries = list(os.scandir(location))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.name.endswith(('.dist-info', '.egg-info')):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+                if not entry.is_dir():
+                    continue
+            except OSError:
+                continue
+
+            if known_mtimes is not None and known_mtimes.get(entry.path) == mtime:
+                yield DistInfo(None, None, None, entry.path, str(location), mtime, None)
+                continue
+
+            headers = read_metadata(entry.path) or {}
+            fallback_name, fallback_version = _parse_dist_dir_name(entry.name)
+            display_name = headers.get('name') or fallback_name
+            version = headers.get('version') or fallback_version
+            size = distribution_size(entry.path, location) if with_size else None
+            yield DistInfo(canonicalize_name(display_name), display_name, version,
+                           entry.path, str(location), mtime, size)
+
+
+def freeze_requirement(dist):
+    """生成与 pip freeze 相同格式的依赖行
+
+    普通安装输出 "name==version"；根据 PEP 610 的 direct_url.json，
+    可编辑安装输出 "-e url"，直接从 URL / VCS 安装输出 "name @ url"。
+    """
+    try:
+        with open(os.path.join(dist.path, 'direct_url.json'), 'r', encoding='utf-8') as f:
+            direct_url = json.load(f)
+    except (OSError, ValueError):
+        return f"{dist.display_name}=={dist.version}"
+
+    url = direct_url.get('url', '')
+    if direct_url.get('dir_info', {}).get('editable'):
+        return f"-e {url}"
+    vcs_info = direct_url.get('vcs_info')
+    if vcs_info:
+        url = f"{vcs_info.get('vcs', 'git')}+{url}@{vcs_info.get('commit_id', '')}"
+    if not url:
+        return f"{dist.display_name}=={dist.version}"
+    return f"{dist.display_name} @ {url}"
+
+
+def parse_query(text):
+    """解析形如 "numpy<2" 的查询，返回 (规范化包名, SpecifierSet)"""
+    text = text.strip()
+    try:
+        req = Requirement(text)
+    except InvalidRequirement as e:
+        raise ValueError(f"无效的查询: {text} ({e})")
+    return canonicalize_name(req.name), req.specifier
+
+
+def version_matches(version, specifier):
+    """判断版本号是否满足版本约束（包括预发布版本）"""
+    if not specifier:
+        return True
+    try:
+        return specifier.contains(Version(version), prereleases=True)
+    except InvalidVersion:
+        return False
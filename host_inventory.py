@@ -0,0 +1,303 @@
+"""可合并的多主机环境清单
+
+把本机所有虚拟环境及其中的包导出为一个带版本号的 SQLite 文件，多台机器
+导出的文件可以合并成一个索引，查询"哪些机器上的哪些环境装了 numpy<2"。
+
+导出文件和合并后的索引使用同一种格式：
+
+- hosts:         每台主机一行（主机名、导出时间、平台）
+- venvs:         每个环境一行，属于某台主机
+- packages:      (包名, 版本) 只保存一次，所有主机、所有环境共用
+- venv_packages: 环境与包的对应关系（附带安装大小）
+
+合并时按主机名去重，同一主机只保留导出时间最新的数据；相同的包记录在
+各主机之间只存一份，几十台机器上的上千个环境合并后仍然很小。
+"""
+import os
+import platform
+import socket
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+from dist_metadata import iter_distributions, python_executable, parse_query, version_matches
+from interpreter_probe import interpreter_version
+
+INVENTORY_FORMAT_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    exported_at REAL,
+    platform TEXT
+);
+CREATE TABLE IF NOT EXISTS venvs (
+    id INTEGER PRIMARY KEY,
+    host_id INTEGER NOT NULL REFERENCES hosts (id),
+    path TEXT NOT NULL,
+    python_version TEXT,
+    UNIQUE (host_id, path)
+);
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    display_name TEXT,
+    version TEXT,
+    UNIQUE (name, version)
+);
+CREATE TABLE IF NOT EXISTS venv_packages (
+    venv_id INTEGER NOT NULL REFERENCES venvs (id),
+    package_id INTEGER NOT NULL REFERENCES packages (id),
+    size INTEGER,
+    PRIMARY KEY (venv_id, package_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_inventory_packages_name ON packages (name);
+CREATE INDEX IF NOT EXISTS idx_inventory_venv_packages_package ON venv_packages (package_id);
+"""
+
+# 查询结果: 主机名, 虚拟环境路径, 包名, 版本, 大小（字节）
+HostPackage = namedtuple('HostPackage', 'host venv name version size')
+# 环境概况: 主机名, 虚拟环境路径, Python版本, 包数量
+HostVenv = namedtuple('HostVenv', 'host venv python_version package_count')
+
+
+def _connect(path):
+    # 以 URI 方式打开，ATTACH 时才能使用 mode=ro 的 URI
+    conn = sqlite3.connect(Path(path).absolute().as_uri(), uri=True, timeout=30)
+    conn.executescript(_SCHEMA)
+    version = conn.execute("SELECT value FROM meta WHERE key = 'format_version'").fetchone()
+    if version is None:
+        conn.execute("INSERT INTO meta (key, value) VALUES ('format_version', ?)",
+                     (str(INVENTORY_FORMAT_VERSION),))
+        conn.commit()
+    elif int(version[0]) > INVENTORY_FORMAT_VERSION:
+        conn.close()
+        raise Exception(f"{path} 的格式版本 {version[0]} 高于当前支持的版本 {INVENTORY_FORMAT_VERSION}")
+    return conn
+
+
+def _readonly_uri(path):
+    return Path(path).absolute().as_uri() + '?mode=ro'
+
+
+def _open_readonly(path):
+    """以只读方式打开已有的清单文件，不是清单或版本过高时抛出异常（不会写入文件）"""
+    if not Path(path).is_file():
+        raise Exception(f"清单文件 {path} 不存在")
+    conn = sqlite3.connect(_readonly_uri(path), uri=True, timeout=30)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not {'meta', 'hosts', 'venvs', 'packages', 'venv_packages'} <= tables:
+            raise Exception(f"{path} 不是环境清单文件")
+        version = conn.execute("SELECT value FROM meta WHERE key = 'format_version'").fetchone()
+        if version is None:
+            raise Exception(f"{path} 不是环境清单文件")
+        if int(version[0]) > INVENTORY_FORMAT_VERSION:
+            raise Exception(f"{path} 的格式版本 {version[0]} 高于当前支持的版本 {INVENTORY_FORMAT_VERSION}")
+    except sqlite3.DatabaseError:
+        conn.close()
+        raise Exception(f"{path} 不是环境清单文件")
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def _read_venv(venv_path):
+    dists = list(iter_distributions(venv_path, with_size=True))
+    return interpreter_version(python_executable(venv_path), ''), dists
+
+
+def _package_ids(conn, rows):
+    """批量取得 (包名, 版本) 对应的 id，不存在的先插入"""
+    conn.executemany('INSERT OR IGNORE INTO packages (name, display_name, version) VALUES (?, ?, ?)', rows)
+    ids = {}
+    for name, _, version in rows:
+        key = (name, version)
+        if key not in ids:
+            ids[key] = conn.execute('SELECT id FROM packages WHERE name = ? AND version IS ?',
+                                    key).fetchone()[0]
+    return ids
+
+
+def _replace_host(conn, name, exported_at, platform_name):
+    """删除主机原有的数据并重新登记，返回主机 id"""
+    row = conn.execute('SELECT id FROM hosts WHERE name = ?', (name,)).fetchone()
+    if row is not None:
+        conn.execute('DELETE FROM venv_packages WHERE venv_id IN (SELECT id FROM venvs WHERE host_id = ?)',
+                     (row[0],))
+        conn.execute('DELETE FROM venvs WHERE host_id = ?', (row[0],))
+        conn.execute('UPDATE hosts SET exported_at = ?, platform = ? WHERE id = ?',
+                     (exported_at, platform_name, row[0]))
+        return row[0]
+    return conn.execute('INSERT INTO hosts (name, exported_at, platform) VALUES (?, ?, ?)',
+                        (name, exported_at, platform_name)).lastrowid
+
+
+def _prune_packages(conn):
+    conn.execute('DELETE FROM packages WHERE id NOT IN (SELECT DISTINCT package_id FROM venv_packages)')
+
+
+def export_inventory(venv_paths, dest, host=None, max_workers=8, progress=None, is_cancelled=None):
+    """导出本机的环境清单
+
+    Args:
+        venv_paths: 虚拟环境路径列表
+        dest: 目标 SQLite 文件（已存在时覆盖）
+        host: 主机名，默认为本机名
+        max_workers: 并行读取元数据的线程数
+        progress: 可选回调 progress(已完成数, 总数)
+        is_cancelled: 可选回调，返回 True 时停止导出（不会生成目标文件）
+
+    Returns:
+        tuple: (导出的环境数, {虚拟环境路径: 错误信息})
+    """
+    dest = Path(dest)
+    host = host or socket.gethostname()
+    venv_paths = [str(p) for p in venv_paths]
+    tmp = dest.with_name(dest.name + '.tmp')
+    if tmp.exists():
+        os.remove(tmp)
+    errors = {}
+    exported = 0
+    try:
+        with closing(_connect(tmp)) as conn, \
+                ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(venv_paths) or 1))) as executor:
+            host_id = _replace_host(conn, host, time.time(), platform.platform())
+            futures = [(venv, executor.submit(_read_venv, venv)) for venv in venv_paths]
+            for done, (venv, future) in enumerate(futures, 1):
+                if is_cancelled and is_cancelled():
+                    for _, f in futures:
+                        f.cancel()
+                    break
+                try:
+                    python_version, dists = future.result()
+                except Exception as e:
+                    errors[venv] = str(e)
+                    continue
+                venv_id = conn.execute('INSERT INTO venvs (host_id, path, python_version) VALUES (?, ?, ?)',
+                                       (host_id, venv, python_version)).lastrowid
+                ids = _package_ids(conn, [(d.name, d.display_name, d.version) for d in dists])
+                conn.executemany('INSERT OR IGNORE INTO venv_packages (venv_id, package_id, size) VALUES (?, ?, ?)',
+                                 [(venv_id, ids[(d.name, d.version)], d.size) for d in dists])
+                exported += 1
+                if progress:
+                    progress(done, len(venv_paths))
+            conn.commit()
+        if is_cancelled and is_cancelled():
+            os.remove(tmp)
+        else:
+            os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return exported, errors
+
+
+def merge_inventories(sources, dest, progress=None):
+    """把多个清单文件合并到 dest（不存在时新建）
+
+    同一主机出现多次时保留导出时间最新的一份；包记录按 (包名, 版本) 去重。
+
+    Returns:
+        dict: 统计信息（hosts 合并的主机数, skipped 因较旧而跳过的主机数, venvs, packages）
+    """
+    merged = skipped = 0
+    sources = [s for s in sources if not (Path(s).exists() and Path(s).resolve() == Path(dest).resolve())]
+    # 先检查所有来源都是清单文件；已有的目标文件也必须是清单，避免把清单表写进无关的数据库
+    for source in sources:
+        _open_readonly(source).close()
+    if Path(dest).is_file() and os.path.getsize(dest):
+        _open_readonly(dest).close()
+    with closing(_connect(dest)) as conn:
+        for done, source in enumerate(sources, 1):
+            # 以只读方式附加，合并不会修改来源文件
+            conn.execute('ATTACH DATABASE ? AS src', (_readonly_uri(source),))
+            try:
+                for host_id, name, exported_at, platform_name in conn.execute(
+                        'SELECT id, name, exported_at, platform FROM src.hosts').fetchall():
+                    current = conn.execute('SELECT exported_at FROM hosts WHERE name = ?', (name,)).fetchone()
+                    if current is not None and (current[0] or 0) >= (exported_at or 0):
+                        skipped += 1
+                        continue
+                    new_host = _replace_host(conn, name, exported_at, platform_name)
+                    conn.execute('INSERT OR IGNORE INTO packages (name, display_name, version) '
+                                 'SELECT p.name, p.display_name, p.version FROM src.packages p '
+                                 'WHERE p.id IN (SELECT vp.package_id FROM src.venv_packages vp '
+                                 'JOIN src.venvs v ON v.id = vp.venv_id WHERE v.host_id = ?)', (host_id,))
+                    for venv_id, path, python_version in conn.execute(
+                            'SELECT id, path, python_version FROM src.venvs WHERE host_id = ?', (host_id,)).fetchall():
+                        new_venv = conn.execute('INSERT INTO venvs (host_id, path, python_version) VALUES (?, ?, ?)',
+                                                (new_host, path, python_version)).lastrowid
+                        conn.execute('INSERT INTO venv_packages (venv_id, package_id, size) '
+                                     'SELECT ?, p.id, vp.size FROM src.venv_packages vp '
+                                     'JOIN src.packages sp ON sp.id = vp.package_id '
+                                     'JOIN packages p ON p.name = sp.name AND p.version IS sp.version '
+                                     'WHERE vp.venv_id = ?', (new_venv, venv_id))
+                    merged += 1
+                _prune_packages(conn)
+                conn.commit()
+            finally:
+                conn.execute('DETACH DATABASE src')
+            if progress:
+                progress(done, len(sources))
+        venvs = conn.execute('SELECT COUNT(*) FROM venvs').fetchone()[0]
+        packages = conn.execute('SELECT COUNT(*) FROM packages').fetchone()[0]
+        conn.execute('VACUUM')
+    return {'hosts': merged, 'skipped': skipped, 'venvs': venvs, 'packages': packages}
+
+
+class HostInventory:
+    """合并后的多主机清单（只读查询）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        _open_readonly(self.path).close()
+
+    def _connect(self):
+        return _open_readonly(self.path)
+
+    def hosts(self):
+        """[(主机名, 导出时间, 平台, 环境数)]"""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                'SELECT h.name, h.exported_at, h.platform, COUNT(v.id) FROM hosts h '
+                'LEFT JOIN venvs v ON v.host_id = h.id GROUP BY h.id ORDER BY h.name').fetchall()
+
+    def venvs(self, host=None):
+        """环境概况列表，可按主机筛选"""
+        sql = ('SELECT h.name, v.path, v.python_version, COUNT(vp.package_id) FROM venvs v '
+               'JOIN hosts h ON h.id = v.host_id LEFT JOIN venv_packages vp ON vp.venv_id = v.id ')
+        params = ()
+        if host:
+            sql += 'WHERE h.name = ? '
+            params = (host,)
+        sql += 'GROUP BY v.id ORDER BY h.name, v.path'
+        with closing(self._connect()) as conn:
+            return [HostVenv(*row) for row in conn.execute(sql, params)]
+
+    def query(self, text, host=None):
+        """查询安装了指定包的环境（语法同包查询，如 "numpy<2"）"""
+        name, specifier = parse_query(text)
+        sql = ('SELECT h.name, v.path, p.display_name, p.version, vp.size FROM packages p '
+               'JOIN venv_packages vp ON vp.package_id = p.id JOIN venvs v ON v.id = vp.venv_id '
+               'JOIN hosts h ON h.id = v.host_id WHERE p.name = ? ')
+        params = [name]
+        if host:
+            sql += 'AND h.name = ? '
+            params.append(host)
+        sql += 'ORDER BY h.name, v.path'
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [HostPackage(*row) for row in rows if version_matches(row[3], specifier)]
@@ -0,0 +1,426 @@
+"""后台索引服务
+
+可选的常驻进程，持有虚拟环境列表和跨环境包索引，通过本地套接字以
+JSON-RPC 2.0（每行一个 JSON）提供查询。界面和命令行检测到服务在运行时
+直接向它查询，多个窗口、多次启动不再各自重复扫描和读取元数据。
+
+- 传输: 支持 AF_UNIX 的平台使用 ~/.venv_manager/indexer.sock（权限 0600）；
+  否则（Windows）监听 127.0.0.1 的随机端口，请求需携带令牌。
+  连接信息写在 ~/.venv_manager/indexer.json 中，只有当前用户可读。
+- 监视: 定期检查各根目录、第一级子目录以及已知环境所在目录的修改时间，
+  有变化或超过 RESCAN_INTERVAL 时重新扫描；客户端在刷新列表或修改环境后
+  以 rescan=True 请求时立即重新扫描；已知环境的 site-packages 修改时间变化时
+  增量刷新包索引（PackageIndex，与包查询对话框共用同一个数据库）。
+
+启动: python cli.py daemon
+"""
+import inspect
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from app_paths import APP_DATA_DIR
+from inventory_cache import load_inventory
+from package_index import PackageIndex
+from scanner import VenvScanner
+from venv_details import load_details
+from log_setup import get_logger
+
+logger = get_logger('indexer')
+
+PROTOCOL_VERSION = 1
+ENDPOINT_FILE = APP_DATA_DIR / 'indexer.json'
+SOCKET_PATH = APP_DATA_DIR / 'indexer.sock'
+POLL_INTERVAL = 2.0       # 检查根目录和 site-packages 变化的间隔（秒）
+RESCAN_INTERVAL = 300.0   # 没有检测到变化时也重新扫描的间隔（秒），覆盖较深层目录的变化
+CONNECT_TIMEOUT = 0.5     # 客户端连接超时（秒）
+CALL_TIMEOUT = 120.0      # 单次调用超时（首次扫描大目录可能较慢）
+MAX_LINE = 16 * 1024 * 1024
+
+# 根目录的扫描状态: 扫描结果 [(相对路径, Python版本)], 扫描时间, 目录签名
+RootState = namedtuple('RootState', 'results scanned_at signature')
+
+
+class RpcError(Exception):
+    """服务端返回的错误"""
+
+
+def _use_unix_socket():
+    return hasattr(socket, 'AF_UNIX') and os.name != 'nt'
+
+
+def _root_signature(root, results=()):
+    """根目录、第一级子目录和已知环境所在目录的修改时间
+
+    在这些目录中新建、删除环境时签名会变化；更深的新目录由 RESCAN_INTERVAL 兜底。
+    """
+    children = []
+    try:
+        root_mtime = os.stat(root).st_mtime
+        with os.scandir(root) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        children.append((entry.name, entry.stat(follow_symlinks=False).st_mtime))
+                except OSError:
+                    continue
+    except OSError:
+        return None
+    parents = []
+    for parent in sorted({os.path.dirname(rel_path) for rel_path, _ in results} - {''}):
+        try:
+            parents.append((parent, os.stat(os.path.join(root, parent)).st_mtime))
+        except OSError:
+            parents.append((parent, None))
+    return root_mtime, tuple(sorted(children)), tuple(parents)
+
+
+class IndexerDaemon:
+    """索引服务的状态与 RPC 方法实现（与传输层无关）"""
+
+    def __init__(self, roots=(), scan_depth=5, max_threads=32, adaptive=True,
+                 poll_interval=POLL_INTERVAL, rescan_interval=RESCAN_INTERVAL, index=None):
+        self.scan_depth = scan_depth
+        self.max_threads = max_threads
+        self.adaptive = adaptive
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.index = index or PackageIndex()
+        self.started = time.time()
+        self._roots = {}                  # {(根目录, 扫描深度): RootState}
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()  # 同一时间只进行一次扫描
+        self._stop = threading.Event()
+        self._initial_roots = [str(r) for r in roots]
+        self._watcher = None
+
+    # ---- 扫描与监视 ----
+
+    def _scan(self, root, depth):
+        """扫描一个根目录并保存结果"""
+        scanner = VenvScanner([Path(root)], depth, self.max_threads, adaptive=self.adaptive)
+        results = sorted((r.rel_path, r.python_version) for r in scanner.iter_scan())
+        state = RootState(results, time.time(), _root_signature(root, results))
+        with self._lock:
+            self._roots[(root, depth)] = state
+        logger.info(f"已扫描 {root}: {len(results)} 个虚拟环境，用时 {scanner.summary.duration:.2f} 秒")
+        return state
+
+    def _get_root(self, root, depth, rescan=False):
+        key = (str(root), depth)
+        with self._lock:
+            state = self._roots.get(key)
+        if state is not None and not rescan:
+            return state
+        with self._scan_lock:
+            # 等待期间可能已经被其他请求扫描过
+            with self._lock:
+                current = self._roots.get(key)
+            if current is not None and current is not state:
+                return current
+            if rescan:
+                # 同一根目录其他扫描深度的结果同样过期，下次请求时重新扫描
+                self.invalidate([key[0]])
+            return self._scan(*key)
+
+    def venv_paths(self):
+        with self._lock:
+            states = list(self._roots.items())
+        paths = set()
+        for (root, _), state in states:
+            paths.update(str(Path(root, rel_path)) for rel_path, _ in state.results)
+        return sorted(paths)
+
+    def _refresh_index(self):
+        paths = self.venv_paths()
+        if not paths:
+            return  # 还没有扫描结果时不刷新，避免清空索引
+        stats = self.index.refresh(paths, max_workers=min(self.max_threads, 8))
+        if stats['scanned']:
+            logger.info(f"包索引已更新: 重新读取 {stats['scanned']} 个环境")
+
+    def poll_once(self):
+        """检查一次变化：目录签名变化或超过重新扫描间隔的根目录重新扫描，然后刷新包索引"""
+        now = time.time()
+        with self._lock:
+            states = list(self._roots.items())
+        for (root, depth), state in states:
+            if self.stopped:
+                return
+            if now - state.scanned_at > self.rescan_interval or \
+                    _root_signature(root, state.results) != state.signature:
+                self._get_root(root, depth, rescan=True)
+        self._refresh_index()
+
+    def _watch(self):
+        for root in self._initial_roots:
+            try:
+                self._get_root(root, self.scan_depth)
+            except Exception as e:
+                logger.warning(f"扫描失败: {root}, 错误: {e}")
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("检查变化失败")
+
+    def start_watcher(self):
+        self._watcher = threading.Thread(target=self._watch, name='indexer-watch', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    # ---- RPC 方法 ----
+
+    def rpc_ping(self):
+        return {'pid': os.getpid(), 'protocol': PROTOCOL_VERSION, 'uptime': time.time() - self.started}
+
+    def rpc_status(self):
+        with self._lock:
+            roots = [{'root': root, 'depth': depth, 'venvs': len(state.results), 'scanned_at': state.scanned_at}
+                     for (root, depth), state in self._roots.items()]
+        return {'pid': os.getpid(), 'started': self.started, 'roots': roots,
+                'venvs': len(self.venv_paths())}
+
+    def invalidate(self, roots=None):
+        """丢弃根目录（默认全部）的扫描结果，下次请求时重新扫描"""
+        roots = None if roots is None else {str(r) for r in roots}
+        with self._lock:
+            for key in [k for k in self._roots if roots is None or k[0] in roots]:
+                del self._roots[key]
+
+    def rpc_list_venvs(self, roots=None, depth=None, rescan=False):
+        """列出根目录下的虚拟环境，尚未扫描过的根目录当场扫描
+
+        rescan 为 True 时忽略已有结果重新扫描（客户端手动刷新或修改了环境之后）。
+        """
+        depth = depth or self.scan_depth
+        venvs = []
+        for root in roots or self._initial_roots:
+            state = self._get_root(str(root), depth, rescan)
+            venvs.extend({'root': str(root), 'rel_path': rel_path, 'python_version': version}
+                         for rel_path, version in state.results)
+        return venvs
+
+    def rpc_packages(self, venv):
+        """虚拟环境中已安装的包（按 site-packages 修改时间缓存）"""
+        inventory = load_inventory(venv)
+        return [{'name': d.name, 'display_name': d.display_name, 'version': d.version, 'size': d.size}
+                for d in inventory.packages]
+
+    def rpc_details(self, venv):
+        return load_details(venv)._asdict()
+
+    def rpc_query(self, text):
+        """查询安装了指定包的虚拟环境（先增量刷新包索引）"""
+        self._refresh_index()
+        try:
+            return [pkg._asdict() for pkg in self.index.query(text)]
+        except ValueError as e:
+            raise RpcError(str(e))
+
+    def rpc_invalidate(self, roots=None):
+        """客户端移动、删除环境后通知服务丢弃相关根目录的结果"""
+        self.invalidate(roots)
+        return True
+
+    def rpc_shutdown(self):
+        self.stop()
+        return True
+
+    def handler(self, method):
+        """RPC 方法名对应的处理函数，不存在时返回 None"""
+        if not isinstance(method, str) or not method.isidentifier():
+            return None
+        return getattr(self, f'rpc_{method}', None)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """逐行读取 JSON-RPC 请求并写回响应，一个连接可以发送多个请求"""
+
+    def handle(self):
+        server = self.server
+        while True:
+            line = self.rfile.readline(MAX_LINE)
+            if not line:
+                return
+            response = self._handle_line(server, line)
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if server.daemon_state.stopped:
+                threading.Thread(target=server.shutdown, daemon=True).start()
+                return
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+    def _handle_line(self, server, line):
+        # 先校验请求本身，只有这些检查对应协议错误码；处理函数内部的异常一律为 -32000
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return self._error(None, -32700, '无法解析请求')
+        if not isinstance(request, dict):
+            return self._error(None, -32600, '请求必须是 JSON 对象')
+        request_id = request.get('id')
+        if server.token and not secrets.compare_digest(str(request.get('token', '')), server.token):
+            return self._error(request_id, -32001, '令牌无效')
+        if 'method' not in request:
+            return self._error(request_id, -32600, '请求缺少 method')
+        method = request['method']
+        handler = server.daemon_state.handler(method)
+        if handler is None:
+            return self._error(request_id, -32601, f'未知方法: {method}')
+        params = request.get('params') or {}
+        try:
+            if isinstance(params, dict):
+                inspect.signature(handler).bind(**params)
+            elif isinstance(params, list):
+                inspect.signature(handler).bind(*params)
+            else:
+                raise TypeError('params 必须是对象或数组')
+        except TypeError as e:
+            return self._error(request_id, -32602, f'参数无效: {e}')
+
+        try:
+            result = handler(**params) if isinstance(params, dict) else handler(*params)
+        except RpcError as e:
+            return self._error(request_id, -32000, str(e))
+        except Exception as e:
+            logger.exception("处理请求失败")
+            return self._error(request_id, -32000, str(e))
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+
+if _use_unix_socket():
+    class _Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    class _Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+
+def _write_endpoint(info):
+    ENDPOINT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ENDPOINT_FILE.with_suffix('.tmp')
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+    os.replace(tmp, ENDPOINT_FILE)
+
+
+def serve(roots=(), scan_depth=5, max_threads=32, adaptive=True, poll_interval=POLL_INTERVAL):
+    """在前台运行索引服务，直到收到 shutdown 请求或被中断"""
+    if connect_indexer() is not None:
+        raise Exception("后台索引服务已在运行")
+    state = IndexerDaemon(roots, scan_depth, max_threads, adaptive, poll_interval)
+    APP_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    if _use_unix_socket():
+        try:
+            os.unlink(SOCKET_PATH)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o077)
+        try:
+            server = _Server(str(SOCKET_PATH), _Handler)
+        finally:
+            os.umask(old_umask)
+        server.token = ''
+        endpoint = {'transport': 'unix', 'address': str(SOCKET_PATH)}
+    else:
+        server = _Server(('127.0.0.1', 0), _Handler)
+        server.token = secrets.token_hex(16)
+        endpoint = {'transport': 'tcp', 'address': list(server.server_address)}
+    server.daemon_state = state
+    _write_endpoint(dict(endpoint, token=server.token, pid=os.getpid(),
+                         protocol=PROTOCOL_VERSION, started=state.started))
+    logger.info(f"后台索引服务已启动: {endpoint['address']}")
+    state.start_watcher()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.stop()
+        server.server_close()
+        for path in (ENDPOINT_FILE, SOCKET_PATH if _use_unix_socket() else None):
+            if path is None:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        logger.info("后台索引服务已停止")
+
+
+class IndexerClient:
+    """索引服务客户端（一个连接，不要在多个线程间共享）"""
+
+    def __init__(self, endpoint, timeout=CALL_TIMEOUT):
+        self.token = endpoint.get('token', '')
+        if endpoint['transport'] == 'unix':
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = endpoint['address']
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = tuple(endpoint['address'])
+        self.sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            self.sock.connect(address)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.settimeout(timeout)
+        self._file = self.sock.makefile('rb')
+        self._next_id = 0
+
+    def call(self, method, **params):
+        self._next_id += 1
+        request = {'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params}
+        if self.token:
+            request['token'] = self.token
+        self.sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        line = self._file.readline(MAX_LINE)
+        if not line:
+            raise RpcError("后台索引服务已断开连接")
+        response = json.loads(line)
+        if 'error' in response:
+            raise RpcError(response['error'].get('message', '未知错误'))
+        return response.get('result')
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect_indexer(timeout=CALL_TIMEOUT):
+    """连接正在运行的索引服务，没有运行时返回 None"""
+    try:
+        endpoint = json.loads(ENDPOINT_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if endpoint.get('protocol') != PROTOCOL_VERSION:
+        return None
+    try:
+        return IndexerClient(endpoint, timeout)
+    except (OSError, KeyError, ValueError):
+        return None
@@ -0,0 +1,176 @@
+"""Python 解释器探测
+
+每个解释器只启动一次 `python -I -c <脚本>`，以 JSON 形式取回版本、实现、
+ABI 标签、平台和 sys.prefix 等信息。结果按 (真实路径, 修改时间, 文件大小)
+缓存在磁盘上，解释器没有变化时不会再启动任何进程。
+"""
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+
+from app_paths import APP_DATA_DIR
+
+CACHE_FILE = APP_DATA_DIR / 'interpreter_cache.json'
+CACHE_VERSION = 2
+
+# 在目标解释器中执行的脚本，需兼容 Python 3.6
+_PROBE_SCRIPT = r'''
+import json, os, platform, sys, sysconfig
+impl = sys.implementation
+abiflags = getattr(sys, 'abiflags', '')
+nodot = '%d%d' % sys.version_info[:2]
+prefix = {'cpython': 'cp', 'pypy': 'pp'}.get(impl.name, impl.name[:2])
+print(json.dumps({
+    'version': 'Python ' + platform.python_version(),
+    'version_info': list(sys.version_info[:3]),
+    'implementation': impl.name,
+    'implementation_version': '.'.join(str(v) for v in impl.version[:3]),
+    'abi_tag': prefix + nodot + abiflags,
+    'abiflags': abiflags,
+    'soabi': sysconfig.get_config_var('SOABI'),
+    'ext_suffix': sysconfig.get_config_var('EXT_SUFFIX'),
+    'platform': sysconfig.get_platform(),
+    'machine': platform.machine(),
+    'pointer_bits': 64 if sys.maxsize > 2 ** 32 else 32,
+    'executable': sys.executable,
+    'prefix': sys.prefix,
+    'base_prefix': getattr(sys, 'base_prefix', sys.prefix),
+    'markers': {
+        'implementation_name': impl.name,
+        'implementation_version': '.'.join(str(v) for v in impl.version[:3]),
+        'os_name': os.name,
+        'platform_machine': platform.machine(),
+        'platform_release': platform.release(),
+        'platform_system': platform.system(),
+        'platform_version': platform.version(),
+        'python_full_version': platform.python_version(),
+        'platform_python_implementation': platform.python_implementation(),
+        'python_version': '.'.join(platform.python_version_tuple()[:2]),
+        'sys_platform': sys.platform,
+    },
+}))
+'''
+
+_cache = None
+_cache_lock = threading.Lock()
+_probe_locks = {}
+
+
+def _load_cache():
+    """加载磁盘缓存（调用方需持有 _cache_lock）"""
+    global _cache
+    if _cache is None:
+        try:
+            data = json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+            _cache = data.get('entries', {}) if data.get('version') == CACHE_VERSION else {}
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save_cache():
+    """写回磁盘缓存（调用方需持有 _cache_lock）"""
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CACHE_FILE.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'version': CACHE_VERSION, 'entries': _cache}), encoding='utf-8')
+        os.replace(tmp, CACHE_FILE)
+    except OSError:
+        pass
+
+
+def _cache_key(python_path):
+    """缓存键: 真实路径 + 修改时间 + 文件大小，解释器不存在时返回 None"""
+    try:
+        real = os.path.realpath(python_path)
+        st = os.stat(real)
+    except OSError:
+        return None
+    return f"{real}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def _run_probe(python_path, timeout):
+    result = subprocess.run([str(python_path), '-I', '-c', _PROBE_SCRIPT],
+                            capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def probe_interpreter(python_path, timeout=10):
+    """获取解释器信息
+
+    Args:
+        python_path: 解释器路径
+        timeout: 探测进程的超时时间（秒）
+
+    Returns:
+        dict: 解释器信息，无法探测时返回 None。
+            虚拟环境中的解释器与基础解释器共享缓存，prefix 按调用路径所在
+            的虚拟环境（pyvenv.cfg 所在目录）计算。
+    """
+    key = _cache_key(python_path)
+    if key is None:
+        return None
+
+    with _cache_lock:
+        info = _load_cache().get(key)
+        lock = _probe_locks.setdefault(key, threading.Lock())
+
+    if info is None:
+        # 同一解释器只探测一次，其余线程等待结果
+        with lock:
+            with _cache_lock:
+                info = _load_cache().get(key)
+            if info is None:
+                try:
+                    info = _run_probe(python_path, timeout)
+                except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+                    info = None
+                if info is None:
+                    return None
+                with _cache_lock:
+                    _load_cache()[key] = info
+                    _save_cache()
+
+    info = dict(info)
+    info['executable'] = str(Path(python_path).absolute())
+    venv_dir = Path(python_path).absolute().parent.parent
+    if (venv_dir / 'pyvenv.cfg').exists():
+        info['prefix'] = str(venv_dir)
+        info['in_venv'] = True
+    else:
+        info['prefix'] = info.get('base_prefix', info.get('prefix'))
+        info['in_venv'] = False
+    return info
+
+
+def interpreter_version(python_path, default="未知版本"):
+    """获取解释器版本字符串（与 `python --version` 的输出格式相同）"""
+    info = probe_interpreter(python_path)
+    return info['version'] if info else default
+
+
+def marker_environment(info):
+    """PEP 508 环境标记变量（用于在目标解释器的环境下求值 markers）
+
+    Returns:
+        dict: 可以传给 Marker.evaluate 的环境，解释器无法探测时返回 None
+    """
+    if not info or 'markers' not in info:
+        return None
+    return dict(info['markers'])
+
+
+def describe_interpreter(info):
+    """把解释器信息格式化为多行说明文本（用于提示框）"""
+    if not info:
+        return ''
+    return '\n'.join([
+        f"{info['version']} ({info['implementation']} {info['implementation_version']})",
+        f"ABI: {info['abi_tag']}  平台: {info['platform']} ({info['pointer_bits']} 位)",
+        f"sys.prefix: {info['prefix']}",
+        f"base_prefix: {info['base_prefix']}",
+    ])
@@ -0,0 +1,185 @@
+"""虚拟环境包列表的进程内缓存
+
+包管理对话框每次打开都要重新读取一遍安装元数据。这里把读取结果按虚拟环境
+缓存在内存中（LRU，按条目数和包总数限制大小），以 site-packages 目录的修改
+时间作为失效依据：安装、卸载、升级包都会在 site-packages 中增删 dist-info
+目录，修改时间随之变化。
+
+主窗口选中某个环境时调用 prefetch_inventory 在低优先级后台线程中预先读取，
+双击打开对话框时通常已经可以直接显示。
+"""
+import os
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dist_metadata import find_site_packages, iter_distributions
+from log_setup import get_logger
+
+logger = get_logger('inventory')
+
+MAX_ENTRIES = 64          # 最多缓存的环境数
+MAX_PACKAGES = 20000      # 所有缓存环境的包总数上限
+PREFETCH_NICE = 10        # 预读线程的 nice 增量（仅 Linux 支持按线程设置）
+
+# 包列表: 虚拟环境路径, 失效判断用的键, 已安装的发行包（DistInfo，含大小）, 读取时间
+Inventory = namedtuple('Inventory', 'venv key packages loaded_at')
+
+
+def _inventory_key(venv_path):
+    """site-packages 目录的修改时间"""
+    parts = []
+    for location in find_site_packages(venv_path):
+        try:
+            parts.append(os.stat(location).st_mtime)
+        except OSError:
+            parts.append(0.0)
+    return '|'.join(str(p) for p in parts)
+
+
+class InventoryCache:
+    """按最近使用顺序淘汰的包列表缓存（线程安全）"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_packages=MAX_PACKAGES):
+        self.max_entries = max_entries
+        self.max_packages = max_packages
+        self._entries = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, venv_path):
+        """返回仍然有效的缓存，没有或已失效时返回 None"""
+        venv_path = str(venv_path)
+        key = _inventory_key(venv_path)
+        with self._lock:
+            inventory = self._entries.get(venv_path)
+            if inventory is None:
+                return None
+            if inventory.key != key:
+                self._remove(venv_path)
+                return None
+            self._entries.move_to_end(venv_path)
+            return inventory
+
+    def put(self, inventory):
+        with self._lock:
+            self._remove(inventory.venv)
+            self._entries[inventory.venv] = inventory
+            self._total += len(inventory.packages)
+            # 超出限制时淘汰最久未使用的环境（刚放入的条目至少保留）
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                              or self._total > self.max_packages):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, venv_path=None):
+        """清除指定环境（None 表示全部）的缓存"""
+        with self._lock:
+            if venv_path is None:
+                self._entries.clear()
+                self._total = 0
+            else:
+                self._remove(str(venv_path))
+
+    def _remove(self, venv_path):
+        inventory = self._entries.pop(venv_path, None)
+        if inventory is not None:
+            self._total -= len(inventory.packages)
+
+
+_cache = InventoryCache()
+_prefetch_executor = None
+_prefetching = {}
+_prefetch_lock = threading.Lock()
+
+
+def _read_inventory(venv_path):
+    # 先取键再读元数据：读取期间发生的修改会让这条缓存在下次使用时失效
+    key = _inventory_key(venv_path)
+    packages = tuple(sorted(iter_distributions(venv_path, with_size=True),
+                            key=lambda d: d.name))
+    return Inventory(venv_path, key, packages, time.time())
+
+
+def cached_inventory(venv_path):
+    """不读取磁盘，只返回仍然有效的缓存（没有时返回 None）"""
+    return _cache.get(venv_path)
+
+
+def load_inventory(venv_path, use_cache=True):
+    """获取虚拟环境的包列表
+
+    Args:
+        venv_path: 虚拟环境路径
+        use_cache: False 时忽略缓存重新读取
+
+    Returns:
+        Inventory
+    """
+    venv_path = str(venv_path)
+    if use_cache:
+        inventory = _cache.get(venv_path)
+        if inventory is not None:
+            return inventory
+        # 正在预读同一个环境时等待它完成，避免重复读取
+        with _prefetch_lock:
+            future = _prefetching.get(venv_path)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                pass
+    inventory = _read_inventory(venv_path)
+    _cache.put(inventory)
+    return inventory
+
+
+def invalidate_inventory(venv_path=None):
+    """清除缓存（包发生变化后调用）"""
+    _cache.invalidate(venv_path)
+
+
+def _lower_priority():
+    """降低预读线程的调度优先级"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+def _prefetch(venv_path):
+    try:
+        inventory = _cache.get(venv_path)
+        if inventory is not None:
+            return inventory
+        inventory = _read_inventory(venv_path)
+        _cache.put(inventory)
+        return inventory
+    except Exception as e:
+        logger.debug(f"预读包列表失败: {venv_path}, 错误: {e}")
+        raise
+    finally:
+        with _prefetch_lock:
+            _prefetching.pop(venv_path, None)
+
+
+def prefetch_inventory(venv_path):
+    """在后台低优先级线程中预读包列表（已有有效缓存或正在预读时直接返回）
+
+    只有最近一次选中的环境有意义，尚未开始的其他预读任务会被取消。
+    """
+    global _prefetch_executor
+    venv_path = str(venv_path)
+    if _cache.get(venv_path) is not None:
+        return
+    with _prefetch_lock:
+        if venv_path in _prefetching:
+            return
+        for path, future in list(_prefetching.items()):
+            if future.cancel():
+                del _prefetching[path]
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inventory-prefetch',
+                                                    initializer=_lower_priority)
+        _prefetching[venv_path] = _prefetch_executor.submit(_prefetch, venv_path)
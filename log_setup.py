@@ -0,0 +1,107 @@
+"""日志配置
+
+所有线程只把日志记录放入内存队列（QueueHandler），由一个后台线程
+（QueueListener）负责格式化并写入滚动日志文件，磁盘延迟不会阻塞界面
+线程和扫描线程。setup_logging 可以重复调用：处理器只注册一次，再次
+调用只更新日志级别和输出格式。
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+LOG_DIR = os.path.expanduser('~/.virtualenvs')
+LOG_FILE = os.path.join(LOG_DIR, 'venv_manager.log')
+LOGGER_NAME = 'VenvManager'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+_lock = threading.Lock()
+_listener = None
+_file_handler = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出一行 JSON"""
+
+    def format(self, record):
+        data = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                    + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def _make_formatter(json_format):
+    if json_format:
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+
+def setup_logging(level=None, json_format=None, log_file=LOG_FILE):
+    """配置日志（可重复调用）
+
+    Args:
+        level: 日志级别名称（DEBUG / INFO / WARNING / ERROR），None 表示保持当前设置
+        json_format: 是否以 JSON 行格式写入日志文件，None 表示保持当前设置
+        log_file: 日志文件路径，只在第一次调用时生效
+
+    Returns:
+        logging.Logger: 程序使用的日志记录器
+    """
+    global _listener, _file_handler, _queue_handler
+    logger = logging.getLogger(LOGGER_NAME)
+
+    with _lock:
+        first = _listener is None
+        if first:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            # 滚动日志文件 (512K/文件，保留3个备份)，只在后台线程中写入
+            _file_handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=512*1024,
+                backupCount=3,
+                encoding='utf-8'
+            )
+            log_queue = queue.SimpleQueue() if hasattr(queue, 'SimpleQueue') else queue.Queue()
+            _queue_handler = logging.handlers.QueueHandler(log_queue)
+            _listener = logging.handlers.QueueListener(log_queue, _file_handler,
+                                                       respect_handler_level=True)
+            _listener.start()
+            logger.addHandler(_queue_handler)
+            logger.propagate = False
+            atexit.register(shutdown_logging)
+
+        if json_format is not None or first:
+            _file_handler.setFormatter(_make_formatter(bool(json_format)))
+        if level is not None or first:
+            numeric_level = logging.getLevelName(str(level or 'INFO').upper())
+            logger.setLevel(numeric_level if isinstance(numeric_level, int) else logging.INFO)
+    return logger
+
+
+def get_logger(name=None):
+    """获取程序日志记录器，name 为子模块名称（如 'workers'）"""
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
+
+
+def shutdown_logging():
+    """停止后台写入线程，写完队列中剩余的日志"""
+    global _listener, _file_handler, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger(LOGGER_NAME).removeHandler(_queue_handler)
+        _file_handler.close()
+        _listener = _file_handler = _queue_handler = None
@@ -0,0 +1,181 @@
+"""跨虚拟环境的包索引
+
+把多个虚拟环境中已安装的发行包记录到 SQLite 中，用于回答
+"哪些环境安装了 numpy<2" 这类问题。索引按 site-packages 和
+dist-info 目录的修改时间增量刷新，查询不需要访问任何虚拟环境。
+"""
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from pathlib import Path
+
+from dist_metadata import iter_distributions, find_site_packages, parse_query, version_matches
+from app_paths import APP_DATA_DIR
+
+# 查询结果: 虚拟环境路径, 包名, 版本, 所在 site-packages, 大小（字节）
+IndexedPackage = namedtuple('IndexedPackage', 'venv name version location size')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS venvs (
+    path TEXT PRIMARY KEY,
+    site_mtime REAL,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS packages (
+    venv TEXT NOT NULL,
+    name TEXT NOT NULL,
+    display_name TEXT,
+    version TEXT,
+    location TEXT,
+    size INTEGER,
+    dist_path TEXT NOT NULL,
+    mtime REAL,
+    PRIMARY KEY (venv, dist_path)
+);
+CREATE INDEX IF NOT EXISTS idx_packages_name ON packages (name);
+"""
+
+
+def _site_mtime(venv_path):
+    """site-packages 目录的修改时间（安装或卸载包时会变化）"""
+    mtime = 0.0
+    for location in find_site_packages(venv_path):
+        try:
+            mtime = max(mtime, os.stat(location).st_mtime)
+        except OSError:
+            pass
+    return mtime
+
+
+class PackageIndex:
+    """跨虚拟环境的包索引"""
+
+    def __init__(self, db_path=None):
+        self.db_path = Path(db_path) if db_path else APP_DATA_DIR / 'package_index.sqlite3'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # 每次操作使用独立连接，GUI 线程查询时不会与后台刷新共享连接
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def refresh(self, venv_paths, max_workers=8, progress=None, is_cancelled=None, prune=True):
+        """增量刷新索引
+
+        Args:
+            venv_paths: 需要索引的虚拟环境路径列表
+            max_workers: 并行读取元数据的线程数
+            progress: 可选回调 progress(已完成数, 总数)
+            is_cancelled: 可选回调，返回 True 时停止刷新
+            prune: 是否删除不在 venv_paths 中的旧记录
+
+        Returns:
+            dict: 统计信息（venvs, scanned, packages, elapsed）
+        """
+        start = time.perf_counter()
+        venv_paths = [str(p) for p in venv_paths]
+
+        with closing(self._connect()) as conn:
+            known_venvs = dict(conn.execute('SELECT path, site_mtime FROM venvs'))
+            known_dists = {}
+            for venv, dist_path, mtime in conn.execute('SELECT venv, dist_path, mtime FROM packages'):
+                known_dists.setdefault(venv, {})[dist_path] = mtime
+
+            if prune:
+                stale = set(known_venvs) - set(venv_paths)
+                for venv in stale:
+                    conn.execute('DELETE FROM packages WHERE venv = ?', (venv,))
+                    conn.execute('DELETE FROM venvs WHERE path = ?', (venv,))
+                conn.commit()
+
+            def scan(venv):
+                site_mtime = _site_mtime(venv)
+                if venv in known_venvs and known_venvs[venv] == site_mtime:
+                    return venv, site_mtime, None
+                dists = list(iter_distributions(venv, with_size=True,
+                                                known_mtimes=known_dists.get(venv, {})))
+                return venv, site_mtime, dists
+
+            total = len(venv_paths)
+            scanned = 0
+            changed = 0
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total or 1))) as executor:
+                futures = [executor.submit(scan, venv) for venv in venv_paths]
+                for done, future in enumerate(as_completed(futures), 1):
+                    if is_cancelled and is_cancelled():
+                        for f in futures:
+                            f.cancel()
+                        break
+                    venv, site_mtime, dists = future.result()
+                    if dists is not None:
+                        scanned += 1
+                        changed += self._store(conn, venv, site_mtime, dists, known_dists.get(venv, {}))
+                    if progress:
+                        progress(done, total)
+
+            count = conn.execute('SELECT COUNT(*) FROM packages').fetchone()[0]
+
+        return {
+            'venvs': total,
+            'scanned': scanned,
+            'changed': changed,
+            'packages': count,
+            'elapsed': time.perf_counter() - start,
+        }
+
+    def _store(self, conn, venv, site_mtime, dists, known):
+        """写入单个虚拟环境的扫描结果，返回变化的记录数"""
+        current = {d.path for d in dists}
+        removed = [p for p in known if p not in current]
+        updated = [d for d in dists if d.version is not None]
+
+        conn.executemany('DELETE FROM packages WHERE venv = ? AND dist_path = ?',
+                         [(venv, p) for p in removed])
+        conn.executemany(
+            'INSERT OR REPLACE INTO packages '
+            '(venv, name, display_name, version, location, size, dist_path, mtime) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(venv, d.name, d.display_name, d.version, d.location, d.size, d.path, d.mtime)
+             for d in updated])
+        conn.execute('INSERT OR REPLACE INTO venvs (path, site_mtime, indexed_at) VALUES (?, ?, ?)',
+                     (venv, site_mtime, time.time()))
+        conn.commit()
+        return len(removed) + len(updated)
+
+    def query(self, text):
+        """查询安装了指定包的虚拟环境
+
+        Args:
+            text: 包名加可选版本约束，如 "numpy"、"numpy<2"、"requests>=2,<2.32"
+
+        Returns:
+            list[IndexedPackage]: 按虚拟环境路径排序的结果
+        """
+        name, specifier = parse_query(text)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT venv, display_name, version, location, size FROM packages '
+                'WHERE name = ? ORDER BY venv', (name,)).fetchall()
+        return [IndexedPackage(*row) for row in rows if version_matches(row[2], specifier)]
+
+    def venv_packages(self, venv_path):
+        """获取索引中某个虚拟环境的全部包"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT venv, display_name, version, location, size FROM packages '
+                'WHERE venv = ? ORDER BY name', (str(venv_path),)).fetchall()
+        return [IndexedPackage(*row) for row in rows]
+
+    def clear(self):
+        """清空索引"""
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM packages')
+            conn.execute('DELETE FROM venvs')
+            conn.commit()
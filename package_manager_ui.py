@@ -1,6 +1,8 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, 
                            QListWidget, QLabel, QLineEdit, QMessageBox, QProgressBar,
-                           QWidget, QFileDialog, QProgressDialog)
+                           QWidget, QFileDialog, QProgressDialog, QTabWidget, QTreeWidget,
+                           QTreeWidgetItem, QComboBox, QTableWidget, QTableWidgetItem,
+                           QAbstractItemView, QHeaderView)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QSettings, QPropertyAnimation, QEasingCurve
 from concurrent.futures import ThreadPoolExecutor
 import subprocess
@@ -8,13 +10,28 @@ import json
 import os
 from pathlib import Path
 from datetime import datetime
-import concurrent.futures
+from config_manager import ConfigManager
+from dist_metadata import iter_distributions, canonicalize_name, format_size
+from simple_index import SimpleIndexClient, check_outdated
+from interpreter_probe import probe_interpreter, interpreter_version, marker_environment
+from requirements_import import parse_requirements, RequirementsImporter
+from dep_graph import DependencyGraph
+from inventory_cache import load_inventory, cached_inventory, invalidate_inventory
+from index_daemon import connect_indexer
+from venv_snapshot import create_snapshot, list_snapshots, rollback, delete_snapshot, DEFAULT_KEEP
+from log_setup import get_logger
+
+logger = get_logger('packages')
 
 class PackageWorker(QThread):
     """包操作工作线程"""
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(int, str)
     package_found = pyqtSignal(str, str, str)  # 包名, 版本, 大小
+    outdated_found = pyqtSignal(str, str, str)  # 包名, 当前版本, 最新版本
+
+    # 会修改环境的操作及其名称（操作前按需建立快照）
+    MUTATING = {'install': '安装', 'uninstall': '卸载', 'upgrade': '升级', 'import': '导入安装'}
 
     def __init__(self, operation, venv_path, **kwargs):
         super().__init__()
@@ -27,47 +44,55 @@ class PackageWorker(QThread):
     def cancel(self):
         self.is_cancelled = True
 
+    def _snapshot_before_change(self):
+        """修改环境前建立快照，失败时只记录日志，不影响后续操作"""
+        if self.kwargs.get('package'):
+            target = self.kwargs['package']
+        elif self.kwargs.get('parsed') is not None:
+            target = f"{len(self.kwargs['parsed'].requirements)} 个包"
+        else:
+            target = ''
+        self.progress.emit(0, "正在建立快照...")
+        try:
+            create_snapshot(self.venv_path, f"{self.MUTATING[self.operation]} {target} 前",
+                            keep=self.kwargs.get('keep', DEFAULT_KEEP))
+        except Exception as e:
+            logger.warning(f"建立快照失败: {self.venv_path}, 错误: {e}")
+
+    def _packages_from_indexer(self):
+        """从后台索引服务获取包列表 [(名称, 版本, 大小)]，服务没有运行或出错时返回 None"""
+        client = connect_indexer()
+        if client is None:
+            return None
+        try:
+            with client:
+                packages = client.call('packages', venv=str(self.venv_path))
+        except Exception as e:
+            logger.warning(f"后台索引服务查询失败: {e}")
+            return None
+        return [(p['display_name'], p['version'], p['size']) for p in packages]
+
     def run(self):
         try:
+            if self.operation in self.MUTATING and self.kwargs.get('snapshot'):
+                self._snapshot_before_change()
             if self.operation == 'list':
+                # 直接读取安装元数据（不启动 pip），结果放入进程内缓存
                 self.is_scanning = True
                 self.is_cancelled = False
                 try:
-                    python_path = self.venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
-                    
-                    # 使用 pip list 获取基本包信息
                     self.progress.emit(0, "正在获取包列表...")
-                    result = subprocess.run([str(python_path), '-m', 'pip', 'list', '--format=json'], 
-                                         capture_output=True, text=True)
-                    
-                    if result.returncode != 0:
-                        raise Exception(f"获取包列表失败: {result.stderr}")
-                    
-                    packages = json.loads(result.stdout)
+                    packages = self._packages_from_indexer() if self.kwargs.get('use_indexer') else None
+                    if packages is None:
+                        inventory = load_inventory(self.venv_path, use_cache=self.kwargs.get('use_cache', True))
+                        packages = [(d.display_name, d.version, d.size) for d in inventory.packages]
                     total = len(packages)
-                    
-                    # 创建线程池来并行获取包信息
-                    with ThreadPoolExecutor(max_workers=4) as executor:
-                        futures = []
-                        for pkg in packages:
-                            if self.is_cancelled:
-                                break
-                            # 提交获取包详细信息的任务
-                            future = executor.submit(self.get_package_info, str(python_path), pkg['name'], pkg['version'])
-                            futures.append((pkg['name'], pkg['version'], future))
-                        
-                        # 处理完成的任务
-                        for i, (name, version, future) in enumerate(futures):
-                            if self.is_cancelled:
-                                break
-                            try:
-                                size = future.result()
-                                self.package_found.emit(name, version, size)
-                                progress = int((i + 1) / total * 100)
-                                self.progress.emit(progress, f"正在获取包信息... ({i + 1}/{total})")
-                            except Exception as e:
-                                print(f"获取包 {name} 信息失败: {e}")
-                                self.package_found.emit(name, version, "0 B")
+                    for i, (name, version, size) in enumerate(packages):
+                        if self.is_cancelled:
+                            break
+                        self.package_found.emit(name, version, format_size(size or 0))
+                        if total:
+                            self.progress.emit(int((i + 1) / total * 100), f"正在获取包信息... ({i + 1}/{total})")
                     
                     if self.is_cancelled:
                         self.progress.emit(0, "扫描已取消")
@@ -82,65 +107,49 @@ class PackageWorker(QThread):
                 finally:
                     self.is_scanning = False
                     
-            elif self.operation == 'batch_install':
-                # 批量安装包
-                requirements = self.kwargs.get('requirements', [])
-                total = len(requirements)
-                max_workers = min(32, total)  # 最大并发数
-                completed = 0
-                results = []
-                
-                def install_package(pkg):
-                    """安装单个包的函数"""
-                    try:
-                        result = subprocess.run(
-                            [str(self.kwargs['python_path']), '-m', 'pip', 'install', pkg],
-                            capture_output=True,
-                            text=True
-                        )
-                        return pkg, result.returncode == 0, result.stderr if result.returncode != 0 else None
-                    except Exception as e:
-                        return pkg, False, str(e)
-                
-                # 使用线程池并行安装
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    # 提交所有安装任务
-                    future_to_pkg = {
-                        executor.submit(install_package, pkg): pkg 
-                        for pkg in requirements
-                    }
-                    
-                    # 处理完成的任务
-                    for future in concurrent.futures.as_completed(future_to_pkg):
-                        completed += 1
-                        pkg, success, error = future.result()
-                        results.append((pkg, success, error))
-                        
-                        # 更新进度
-                        progress = int(completed * 100 / total)
-                        self.progress.emit(
-                            progress,
-                            f"正在安装 ({completed}/{total}): {pkg}"
-                        )
-                
-                # 统计结果
-                success_count = sum(1 for _, success, _ in results if success)
-                failed_packages = [(pkg, err) for pkg, success, err in results if not success]
-                
-                # 生成结果消息
-                if failed_packages:
-                    error_msg = "\n\n失败的包:\n" + "\n".join(
-                        f"{pkg}: {err}" for pkg, err in failed_packages
-                    )
-                    self.finished.emit(
-                        False,
-                        f"安装完成，成功: {success_count}/{total}\n{error_msg}"
-                    )
-                else:
-                    self.finished.emit(
-                        True,
-                        f"所有包安装成功 ({total}/{total})"
-                    )
+            elif self.operation == 'import':
+                # 预下载到本地缓存后一次离线安装
+                self.is_cancelled = False
+                importer = RequirementsImporter(
+                    self.kwargs['python_path'],
+                    self.kwargs['parsed'],
+                    max_workers=self.kwargs.get('max_workers', 8),
+                    progress=self.progress.emit,
+                    is_cancelled=lambda: self.is_cancelled
+                )
+                success, msg = importer.run()
+                self.progress.emit(100, "完成")
+                self.finished.emit(success, f"{msg}\n\n{importer.format_timings()}")
+            elif self.operation == 'outdated':
+                # 从索引查询当前环境中可更新的包
+                self.is_scanning = True
+                self.is_cancelled = False
+                client = SimpleIndexClient(self.kwargs['index_url'],
+                                           cache_ttl=self.kwargs.get('cache_ttl', 3600))
+                try:
+                    self.progress.emit(0, "正在检查更新...")
+                    inventories = {self.venv_path: list(iter_distributions(self.venv_path))}
+
+                    def report(done, total):
+                        self.progress.emit(int(done * 100 / total), f"正在查询索引... ({done}/{total})")
+
+                    results, errors = check_outdated(inventories, client, progress=report,
+                                                     is_cancelled=lambda: self.is_cancelled)
+                    outdated = results.get(self.venv_path, [])
+                    for pkg in outdated:
+                        self.outdated_found.emit(pkg.name, pkg.version, pkg.latest)
+
+                    if self.is_cancelled:
+                        self.finished.emit(False, "检查已取消")
+                    else:
+                        msg = f"{len(outdated)} 个包可以更新"
+                        if errors:
+                            msg += f"，{len(errors)} 个包查询失败"
+                        self.progress.emit(100, "检查完成")
+                        self.finished.emit(True, msg)
+                finally:
+                    client.close()
+                    self.is_scanning = False
             elif self.operation in ['install', 'uninstall', 'upgrade']:
                 package = self.kwargs.get('package')
                 python_path = self.venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
@@ -161,74 +170,40 @@ class PackageWorker(QThread):
                     self.finished.emit(True, f"{package} {self.operation}成功")
                 else:
                     raise Exception(result.stderr)
+            elif self.operation == 'snapshot':
+                self.progress.emit(10, "正在建立快照...")
+                snapshot = create_snapshot(self.venv_path, self.kwargs.get('label', ''),
+                                           keep=self.kwargs.get('keep', DEFAULT_KEEP))
+                self.progress.emit(100, "完成")
+                self.finished.emit(True, f"已建立快照 {snapshot.id}")
+            elif self.operation == 'rollback':
+                snapshot_id = self.kwargs['snapshot_id']
+                self.progress.emit(10, f"正在回滚到快照 {snapshot_id}...")
+                rollback(self.venv_path, snapshot_id, keep=self.kwargs.get('keep', DEFAULT_KEEP))
+                self.progress.emit(100, "完成")
+                self.finished.emit(True, f"已回滚到快照 {snapshot_id}（回滚前的状态也已保存为快照）")
                     
         except Exception as e:
             self.progress.emit(0, f"错误: {str(e)}")
             self.finished.emit(False, str(e))
 
-    def get_package_info(self, python_path, package_name, version):
-        """获取包的详细信息"""
-        try:
-            # 使用 pip show 获取包信息
-            result = subprocess.run([python_path, '-m', 'pip', 'show', package_name], 
-                                 capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                return "0 B"
-            
-            # 解析包信息
-            info = {}
-            for line in result.stdout.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    info[key.strip()] = value.strip()
-            
-            # 获取包的实际位置
-            if 'Location' not in info:
-                return "0 B"
-                
-            package_path = Path(info['Location']) / package_name.lower()
-            if not package_path.exists():
-                # 尝试查找类似名称的目录
-                parent = Path(info['Location'])
-                for item in parent.iterdir():
-                    if item.is_dir() and item.name.lower().startswith(package_name.lower()):
-                        package_path = item
-                        break
-                else:
-                    return "0 B"
-            
-            # 计算包大小
-            total_size = 0
-            for path in package_path.rglob('*'):
-                if path.is_file():
-                    total_size += path.stat().st_size
-            
-            # 转换大小
-            units = ['B', 'KB', 'MB', 'GB']
-            size = float(total_size)
-            unit_index = 0
-            
-            while size >= 1024 and unit_index < len(units) - 1:
-                size /= 1024
-                unit_index += 1
-            
-            return f"{size:.1f} {units[unit_index]}"
-            
-        except Exception as e:
-            print(f"获取包 {package_name} 大小失败: {e}")
-            return "0 B"
-
 class PackageManagerDialog(QDialog):
-    def __init__(self, venv_path, parent=None):
+    def __init__(self, venv_path, parent=None, config=None):
         super().__init__(parent)
         self.venv_path = venv_path
-        self.settings = QSettings('VenvManager', 'Settings')
+        # 与主窗口共用配置缓存，避免读到尚未写回的旧值
+        self.config = config if config is not None else ConfigManager()
         # 移除帮助按钮
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
         self.worker = None
+        self.dep_graph = None  # 依赖关系图，包列表刷新后重新构建
         self.init_ui()
-        self.refresh_packages()
+        # 主窗口选中环境时已在后台预读，有缓存时直接显示
+        inventory = cached_inventory(venv_path)
+        if inventory is not None:
+            self.show_inventory(inventory)
+        else:
+            self.refresh_packages(use_cache=True)
 
     def init_ui(self):
         self.setWindowTitle(f'包管理器 - {self.venv_path}')
@@ -240,7 +215,29 @@ class PackageManagerDialog(QDialog):
         self.package_list = QListWidget()
         self.package_list.setAlternatingRowColors(True)
         layout.addWidget(QLabel('已安装的包:'))
-        layout.addWidget(self.package_list)
+        
+        # 依赖树
+        tree_page = QWidget()
+        tree_layout = QVBoxLayout(tree_page)
+        tree_layout.setContentsMargins(0, 0, 0, 0)
+        self.tree_mode = QComboBox()
+        self.tree_mode.addItem('依赖树（从顶层包展开）', 'requires')
+        self.tree_mode.addItem('反向依赖（被哪些包依赖）', 'required_by')
+        self.tree_mode.currentIndexChanged.connect(self.populate_dep_tree)
+        tree_layout.addWidget(self.tree_mode)
+        self.dep_tree = QTreeWidget()
+        self.dep_tree.setHeaderLabels(['包名', '版本'])
+        self.dep_tree.setAlternatingRowColors(True)
+        self.dep_tree.itemExpanded.connect(self._expand_dep_item)
+        tree_layout.addWidget(self.dep_tree)
+        self.tree_summary = QLabel()
+        tree_layout.addWidget(self.tree_summary)
+        
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.package_list, '列表')
+        self.tabs.addTab(tree_page, '依赖树')
+        self.tabs.currentChanged.connect(self._handle_tab_changed)
+        layout.addWidget(self.tabs)
         
         # 安装包区域
         install_layout = QHBoxLayout()
@@ -261,18 +258,26 @@ class PackageManagerDialog(QDialog):
         refresh_btn = QPushButton('刷新列表')
         export_btn = QPushButton('导出包列表')
         import_btn = QPushButton('导入安装')  # 新增导入按钮
+        outdated_btn = QPushButton('检查更新')
+        outdated_btn.setToolTip('从配置的索引查询可更新的包')
+        snapshot_btn = QPushButton('快照/回滚')
+        snapshot_btn.setToolTip('查看安装、升级前自动建立的快照，回滚到之前的状态')
 
         upgrade_btn.clicked.connect(self.upgrade_package)
         uninstall_btn.clicked.connect(self.uninstall_package)
         refresh_btn.clicked.connect(self.refresh_packages)
         export_btn.clicked.connect(self.export_packages)
         import_btn.clicked.connect(self.import_packages)  # 连接导入功能
+        outdated_btn.clicked.connect(self.check_outdated)
+        snapshot_btn.clicked.connect(self.show_snapshots)
 
         button_layout.addWidget(upgrade_btn)
         button_layout.addWidget(uninstall_btn)
         button_layout.addWidget(refresh_btn)
         button_layout.addWidget(export_btn)
         button_layout.addWidget(import_btn)  # 添加导入按钮
+        button_layout.addWidget(outdated_btn)
+        button_layout.addWidget(snapshot_btn)
         
         layout.addLayout(button_layout)
 
@@ -283,6 +288,9 @@ class PackageManagerDialog(QDialog):
         if self.worker:
             self.worker.deleteLater()
             
+        if operation in PackageWorker.MUTATING:
+            kwargs.setdefault('snapshot', self.config.get('snapshot_before_changes'))
+            kwargs.setdefault('keep', self.config.get('snapshot_keep'))
         self.worker = PackageWorker(operation, self.venv_path, **kwargs)
         if operation == 'list':
             self.package_list.clear()
@@ -335,17 +343,18 @@ class PackageManagerDialog(QDialog):
             return f"{size:.1f} {units[unit_index]}"
             
         except Exception as e:
-            print(f"获取包大小失败: {e}")
+            logger.warning(f"获取包大小失败: {e}")
             return "未知大小"
 
-    def add_package_to_list(self, name, version, size=None):
+    def add_package_to_list(self, name, version, size=None, sort=True):
         """添加包到列表"""
-        if self.settings.value('show_pkg_size', False, type=bool) and size:
+        if self.config.get('show_pkg_size') and size:
             self.package_list.addItem(f"{name} ({version}) - {size}")
         else:
             self.package_list.addItem(f"{name} ({version})")
         # 按字母顺序排序
-        self.package_list.sortItems()
+        if sort:
+            self.package_list.sortItems()
 
     def update_progress(self, value, message):
         self.progress_widget.show()
@@ -358,21 +367,59 @@ class PackageManagerDialog(QDialog):
         animation.start()
         self.status_label.setText(message)
 
-    def refresh_packages(self):
+    def show_inventory(self, inventory):
+        """直接显示缓存的包列表"""
+        for dist in inventory.packages:
+            self.add_package_to_list(dist.display_name, dist.version, format_size(dist.size or 0), sort=False)
+        self.package_list.sortItems()
+
+    def refresh_packages(self, use_cache=False):
+        """刷新包列表（默认重新读取，不使用缓存）"""
         if self.worker and self.worker.is_scanning:
             self.worker.cancel()
             return
             
-        worker = self._create_worker('list')
+        worker = self._create_worker('list', use_cache=use_cache, use_indexer=self.config.get('use_indexer'))
         worker.finished.connect(self._handle_refresh_result)
         worker.start()
 
     def _handle_refresh_result(self, success, msg):
+        # 包有变化，依赖图需要重新构建
+        self.dep_graph = None
+        if self.tabs.currentIndex() == 1:
+            self.populate_dep_tree()
         if not success and msg != "扫描已取消":
             QMessageBox.critical(self, '错误', f'刷新列表失败: {msg}')
         if msg == "扫描已取消":
             QTimer.singleShot(100, self.refresh_packages)
 
+    def check_outdated(self):
+        """检查当前环境中可更新的包"""
+        if self.worker and self.worker.is_scanning:
+            self.worker.cancel()
+            self.worker.wait()
+
+        config = self.config.snapshot()
+        worker = self._create_worker('outdated', index_url=config.index_url,
+                                     cache_ttl=config.index_cache_ttl)
+        worker.outdated_found.connect(self._mark_outdated)
+        worker.finished.connect(self._handle_outdated_result)
+        worker.start()
+
+    def _mark_outdated(self, name, version, latest):
+        """在包列表中标记可更新的包"""
+        for i in range(self.package_list.count()):
+            item = self.package_list.item(i)
+            if canonicalize_name(item.text().split()[0]) == canonicalize_name(name):
+                item.setText(f"{item.text()}  [可更新: {latest}]")
+                break
+
+    def _handle_outdated_result(self, success, msg):
+        if success:
+            QMessageBox.information(self, '检查更新', msg)
+        elif msg != "检查已取消":
+            QMessageBox.critical(self, '错误', f'检查更新失败: {msg}')
+
     def install_package(self):
         package = self.package_input.text().strip()
         if not package:
@@ -383,27 +430,111 @@ class PackageManagerDialog(QDialog):
         worker.finished.connect(self._handle_operation_result)
         worker.start()
 
-    def upgrade_package(self):
+    def get_dep_graph(self):
+        """获取依赖关系图（直接读取元数据，按需构建）"""
+        if self.dep_graph is None:
+            self.dep_graph = DependencyGraph.from_venv(self.venv_path)
+        return self.dep_graph
+
+    def _handle_tab_changed(self, index):
+        if index == 1 and self.dep_tree.topLevelItemCount() == 0:
+            self.populate_dep_tree()
+
+    def _make_dep_item(self, name, parent_names):
+        """创建依赖树节点，子节点在展开时再生成"""
+        graph = self.get_dep_graph()
+        display_name, version = graph.packages.get(name, (name, ''))
+        item = QTreeWidgetItem([display_name, version])
+        item.setData(0, Qt.UserRole, name)
+        # 记录从根到当前节点的路径，用于识别循环依赖
+        item.setData(0, Qt.UserRole + 1, parent_names + [name])
+        edges = getattr(graph, self.tree_mode.currentData())
+        if edges.get(name):
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        return item
+
+    def _expand_dep_item(self, item):
+        """展开节点时生成子节点"""
+        if item.childCount() or not item.data(0, Qt.UserRole):
+            return
+        graph = self.get_dep_graph()
+        name = item.data(0, Qt.UserRole)
+        path = item.data(0, Qt.UserRole + 1)
+        edges = getattr(graph, self.tree_mode.currentData())
+        for child in sorted(edges.get(name, ()), key=graph.display_name):
+            if child in path:
+                cycle = QTreeWidgetItem([f'{graph.display_name(child)} (循环依赖)', ''])
+                item.addChild(cycle)
+                continue
+            item.addChild(self._make_dep_item(child, path))
+        if item.childCount() == 0:
+            item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicator)
+
+    def populate_dep_tree(self):
+        """填充依赖树"""
+        try:
+            graph = self.get_dep_graph()
+        except Exception as e:
+            self.tree_summary.setText(f'读取依赖失败: {str(e)}')
+            return
+        self.dep_tree.clear()
+        if self.tree_mode.currentData() == 'requires':
+            # 顶层包（没有被依赖的包）作为根节点
+            roots = graph.orphans(exclude=())
+        else:
+            roots = sorted(graph.packages, key=graph.display_name)
+        for name in roots:
+            self.dep_tree.addTopLevelItem(self._make_dep_item(name, []))
+        self.dep_tree.resizeColumnToContents(0)
+        
+        summary = f'{len(graph.packages)} 个包，{len(graph.orphans())} 个顶层包'
+        if graph.missing:
+            missing = sorted({dep for deps in graph.missing.values() for dep in deps})
+            summary += f'，缺少依赖: {", ".join(missing[:10])}'
+        self.tree_summary.setText(summary)
+
+    def selected_package(self):
+        """获取当前选中的包名（列表或依赖树）"""
+        if self.tabs.currentIndex() == 1:
+            item = self.dep_tree.currentItem()
+            return item.text(0) if item and item.data(0, Qt.UserRole) else None
         selected = self.package_list.currentItem()
-        if not selected:
+        return selected.text().split()[0] if selected else None  # 获取包名（不含版本号）
+
+    def upgrade_package(self):
+        package = self.selected_package()
+        if not package:
             QMessageBox.warning(self, '警告', '请选择要升级的包')
             return
             
-        package = selected.text().split()[0]  # 获取包名（不含版本号）
         worker = self._create_worker('upgrade', package=package)
         worker.finished.connect(self._handle_operation_result)
         worker.start()
 
     def uninstall_package(self):
-        selected = self.package_list.currentItem()
-        if not selected:
+        package = self.selected_package()
+        if not package:
             QMessageBox.warning(self, '警告', '请选择要卸载的包')
             return
-            
-        package = selected.text().split()[0]
-        reply = QMessageBox.question(self, '确认卸载',
-                                   f'确定要卸载包 {package} 吗？',
-                                   QMessageBox.Yes | QMessageBox.No)
+        
+        message = f'确定要卸载包 {package} 吗？'
+        try:
+            graph = self.get_dep_graph()
+            dependents = sorted(graph.display_name(n) for n in graph.dependents(package))
+            removable = [graph.display_name(n) for n in graph.removable_with(package)]
+        except Exception as e:
+            logger.warning(f"读取依赖关系失败: {e}")
+            dependents = removable = []
+        if dependents:
+            message += f'\n\n以下 {len(dependents)} 个包依赖 {package}，卸载后它们可能无法使用:\n' + \
+                       '\n'.join(dependents[:15]) + ('\n...' if len(dependents) > 15 else '')
+        if removable:
+            message += f'\n\n卸载后不再被其他包需要的依赖:\n' + ', '.join(removable[:15]) + \
+                       (' ...' if len(removable) > 15 else '')
+        
+        reply = QMessageBox.question(self, '确认卸载', message,
+                                   QMessageBox.Yes | QMessageBox.No,
+                                   QMessageBox.No if dependents else QMessageBox.Yes)
         
         if reply == QMessageBox.Yes:
             worker = self._create_worker('uninstall', package=package)
@@ -411,6 +542,8 @@ class PackageManagerDialog(QDialog):
             worker.start()
 
     def _handle_operation_result(self, success, msg):
+        # 失败时也可能装了一部分包
+        invalidate_inventory(self.venv_path)
         if success:
             self.package_input.clear()
             self.refresh_packages()
@@ -418,6 +551,14 @@ class PackageManagerDialog(QDialog):
         else:
             QMessageBox.critical(self, '错误', f'操作失败: {msg}')
 
+    def show_snapshots(self):
+        """显示快照列表，回滚后刷新包列表"""
+        dialog = SnapshotDialog(self.venv_path, self.config, self)
+        dialog.exec_()
+        if dialog.rolled_back:
+            invalidate_inventory(self.venv_path)
+            self.refresh_packages()
+
     def export_packages(self):
         """导出包列表到文件"""
         # 获取环境名称
@@ -440,11 +581,10 @@ class PackageManagerDialog(QDialog):
                 python_path = self.venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
                 
                 # 获取Python版本
-                version_result = subprocess.run(
-                    [str(python_path), '--version'],
-                    capture_output=True, text=True, check=True
-                )
-                python_version = version_result.stdout.strip()
+                info = probe_interpreter(python_path)
+                if not info:
+                    raise Exception(f"无法获取Python版本: {python_path}")
+                python_version = info['version']
                 
                 # 导出包列表
                 result = subprocess.run(
@@ -466,12 +606,8 @@ class PackageManagerDialog(QDialog):
 
     def _get_python_version(self):
         """获取Python版本"""
-        try:
-            python_path = self.venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
-            result = subprocess.run([str(python_path), '--version'], capture_output=True, text=True)
-            return result.stdout.strip()
-        except:
-            return "未知" 
+        python_path = self.venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
+        return interpreter_version(python_path, "未知") 
 
     def import_packages(self):
         """从requirements.txt导入并安装包"""
@@ -487,36 +623,44 @@ class PackageManagerDialog(QDialog):
             if not file_path:
                 return
             
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                requirements = []
-                for line in f:
-                    line = line.strip()
-                    # 跳过注释和空行
-                    if line and not line.startswith('#'):
-                        requirements.append(line)
+            python_path = self.venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
+            
+            # 解析文件（包括嵌套的 -r / -c），按当前环境的解释器对环境标记求值
+            parsed = parse_requirements(file_path, marker_environment(probe_interpreter(python_path)))
+            requirements = [line.text for line in parsed.requirements]
             
             if not requirements:
-                QMessageBox.warning(self, '警告', '文件中没有找到有效的包信息')
+                QMessageBox.warning(self, '警告', '文件中没有找到有效的包信息' +
+                                    ('\n\n' + '\n'.join(parsed.errors[:10]) if parsed.errors else ''))
                 return
             
+            notes = []
+            if parsed.constraints:
+                notes.append(f'{len(parsed.constraints)} 条版本约束')
+            if parsed.duplicates:
+                notes.append(f'合并了 {parsed.duplicates} 条重复依赖')
+            if parsed.skipped:
+                notes.append(f'{len(parsed.skipped)} 条依赖不适用于当前环境')
+            if parsed.errors:
+                notes.append(f'{len(parsed.errors)} 行无法解析（已忽略）:\n' + '\n'.join(parsed.errors[:5]))
+            
             # 确认安装
             reply = QMessageBox.question(
                 self,
                 '确认安装',
                 f'将安装以下{len(requirements)}个包：\n\n' + '\n'.join(requirements[:10]) +
-                ('\n...' if len(requirements) > 10 else ''),
+                ('\n...' if len(requirements) > 10 else '') +
+                ('\n\n' + '\n'.join(notes) if notes else ''),
                 QMessageBox.Yes | QMessageBox.No
             )
             
             if reply == QMessageBox.Yes:
-                python_path = self.venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
-                
                 # 创建工作线程
                 worker = self._create_worker(
-                    'batch_install',
+                    'import',
                     python_path=python_path,
-                    requirements=requirements
+                    parsed=parsed,
+                    max_workers=min(self.config.get('max_threads'), 16)
                 )
                 
                 # 创建进度对话框
@@ -540,10 +684,120 @@ class PackageManagerDialog(QDialog):
                 )
                 worker.finished.connect(progress_dialog.close)
                 worker.finished.connect(self._handle_operation_result)
+                # 取消后在下一步开始前停止
+                progress_dialog.canceled.connect(worker.cancel)
                 
                 # 启动工作线程
                 worker.start()
                 progress_dialog.exec_()
                 
         except Exception as e:
-            QMessageBox.critical(self, '错误', f'导入失败: {str(e)}')
\ No newline at end of file
+            QMessageBox.critical(self, '错误', f'导入失败: {str(e)}')
+
+
+class SnapshotDialog(QDialog):
+    """虚拟环境快照列表：建立快照、回滚、删除"""
+
+    def __init__(self, venv_path, config, parent=None):
+        super().__init__(parent)
+        self.venv_path = Path(venv_path)
+        self.config = config
+        self.worker = None
+        self.rolled_back = False
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setWindowTitle(f'快照 - {self.venv_path}')
+        self.setGeometry(320, 320, 640, 360)
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(['时间', '说明', '包数量'])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        button_layout = QHBoxLayout()
+        create_btn = QPushButton('建立快照')
+        rollback_btn = QPushButton('回滚到选中快照')
+        delete_btn = QPushButton('删除快照')
+        close_btn = QPushButton('关闭')
+        create_btn.clicked.connect(self.create_snapshot)
+        rollback_btn.clicked.connect(self.rollback_snapshot)
+        delete_btn.clicked.connect(self.delete_snapshot)
+        close_btn.clicked.connect(self.accept)
+        for btn in (create_btn, rollback_btn, delete_btn):
+            button_layout.addWidget(btn)
+        button_layout.addStretch()
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+        self.load_snapshots()
+
+    def load_snapshots(self):
+        self.snapshots = list_snapshots(self.venv_path)
+        self.table.setRowCount(len(self.snapshots))
+        for row, snapshot in enumerate(self.snapshots):
+            created = datetime.fromtimestamp(snapshot.created).strftime('%Y-%m-%d %H:%M:%S')
+            for col, value in enumerate((created, snapshot.label, str(len(snapshot.packages)))):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+        self.status_label.setText(f'共 {len(self.snapshots)} 个快照，'
+                                  f'最多保留 {self.config.get("snapshot_keep")} 个')
+
+    def selected_snapshot(self):
+        row = self.table.currentRow()
+        return self.snapshots[row] if 0 <= row < len(self.snapshots) else None
+
+    def _run(self, operation, **kwargs):
+        if self.worker and self.worker.isRunning():
+            return
+        self.worker = PackageWorker(operation, self.venv_path, keep=self.config.get('snapshot_keep'), **kwargs)
+        self.worker.progress.connect(lambda value, message: self.status_label.setText(message))
+        self.worker.finished.connect(self._handle_result)
+        self.setEnabled(False)
+        self.worker.start()
+
+    def _handle_result(self, success, msg):
+        self.setEnabled(True)
+        if self.worker.operation == 'rollback':
+            self.rolled_back = True
+        self.load_snapshots()
+        if success:
+            self.status_label.setText(msg)
+        else:
+            QMessageBox.critical(self, '错误', f'操作失败: {msg}')
+
+    def create_snapshot(self):
+        self._run('snapshot', label='手动快照')
+
+    def rollback_snapshot(self):
+        snapshot = self.selected_snapshot()
+        if snapshot is None:
+            QMessageBox.warning(self, '警告', '请选择要回滚到的快照')
+            return
+        # 列出回滚会改变的包
+        current = {f"{d.display_name}=={d.version}" for d in iter_distributions(self.venv_path)}
+        target = set(snapshot.packages)
+        changes = [f'- {p}' for p in sorted(current - target)] + [f'+ {p}' for p in sorted(target - current)]
+        message = f'确定要把 site-packages 和脚本目录回滚到 {snapshot.id}（{snapshot.label}）吗？'
+        if changes:
+            message += '\n\n' + '\n'.join(changes[:20]) + ('\n...' if len(changes) > 20 else '')
+        else:
+            message += '\n\n包列表与当前相同。'
+        reply = QMessageBox.question(self, '确认回滚', message, QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self._run('rollback', snapshot_id=snapshot.id)
+
+    def delete_snapshot(self):
+        snapshot = self.selected_snapshot()
+        if snapshot is None:
+            QMessageBox.warning(self, '警告', '请选择要删除的快照')
+            return
+        try:
+            delete_snapshot(self.venv_path, snapshot.id)
+        except Exception as e:
+            QMessageBox.critical(self, '错误', f'删除快照失败: {str(e)}')
+        self.load_snapshots()
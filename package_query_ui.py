@@ -0,0 +1,204 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+                           QLineEdit, QMessageBox, QTableWidget, QTableWidgetItem,
+                           QHeaderView, QAbstractItemView, QComboBox)
+from PyQt5.QtCore import Qt
+import time
+from components import ProgressWidget
+from dist_metadata import format_size
+from host_inventory import HostInventory
+from package_index import PackageIndex
+from workers import VenvWorker
+
+
+class PackageQueryDialog(QDialog):
+    """跨虚拟环境查询已安装的包"""
+
+    def __init__(self, venv_manager, venv_paths, config, parent=None):
+        super().__init__(parent)
+        self.venv_manager = venv_manager
+        self.venv_paths = venv_paths
+        self.config = config
+        self.index = PackageIndex()
+        self.worker = None
+        # 移除帮助按钮
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.init_ui()
+        # 打开时在后台增量更新索引，查询可以立即使用已有索引
+        self.refresh_index()
+
+    def init_ui(self):
+        self.setWindowTitle('包查询')
+        self.setGeometry(320, 320, 760, 460)
+
+        layout = QVBoxLayout(self)
+
+        # 查询输入区域
+        query_layout = QHBoxLayout()
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText('输入包名和版本约束，如 numpy<2 或 requests>=2,<2.32')
+        self.query_input.returnPressed.connect(self.run_query)
+        query_layout.addWidget(self.query_input)
+
+        query_btn = QPushButton('查询')
+        query_btn.clicked.connect(self.run_query)
+        query_layout.addWidget(query_btn)
+
+        self.refresh_btn = QPushButton('更新索引')
+        self.refresh_btn.setToolTip('重新读取有变化的虚拟环境')
+        self.refresh_btn.clicked.connect(self.refresh_index)
+        query_layout.addWidget(self.refresh_btn)
+        layout.addLayout(query_layout)
+
+        # 结果表格
+        self.result_table = QTableWidget(0, 5)
+        self.result_table.setHorizontalHeaderLabels(['虚拟环境', '包名', '版本', '大小', '位置'])
+        self.result_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.result_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.result_table.setAlternatingRowColors(True)
+        self.result_table.verticalHeader().setVisible(False)
+        self.result_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.result_table)
+
+        self.result_label = QLabel()
+        layout.addWidget(self.result_label)
+
+        self.progress_widget = ProgressWidget()
+        layout.addWidget(self.progress_widget)
+
+    def refresh_index(self):
+        """在后台增量更新索引"""
+        if self.worker and self.worker.isRunning():
+            return
+        self.refresh_btn.setEnabled(False)
+        self.worker = VenvWorker('index', self.venv_manager, config=self.config,
+                                 index=self.index, venv_paths=self.venv_paths)
+        self.worker.progress.connect(self.progress_widget.update_progress)
+        self.worker.finished.connect(self._handle_index_result)
+        self.worker.start()
+
+    def _handle_index_result(self, success, msg):
+        self.refresh_btn.setEnabled(True)
+        self.progress_widget.status_label.setText(msg)
+        if success and self.query_input.text().strip():
+            self.run_query()
+
+    def run_query(self):
+        """执行查询"""
+        text = self.query_input.text().strip()
+        if not text:
+            return
+
+        start = time.perf_counter()
+        try:
+            results = self.index.query(text)
+        except ValueError as e:
+            QMessageBox.warning(self, '警告', str(e))
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.result_table.setSortingEnabled(False)
+        self.result_table.setRowCount(len(results))
+        for row, pkg in enumerate(results):
+            values = [pkg.venv, pkg.name, pkg.version,
+                      format_size(pkg.size) if pkg.size is not None else '', pkg.location]
+            for col, value in enumerate(values):
+                self.result_table.setItem(row, col, QTableWidgetItem(value))
+        self.result_table.setSortingEnabled(True)
+        self.result_label.setText(f'找到 {len(results)} 个结果（{elapsed:.1f} 毫秒）')
+
+    def closeEvent(self, event):
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        event.accept()
+
+    def reject(self):
+        if self.worker and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        super().reject()
+
+
+class HostInventoryDialog(QDialog):
+    """查看合并后的多主机清单"""
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.inventory = HostInventory(path)
+        # 移除帮助按钮
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.init_ui(path)
+        self.run_query()
+
+    def init_ui(self, path):
+        self.setWindowTitle(f'主机清单 - {path}')
+        self.setGeometry(320, 320, 820, 480)
+
+        layout = QVBoxLayout(self)
+
+        # 主机筛选和查询输入
+        query_layout = QHBoxLayout()
+        self.host_combo = QComboBox()
+        self.host_combo.addItem('全部主机', None)
+        for name, exported_at, platform_name, count in self.inventory.hosts():
+            exported = time.strftime('%Y-%m-%d %H:%M', time.localtime(exported_at)) if exported_at else '未知'
+            self.host_combo.addItem(f'{name}（{count} 个环境）', name)
+            self.host_combo.setItemData(self.host_combo.count() - 1,
+                                        f'{platform_name}\n导出时间: {exported}', Qt.ToolTipRole)
+        self.host_combo.currentIndexChanged.connect(self.run_query)
+        query_layout.addWidget(self.host_combo)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText('输入包名和版本约束，如 numpy<2；留空列出所有环境')
+        self.query_input.returnPressed.connect(self.run_query)
+        query_layout.addWidget(self.query_input)
+
+        query_btn = QPushButton('查询')
+        query_btn.clicked.connect(self.run_query)
+        query_layout.addWidget(query_btn)
+        layout.addLayout(query_layout)
+
+        self.result_table = QTableWidget(0, 0)
+        self.result_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.result_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.result_table.setAlternatingRowColors(True)
+        self.result_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.result_table)
+
+        self.result_label = QLabel()
+        layout.addWidget(self.result_label)
+
+    def run_query(self):
+        """按包查询；输入为空时列出所选主机的所有环境"""
+        text = self.query_input.text().strip()
+        host = self.host_combo.currentData()
+
+        start = time.perf_counter()
+        if text:
+            try:
+                results = self.inventory.query(text, host)
+            except ValueError as e:
+                QMessageBox.warning(self, '警告', str(e))
+                return
+            headers = ['主机', '虚拟环境', '包名', '版本', '大小']
+            rows = [[pkg.host, pkg.venv, pkg.name, pkg.version,
+                     format_size(pkg.size) if pkg.size is not None else '']
+                    for pkg in results]
+        else:
+            results = self.inventory.venvs(host)
+            headers = ['主机', '虚拟环境', 'Python版本', '包数量']
+            rows = [[venv.host, venv.venv, venv.python_version or '', str(venv.package_count)]
+                    for venv in results]
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.result_table.setSortingEnabled(False)
+        self.result_table.clear()
+        self.result_table.setColumnCount(len(headers))
+        self.result_table.setHorizontalHeaderLabels(headers)
+        self.result_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.result_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                self.result_table.setItem(row, col, QTableWidgetItem(value))
+        self.result_table.setSortingEnabled(True)
+        self.result_label.setText(f'找到 {len(rows)} 个结果（{elapsed:.1f} 毫秒）')
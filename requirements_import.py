@@ -0,0 +1,531 @@
+"""导入 requirements 文件
+
+解析完整的 requirements 语法（-r / -c 嵌套文件、-e、索引选项、环境标记、
+--hash），按目标解释器对环境标记求值后合并重复的依赖，然后分三步安装：
+
+  1. 所有依赖都用 == 固定版本（或带 --hash）时，先尝试只用本地 wheel 缓存
+     离线安装，缓存已齐全时不访问网络；有未固定版本的依赖时跳过这一步，
+     避免装上缓存中的旧版本
+  2. 用 pip install --dry-run --report 解析出完整的依赖列表，
+     并行下载到本地缓存（校验 sha256）；环境中的 pip 不支持 --report
+     （低于 22.2）时直接 pip install
+  3. 一次 pip install --no-index --find-links <缓存> 离线安装全部依赖
+
+同一份 requirements 导入多个环境时，只有第一次需要下载；多个导入同时进行时
+可以共享一个 DownloadRegistry，同一个文件只下载一次。
+"""
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import namedtuple, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from create_pipeline import WHEEL_CACHE_DIR, download_to_cache
+from dist_metadata import Requirement, InvalidRequirement, canonicalize_name
+
+# 一条依赖: 依赖文本（不含 --hash 等选项）, 规范化包名（直接引用且无法确定包名时为 None）,
+# 可编辑安装, 哈希列表, 来源（文件:行号）
+ReqLine = namedtuple('ReqLine', 'text name editable hashes source')
+
+# 解析结果: 依赖, 约束, 全局选项 {选项: [值]}, 因环境标记跳过的依赖, 被合并的重复依赖数, 错误
+ParsedRequirements = namedtuple('ParsedRequirements',
+                                'requirements constraints options skipped duplicates errors')
+
+_COMMENT_RE = re.compile(r'(^|\s+)#.*$')
+_ENV_VAR_RE = re.compile(r'\$\{([A-Z0-9_]+)\}')
+
+# 作用于整个文件的选项（写入合并后的 requirements 文件，并传给解析步骤）
+_GLOBAL_OPTIONS = {
+    '-i': '--index-url', '--index-url': '--index-url',
+    '--extra-index-url': '--extra-index-url',
+    '-f': '--find-links', '--find-links': '--find-links',
+    '--trusted-host': '--trusted-host',
+    '--no-binary': '--no-binary', '--only-binary': '--only-binary',
+}
+_GLOBAL_FLAGS = ('--pre', '--no-index', '--prefer-binary', '--require-hashes')
+# 单条依赖的选项
+_PER_REQ_OPTIONS = ('--hash', '--config-settings', '--global-option')
+
+
+def _logical_lines(path, content=None):
+    """读取文件（或直接给出的内容），合并续行、去掉注释，产出 (行号, 内容)"""
+    text = Path(path).read_text(encoding='utf-8') if content is None else content
+    buffer = ''
+    start = None
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if start is None:
+            start = lineno
+        if line.endswith('\\'):
+            buffer += line[:-1] + ' '
+            continue
+        line = _COMMENT_RE.sub('', buffer + line).strip()
+        buffer = ''
+        if line:
+            yield start, _ENV_VAR_RE.sub(lambda m: os.environ.get(m.group(1), m.group(0)), line)
+        start = None
+
+
+def _break_args_options(line):
+    """把一行拆成依赖文本和选项两部分（与 pip 相同：遇到第一个以 - 开头的词为止）
+
+    依赖文本不经过 shlex 处理，环境标记中的引号得以保留。
+    """
+    tokens = line.split(' ')
+    args = []
+    for i, token in enumerate(tokens):
+        if token.startswith('-'):
+            return ' '.join(args).rstrip(), ' '.join(tokens[i:])
+        args.append(token)
+    return ' '.join(args).rstrip(), ''
+
+
+def _split_option(token, tokens):
+    """拆分 "--opt=value" 或 "--opt value"，返回 (选项, 值)"""
+    if token.startswith('--') and '=' in token:
+        return token.split('=', 1)
+    if len(token) > 2 and token.startswith('-') and not token.startswith('--'):
+        # -rfile / -cfile 的写法
+        return token[:2], token[2:]
+    return token, tokens.pop(0) if tokens else ''
+
+
+def _resolve_path(base_dir, value):
+    """嵌套文件路径相对于当前文件；URL 原样返回"""
+    if re.match(r'^[a-z][a-z0-9+.-]*://', value, re.I):
+        return value
+    path = Path(os.path.expanduser(value))
+    return path if path.is_absolute() else Path(base_dir) / path
+
+
+def _parse_file(path, constraint, result, seen_files, marker_env, content=None):
+    path = Path(path)
+    key = os.path.realpath(path)
+    if key in seen_files:
+        # 循环引用或重复引用同一文件
+        return
+    seen_files.add(key)
+
+    for lineno, line in _logical_lines(path, content):
+        source = f"{path.name}:{lineno}"
+        text, options_str = _break_args_options(line)
+        try:
+            tokens = shlex.split(options_str, posix=os.name != 'nt')
+        except ValueError as e:
+            result.errors.append(f"{source}: {e}")
+            continue
+
+        editable = False
+        if not text:
+            token = tokens.pop(0)
+            option, value = (token, None) if token in _GLOBAL_FLAGS else _split_option(token, tokens)
+            if option in ('-e', '--editable'):
+                editable = True
+                text = value
+                if text and not re.match(r'^[a-z][a-z0-9+.-]*:', text, re.I):
+                    text = str(_resolve_path(path.parent, text))
+            elif option in ('-r', '--requirement', '-c', '--constraint'):
+                include = _resolve_path(path.parent, value)
+                if isinstance(include, str):
+                    result.errors.append(f"{source}: 不支持引用远程文件 {include}")
+                    continue
+                try:
+                    _parse_file(include, constraint or option in ('-c', '--constraint'),
+                                result, seen_files, marker_env)
+                except OSError as e:
+                    result.errors.append(f"{source}: 无法读取 {include}: {e}")
+                continue
+            elif option in _GLOBAL_OPTIONS:
+                if option in ('-f', '--find-links'):
+                    value = str(_resolve_path(path.parent, value))
+                result.options.setdefault(_GLOBAL_OPTIONS[option], [])
+                if value not in result.options[_GLOBAL_OPTIONS[option]]:
+                    result.options[_GLOBAL_OPTIONS[option]].append(value)
+                continue
+            elif option in _GLOBAL_FLAGS:
+                result.options[option] = []
+                continue
+            else:
+                result.errors.append(f"{source}: 不支持的选项 {option}")
+                continue
+
+        # 单条依赖后面的选项
+        hashes = []
+        while tokens:
+            option, value = _split_option(tokens.pop(0), tokens)
+            if option == '--hash':
+                hashes.append(value)
+            elif option not in _PER_REQ_OPTIONS:
+                result.errors.append(f"{source}: 不支持的选项 {option}")
+
+        name = None
+        if not editable:
+            try:
+                req = Requirement(text)
+            except InvalidRequirement:
+                # 本地路径或 URL 形式的直接引用
+                if not re.match(r'^([a-z][a-z0-9+.-]*:|\.|/|~|[A-Za-z]:\\)', text, re.I):
+                    result.errors.append(f"{source}: 无效的依赖 {text}")
+                    continue
+                if not re.match(r'^[a-z][a-z0-9+.-]*:', text, re.I) or re.match(r'^[A-Za-z]:\\', text):
+                    # 本地路径与 -e 一样相对于当前文件，合并后的文件写在临时目录中
+                    text = str(_resolve_path(path.parent, text))
+            else:
+                if req.marker is not None and marker_env is not None:
+                    try:
+                        applies = req.marker.evaluate(marker_env)
+                    except Exception:
+                        applies = True
+                    if not applies:
+                        result.skipped.append(ReqLine(text, canonicalize_name(req.name), False, hashes, source))
+                        continue
+                name = canonicalize_name(req.name)
+
+        target = result.constraints if constraint else result.requirements
+        target.append(ReqLine(text, name, editable, hashes, source))
+
+
+def _merge(lines, markers_evaluated=True):
+    """合并同名依赖：版本约束取交集，extras 和哈希取并集；返回 (合并后的列表, 被合并的数量)
+
+    markers_evaluated 为 False（没有按环境标记过滤）时，带环境标记的依赖不参与合并，
+    否则合并后会丢掉 marker，把条件依赖变成无条件依赖。
+    """
+    merged = OrderedDict()
+    duplicates = 0
+    for line in lines:
+        if line.name is None or line.editable:
+            merged[(line.text, line.source)] = line
+            continue
+        new_req = Requirement(line.text)
+        if not markers_evaluated and new_req.marker is not None:
+            merged[(line.text, line.source)] = line
+            continue
+        if line.name not in merged:
+            merged[line.name] = line
+            continue
+
+        duplicates += 1
+        old = merged[line.name]
+        old_req = Requirement(old.text)
+        if old_req.url or new_req.url:
+            # 直接引用无法合并，以先出现的为准
+            continue
+        # 带 marker 的依赖只有在已按环境标记过滤后才会走到这里，合并后不再保留 marker
+        extras = sorted(set(old_req.extras) | set(new_req.extras))
+        specifier = old_req.specifier & new_req.specifier
+        text = old_req.name + (f"[{','.join(extras)}]" if extras else '') + str(specifier)
+        hashes = old.hashes + [h for h in line.hashes if h not in old.hashes]
+        merged[line.name] = ReqLine(text, line.name, False, hashes, f"{old.source}, {line.source}")
+    return list(merged.values()), duplicates
+
+
+def parse_requirements(path, marker_env=None):
+    """解析 requirements 文件
+
+    Args:
+        path: requirements 文件路径
+        marker_env: 目标解释器的环境标记变量（见 interpreter_probe.marker_environment），
+            为 None 时不按环境标记过滤
+
+    Returns:
+        ParsedRequirements
+    """
+    return _parse(path, marker_env)
+
+
+def parse_requirement_lines(lines, base_dir, marker_env=None, label='<清单>'):
+    """解析直接给出的 requirements 行（语法与文件相同，可以包含 -r 等选项）
+
+    Args:
+        lines: 依赖行列表
+        base_dir: 相对路径（-r、本地路径等）的基准目录
+        marker_env: 同 parse_requirements
+        label: 错误信息中显示的来源名称
+
+    Returns:
+        ParsedRequirements
+    """
+    return _parse(Path(base_dir) / label, marker_env, '\n'.join(lines))
+
+
+def _parse(path, marker_env, content=None):
+    result = ParsedRequirements([], [], OrderedDict(), [], 0, [])
+    _parse_file(path, False, result, set(), marker_env, content)
+    requirements, duplicates = _merge(result.requirements, marker_env is not None)
+    constraints, _ = _merge(result.constraints, marker_env is not None)
+    return result._replace(requirements=requirements, constraints=constraints, duplicates=duplicates)
+
+
+def _format_line(line):
+    return line.text + ''.join(f" --hash={h}" for h in line.hashes)
+
+
+def _option_args(options):
+    """全局选项转换为 pip 命令行参数"""
+    args = []
+    for option, values in options.items():
+        if not values:
+            args.append(option)
+        for value in values:
+            args += [option, value]
+    return args
+
+
+class DownloadRegistry:
+    """多个导入任务共享的下载登记：同一个文件只下载一次，其余任务等待同一个结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def fetch(self, filename, download):
+        """下载 filename（download 为实际下载的函数），已有任务在下载时等待其结果"""
+        with self._lock:
+            future = self._futures.get(filename)
+            owner = future is None
+            if owner:
+                future = self._futures[filename] = Future()
+        if not owner:
+            return future.result()
+        try:
+            download()
+        except BaseException as e:
+            # 下载失败时移除登记，之后的任务可以重试
+            with self._lock:
+                self._futures.pop(filename, None)
+            future.set_exception(e)
+            raise
+        future.set_result(None)
+
+
+class RequirementsImporter:
+    """预下载并离线安装 requirements
+
+    Args:
+        python_path: 目标环境的解释器
+        parsed: ParsedRequirements
+        wheel_dir: 本地 wheel 缓存目录
+        max_workers: 并行下载的线程数
+        progress: 可选回调 progress(百分比, 信息)
+        is_cancelled: 可选回调，返回 True 时在下一步开始前停止
+        registry: 可选的 DownloadRegistry，多个导入同时进行时共享的文件只下载一次
+    """
+
+    def __init__(self, python_path, parsed, wheel_dir=WHEEL_CACHE_DIR, max_workers=8,
+                 progress=None, is_cancelled=None, registry=None):
+        self.python_path = str(python_path)
+        self.parsed = parsed
+        self.wheel_dir = Path(wheel_dir)
+        self.max_workers = max(1, max_workers)
+        self.progress = progress or (lambda value, message: None)
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.registry = registry
+        self.timings = OrderedDict()
+
+    def _pip(self, *args):
+        return subprocess.run([self.python_path, '-m', 'pip', *args, '--disable-pip-version-check'],
+                              capture_output=True, text=True)
+
+    def _write_files(self, tmp_dir):
+        """生成合并后的 requirements 和 constraints 文件"""
+        req_file = Path(tmp_dir) / 'requirements.txt'
+        req_file.write_text('\n'.join(
+            (('-e ' if line.editable else '') + _format_line(line)) for line in self.parsed.requirements
+        ) + '\n', encoding='utf-8')
+        args = ['-r', str(req_file)]
+        if self.parsed.constraints:
+            con_file = Path(tmp_dir) / 'constraints.txt'
+            con_file.write_text('\n'.join(_format_line(line) for line in self.parsed.constraints) + '\n',
+                                encoding='utf-8')
+            args += ['-c', str(con_file)]
+        return args
+
+    def _offline_install(self, req_args):
+        # 文件中的 --find-links 与本地缓存一起使用，索引选项在离线安装时忽略
+        find_links = []
+        for value in self.parsed.options.get('--find-links', []):
+            find_links += ['--find-links', value]
+        flags = [o for o in ('--pre', '--require-hashes') if o in self.parsed.options]
+        return self._pip('install', '--no-index', '--find-links', str(self.wheel_dir),
+                         *find_links, *flags, *req_args)
+
+    def _all_pinned(self):
+        """所有依赖是否都固定了版本（== / === 且不含通配符，或带 --hash），
+        只有这时本地缓存中的文件才一定是想要的版本"""
+        for line in self.parsed.requirements:
+            if line.hashes:
+                continue
+            if line.editable or line.name is None:
+                return False
+            try:
+                req = Requirement(line.text)
+            except InvalidRequirement:
+                return False
+            if req.url:
+                continue
+            specs = list(req.specifier)
+            if len(specs) != 1 or specs[0].operator not in ('==', '===') or '*' in specs[0].version:
+                return False
+        return True
+
+    def _online_install(self, req_args):
+        """环境中的 pip 不支持 --report 时直接联网安装"""
+        result = self._pip('install', *_option_args(self.parsed.options), *req_args)
+        if result.returncode != 0:
+            raise Exception(result.stderr.strip() or "安装失败")
+
+    def _resolve(self, req_args, tmp_dir):
+        """解析完整的依赖集合，返回需要下载的 [(文件名, URL, sha256 或 None)]
+
+        环境中的 pip 不支持 --dry-run / --report 时返回 None。
+        """
+        report = Path(tmp_dir) / 'report.json'
+        result = self._pip('install', '--dry-run', '--quiet', '--report', str(report),
+                           *_option_args(self.parsed.options), *req_args)
+        if result.returncode != 0:
+            if 'no such option' in result.stderr:
+                return None
+            raise Exception(result.stderr.strip() or "解析依赖失败")
+        data = json.loads(report.read_text(encoding='utf-8'))
+
+        downloads = []
+        for item in data.get('install', []):
+            info = item.get('download_info', {})
+            if 'archive_info' not in info:
+                # 本地目录、VCS 等直接引用由 pip 安装时处理
+                continue
+            url = info['url']
+            filename = urllib.parse.unquote(url.rsplit('/', 1)[-1].split('#', 1)[0].split('?', 1)[0])
+            hashes = info['archive_info'].get('hashes') or {}
+            sha256 = hashes.get('sha256')
+            if not sha256:
+                legacy = info['archive_info'].get('hash', '')
+                sha256 = legacy.split('=', 1)[1] if legacy.startswith('sha256=') else None
+            downloads.append((filename, url, sha256))
+        return downloads
+
+    def _cached(self, filename, sha256):
+        path = self.wheel_dir / filename
+        if not path.exists():
+            return False
+        return sha256 is None or _file_sha256(path) == sha256
+
+    def _download(self, filename, url, sha256):
+        """下载单个文件到缓存（先写临时文件，校验后再改名）"""
+        target = self.wheel_dir / filename
+        tmp = target.with_name(f".{filename}.{os.getpid()}.{id(url)}.part")
+        digest = hashlib.sha256()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response, open(tmp, 'wb') as f:
+                while True:
+                    chunk = response.read(1024 * 256)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+            if sha256 and digest.hexdigest() != sha256:
+                raise Exception("sha256 校验失败")
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _fetch(self, filename, url, sha256):
+        if self.registry is None:
+            return self._download(filename, url, sha256)
+        return self.registry.fetch(filename, lambda: self._cached(filename, sha256)
+                                   or self._download(filename, url, sha256))
+
+    def _prefetch(self, downloads):
+        """并行下载缺少的文件，返回下载失败的 {文件名: 错误}"""
+        missing = [d for d in downloads if not self._cached(d[0], d[2])]
+        failed = {}
+        if not missing:
+            return failed
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+            futures = {executor.submit(self._fetch, *d): d for d in missing}
+            for done, future in enumerate(as_completed(futures), 1):
+                filename = futures[future][0]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[filename] = str(e)
+                self.progress(30 + int(done * 50 / len(missing)), f"正在下载 ({done}/{len(missing)}): {filename}")
+        return failed
+
+    def _timed(self, name, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def run(self):
+        """执行导入，返回 (是否成功, 说明)"""
+        if not self.parsed.requirements:
+            return False, "没有需要安装的依赖"
+        self.wheel_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='venv_import_')
+        try:
+            req_args = self._write_files(tmp_dir)
+
+            # 1. 全部固定版本且本地缓存已齐全时直接离线安装
+            if self._all_pinned():
+                self.progress(5, "正在尝试使用本地缓存安装...")
+                result = self._timed('离线安装(缓存)', self._offline_install, req_args)
+                if result.returncode == 0:
+                    return True, "已从本地缓存安装全部依赖"
+                if self.is_cancelled():
+                    return False, "导入已取消"
+
+            # 2. 解析依赖并并行下载到缓存
+            self.progress(15, "正在解析依赖...")
+            downloads = self._timed('解析依赖', self._resolve, req_args, tmp_dir)
+            if self.is_cancelled():
+                return False, "导入已取消"
+            if downloads is None:
+                self.progress(30, "pip 版本较旧，不支持预先解析，正在直接安装...")
+                self._timed('安装', self._online_install, req_args)
+                return True, "已安装全部依赖（环境中的 pip 低于 22.2，未使用本地缓存）"
+            self.progress(30, f"正在下载 {len(downloads)} 个文件...")
+            failed = self._timed('并行下载', self._prefetch, downloads)
+            if failed:
+                # 下载失败的文件交给 pip download（可以使用 pip 的代理和认证配置）
+                names = [url for filename, url, _ in downloads if filename in failed]
+                try:
+                    download_to_cache(self.python_path, ['--no-deps', *names], self.wheel_dir)
+                except Exception:
+                    raise Exception("下载失败:\n" + '\n'.join(f"{k}: {v}" for k, v in failed.items()))
+            if self.is_cancelled():
+                return False, "导入已取消"
+
+            # 3. 一次离线安装
+            self.progress(85, "正在安装...")
+            result = self._timed('离线安装', self._offline_install, req_args)
+            if result.returncode != 0:
+                raise Exception(result.stderr.strip() or "安装失败")
+            return True, f"已安装全部依赖（下载 {len(downloads)} 个文件）"
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def format_timings(self):
+        """格式化各步骤耗时"""
+        return '\n'.join(f"{name}: {seconds:.2f} 秒" for name, seconds in self.timings.items())
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 256), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,324 @@
+"""虚拟环境扫描器
+
+所有根目录下待扫描的目录放在同一个按深度排序的队列中，任何线程都可以
+取走任何待扫描目录，因此一个很深的子目录树不会拖住整体进度；
+浅层目录总是先被扫描，浅层的虚拟环境会最先出现在结果中。
+
+扫描结果通过生成器逐条产出，扫描线程与消费者之间只有一个有界队列，
+扫描器本身不会累积结果；需要保存完整列表（如根目录缓存）由调用方决定。
+回调（get_version / on_progress）抛出的异常计入 errors，不会中断扫描。
+
+自适应模式下线程数随文件系统调整：统计每次 scandir 的平均耗时和每个周期
+扫描的目录数，延迟高（NFS/SMB 等网络文件系统）且待扫描目录积压时成倍增加
+线程，增加后吞吐量没有明显提升就退回；延迟很低（本地 SSD、目录已缓存）时
+减少到 CPU 核数，避免线程空转争抢锁。
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+_SENTINEL_DEPTH = float('inf')
+_DONE = object()
+
+# 扫描到的虚拟环境: 根目录, 相对路径, 完整路径, 深度, Python版本（未获取时为空字符串）
+ScanResult = namedtuple('ScanResult', 'root rel_path path depth python_version')
+
+# 扫描摘要: 虚拟环境数量, 用时（秒）, 无法读取的目录数, 错误信息（最多保留 MAX_ERRORS 条）,
+# 扫描的目录数, 是否已取消, 结束时的线程数, 扫描过程中的最大线程数
+ScanSummary = namedtuple('ScanSummary', 'count duration error_count errors visited cancelled '
+                                        'workers peak_workers')
+
+# 自适应线程数的参数
+ADAPTIVE_START_WORKERS = 8      # 初始线程数（不超过 max_workers）
+ADAPTIVE_MIN_WORKERS = 2
+ADAPTIVE_MAX_WORKERS = 128
+ADJUST_INTERVAL = 0.25          # 调整周期（秒）
+SLOW_SCANDIR = 0.002            # 平均 scandir 耗时超过该值视为高延迟文件系统
+FAST_SCANDIR = 0.0002           # 低于该值视为本地缓存命中
+MIN_GAIN = 1.1                  # 增加线程后吞吐量至少提升 10% 才保留
+
+
+def is_venv_dir(path):
+    """检查是否为虚拟环境
+
+    解释器是失效的符号链接（基础解释器已删除）时同样视为虚拟环境，
+    这样损坏的环境也会出现在列表中，由健康检查标记出来。
+    """
+    if os.name == 'nt':
+        python = os.path.join(path, 'Scripts', 'python.exe')
+    else:
+        python = os.path.join(path, 'bin', 'python')
+    return os.path.lexists(python) or os.path.isfile(os.path.join(path, 'pyvenv.cfg'))
+
+
+class VenvScanner:
+    """广度优先、多线程共享队列的虚拟环境扫描器
+
+    Args:
+        roots: 根目录列表
+        max_depth: 最大扫描深度（根目录的直接子目录深度为 0）
+        max_workers: 扫描线程数（自适应模式下为初始线程数的上限）
+        is_cancelled: 可选回调，返回 True 时停止扫描
+        get_version: 可选回调 get_version(完整路径)，在扫描线程中获取Python版本
+        adaptive: 是否根据 scandir 延迟和吞吐量自动调整线程数
+    """
+    MAX_ERRORS = 100
+    RESULT_QUEUE_SIZE = 256
+
+    def __init__(self, roots, max_depth, max_workers, is_cancelled=None, get_version=None,
+                 adaptive=False):
+        self.roots = [Path(r) for r in roots]
+        self.max_depth = max_depth
+        self.max_workers = max(1, max_workers)
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.get_version = get_version
+        self.adaptive = adaptive
+        self.summary = None
+
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._outstanding = 0
+        self._done = False
+        self._results = None
+        self._on_progress = None
+        # 线程编号小于 _target 的线程取任务，其余线程等待
+        self._target = min(self.max_workers, ADAPTIVE_START_WORKERS) if adaptive else self.max_workers
+        self._threads = []
+        self.peak_workers = 0
+        # 自适应统计: 本周期 scandir 总耗时和次数, 上次调整的时间和已扫描目录数
+        self._scandir_time = 0.0
+        self._scandir_count = 0
+        self._last_adjust = 0.0
+        self._last_visited = 0
+        self._last_grow = None  # 上次增加线程前的 (线程数, 吞吐量)
+        self._hold = 0          # 退回后暂停增加的周期数
+        # 每个根目录已扫描 / 已发现的目录数
+        self.visited = {str(r): 0 for r in self.roots}
+        self.discovered = {str(r): 0 for r in self.roots}
+        self.error_count = 0
+        self.errors = []
+
+    def _record_error(self, path, error):
+        """记录无法读取的目录"""
+        with self._lock:
+            self._record_error_unlocked(path, error)
+
+    def _record_error_unlocked(self, path, error):
+        """记录错误（调用方需持有锁）"""
+        self.error_count += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(f"{path}: {error}")
+
+    def _list_subdirs(self, path):
+        """列出子目录"""
+        subdirs = []
+        start = time.perf_counter()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            subdirs.append(entry.path)
+                    except OSError:
+                        continue
+        finally:
+            if self.adaptive:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._scandir_time += elapsed
+                    self._scandir_count += 1
+        return subdirs
+
+    def _push(self, depth, root, paths):
+        """把目录加入待扫描队列（调用方需持有锁）"""
+        for path in paths:
+            self._queue.put((depth, next(self._seq), root, path))
+        self._outstanding += len(paths)
+        self.discovered[root] += len(paths)
+
+    def _finish_one(self, root):
+        """标记一个目录扫描完成，全部完成时通知所有线程退出"""
+        with self._lock:
+            self._outstanding -= 1
+            if root is not None:
+                self.visited[root] += 1
+            if self._outstanding == 0:
+                self._done = True
+                for _ in self._threads:
+                    self._queue.put((_SENTINEL_DEPTH, next(self._seq), None, None))
+                self._cond.notify_all()
+
+    def _spawn(self, count):
+        """启动到 count 个扫描线程（调用方需持有锁）"""
+        while len(self._threads) < count:
+            thread = threading.Thread(target=self._worker, args=(len(self._threads),), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        self.peak_workers = max(self.peak_workers, min(self._target, len(self._threads)))
+
+    def _set_target(self, target):
+        """调整工作线程数（调用方需持有锁）"""
+        if target == self._target:
+            return
+        self._target = target
+        self._spawn(target)
+        self._cond.notify_all()
+
+    def _adjust(self):
+        """自适应模式下按本周期的 scandir 延迟和吞吐量调整线程数"""
+        now = time.perf_counter()
+        if now - self._last_adjust < ADJUST_INTERVAL:
+            return
+        with self._lock:
+            if self._done:
+                return
+            visited = sum(self.visited.values())
+            throughput = (visited - self._last_visited) / (now - self._last_adjust)
+            count, total = self._scandir_count, self._scandir_time
+            self._scandir_count, self._scandir_time = 0, 0.0
+            self._last_adjust, self._last_visited = now, visited
+            if not count:
+                return
+            latency = total / count
+            target = self._target
+
+            if self._last_grow is not None:
+                previous, previous_throughput = self._last_grow
+                self._last_grow = None
+                if throughput < previous_throughput * MIN_GAIN:
+                    # 增加线程没有带来明显提升（带宽或服务端已饱和），退回并暂停增加
+                    self._set_target(previous)
+                    self._hold = 4
+                    return
+            if self._hold:
+                self._hold -= 1
+                return
+            if latency > SLOW_SCANDIR and self._outstanding > target * 2 and target < ADAPTIVE_MAX_WORKERS:
+                self._last_grow = (target, throughput)
+                self._set_target(min(target * 2, ADAPTIVE_MAX_WORKERS))
+            elif latency < FAST_SCANDIR:
+                cpu_target = max(ADAPTIVE_MIN_WORKERS, os.cpu_count() or 1)
+                if target > cpu_target:
+                    self._set_target(cpu_target)
+
+    def _worker(self, worker_id):
+        # 无论以何种方式退出（包括自适应扩容时启动的线程）都要通知消费者，
+        # 否则 iter_scan 会一直等待这个线程
+        try:
+            while True:
+                with self._cond:
+                    while worker_id >= self._target and not self._done:
+                        self._cond.wait()
+                depth, _, root, path = self._queue.get()
+                if root is None:
+                    return
+                try:
+                    self._scan_one(depth, root, path)
+                except Exception as e:
+                    # 回调等抛出的异常只影响当前目录，线程继续处理队列
+                    self._record_error(path, e)
+                finally:
+                    self._finish_one(root)
+                    if self._on_progress and not self.is_cancelled():
+                        try:
+                            self._on_progress(root, self.visited[root], self.discovered[root])
+                        except Exception as e:
+                            self._record_error(path, e)
+        except BaseException as e:
+            self._record_error(f"扫描线程 {worker_id}", e)
+            raise
+        finally:
+            self._results.put(_DONE)
+
+    def _scan_one(self, depth, root, path):
+        """扫描一个目录：是虚拟环境时产出结果，否则把子目录加入队列"""
+        # 取消后继续清空队列，保证计数归零、线程能正常退出
+        if self.is_cancelled():
+            return
+        if is_venv_dir(path):
+            version = ''
+            if self.get_version:
+                try:
+                    version = self.get_version(path)
+                except Exception as e:
+                    # 获取版本失败时仍然列出该环境
+                    self._record_error(path, e)
+            self._results.put(ScanResult(root, os.path.relpath(path, root), path, depth, version))
+            # 不再进入虚拟环境内部（site-packages 等目录数量巨大）
+            return
+        if depth < self.max_depth:
+            try:
+                children = self._list_subdirs(path)
+            except OSError as e:
+                self._record_error(path, e)
+                children = []
+            if children:
+                with self._lock:
+                    self._push(depth + 1, root, children)
+
+    def iter_scan(self, on_progress=None):
+        """执行扫描，逐条产出 ScanResult
+
+        扫描结束后 self.summary 中保存 ScanSummary。
+
+        Args:
+            on_progress: 可选回调 on_progress(根目录, 已扫描数, 已发现数)，
+                每扫描完一个目录调用一次，在扫描线程中调用
+        """
+        start = time.perf_counter()
+        count = 0
+        initial = []
+        for root in self.roots:
+            try:
+                children = self._list_subdirs(root)
+            except OSError as e:
+                self._record_error(root, e)
+                children = []
+            initial.append((str(root), children))
+        with self._lock:
+            for root, children in initial:
+                self._push(0, root, children)
+            empty = self._outstanding == 0
+
+        if not empty:
+            # 有界队列：消费者处理不过来时扫描线程会等待，结果不会堆积
+            self._results = queue.Queue(maxsize=self.RESULT_QUEUE_SIZE)
+            self._on_progress = on_progress
+            self._last_adjust = time.perf_counter()
+            with self._lock:
+                self._spawn(self._target)
+
+            finished = 0
+            while True:
+                try:
+                    item = self._results.get(timeout=ADJUST_INTERVAL if self.adaptive else None)
+                except queue.Empty:
+                    item = None
+                if self.adaptive:
+                    self._adjust()
+                if item is None:
+                    continue
+                if item is _DONE:
+                    finished += 1
+                    # 每个线程退出时恰好发送一次 _DONE；新线程只会在本线程的 _adjust 中启动，
+                    # 所以收齐时不会再有结果。扫描未完成就全部退出说明线程异常终止，
+                    # 此时直接结束而不是一直等待
+                    with self._lock:
+                        if finished >= len(self._threads):
+                            if not self._done:
+                                self._record_error_unlocked('扫描', '扫描线程异常退出，结果可能不完整')
+                            break
+                    continue
+                count += 1
+                yield item
+
+        self.summary = ScanSummary(count, time.perf_counter() - start, self.error_count,
+                                   list(self.errors), sum(self.visited.values()),
+                                   bool(self.is_cancelled()),
+                                   min(self._target, len(self._threads)), self.peak_workers)
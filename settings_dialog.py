@@ -1,6 +1,8 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, 
-                           QLabel, QCheckBox, QSpinBox, QGroupBox, QFormLayout)
+                           QLabel, QCheckBox, QSpinBox, QGroupBox, QFormLayout, QLineEdit,
+                           QListWidget, QFileDialog, QComboBox)
 from PyQt5.QtCore import Qt, QSettings
+from log_setup import LOG_LEVELS
 
 class SettingsDialog(QDialog):
     def __init__(self, config, parent=None):
@@ -36,9 +38,53 @@ class SettingsDialog(QDialog):
         self.max_threads.setToolTip('扫描时使用的最大线程数')
         general_layout.addRow('最大线程数:', self.max_threads)
 
+        # 自适应扫描线程数
+        self.scan_adaptive = QCheckBox('根据文件系统延迟自动调整扫描线程数')
+        self.scan_adaptive.setToolTip('网络文件系统上自动增加线程，本地磁盘上减少线程；'
+                                      '最大线程数作为初始线程数的上限')
+        general_layout.addRow('', self.scan_adaptive)
+
+        # 后台索引服务
+        self.use_indexer = QCheckBox('使用后台索引服务（已启动时）')
+        self.use_indexer.setToolTip('通过 python cli.py daemon 启动后，环境列表和包列表直接向服务查询，'
+                                    '不再重复扫描')
+        general_layout.addRow('', self.use_indexer)
+
+        # 日志级别设置
+        log_layout = QHBoxLayout()
+        self.log_level = QComboBox()
+        self.log_level.addItems(LOG_LEVELS)
+        self.log_level.setToolTip('写入日志文件的最低级别')
+        log_layout.addWidget(self.log_level)
+        self.log_json = QCheckBox('JSON格式')
+        self.log_json.setToolTip('每条日志输出为一行 JSON，便于其他工具处理')
+        log_layout.addWidget(self.log_json)
+        general_layout.addRow('日志级别:', log_layout)
+
         general_group.setLayout(general_layout)
         layout.addWidget(general_group)
 
+        # 扫描目录设置组
+        roots_group = QGroupBox('额外扫描目录')
+        roots_layout = QVBoxLayout()
+        
+        self.scan_roots = QListWidget()
+        self.scan_roots.setToolTip('除当前路径外同时扫描的目录，结果合并显示')
+        self.scan_roots.setMaximumHeight(100)
+        roots_layout.addWidget(self.scan_roots)
+        
+        roots_btn_layout = QHBoxLayout()
+        add_root_btn = QPushButton('添加')
+        remove_root_btn = QPushButton('移除')
+        add_root_btn.clicked.connect(self.add_scan_root)
+        remove_root_btn.clicked.connect(self.remove_scan_root)
+        roots_btn_layout.addWidget(add_root_btn)
+        roots_btn_layout.addWidget(remove_root_btn)
+        roots_layout.addLayout(roots_btn_layout)
+        
+        roots_group.setLayout(roots_layout)
+        layout.addWidget(roots_group)
+
         # 包管理设置组
         pkg_group = QGroupBox('包管理设置')
         pkg_layout = QVBoxLayout()
@@ -56,6 +102,11 @@ class SettingsDialog(QDialog):
         self.show_pkg_size.setToolTip('在包列表中显示包大小')
         first_row_layout.addWidget(self.show_pkg_size)
         
+        # 预读包列表
+        self.prefetch_packages = QCheckBox('预读包列表')
+        self.prefetch_packages.setToolTip('在列表中选中环境时后台读取包列表，打开包管理器时直接显示')
+        first_row_layout.addWidget(self.prefetch_packages)
+        
         pkg_layout.addLayout(first_row_layout)
         
         # 第二行：显示Python版本
@@ -66,11 +117,87 @@ class SettingsDialog(QDialog):
         self.show_python_version.setToolTip('在虚拟环境列表中显示Python版本')
         second_row_layout.addWidget(self.show_python_version)
         
+        # 显示环境大小和包数量
+        self.show_venv_details = QCheckBox('显示环境大小')
+        self.show_venv_details.setToolTip('在虚拟环境列表中显示占用空间和包数量（只读取可见的行）')
+        second_row_layout.addWidget(self.show_venv_details)
+        
+        # 创建后的步骤并行执行
+        self.parallel_post_create = QCheckBox('并行执行创建后步骤')
+        self.parallel_post_create.setToolTip('创建环境后互不依赖的步骤（读取解释器信息、缓存wheel等）并行执行')
+        second_row_layout.addWidget(self.parallel_post_create)
+        
         pkg_layout.addLayout(second_row_layout)
         
+        # 修改环境前建立快照
+        snapshot_layout = QHBoxLayout()
+        self.snapshot_before_changes = QCheckBox('安装/升级/卸载前建立快照')
+        self.snapshot_before_changes.setToolTip('用硬链接保存 site-packages 和脚本目录，几乎不占用额外空间，'
+                                                '可以在包管理器中回滚')
+        snapshot_layout.addWidget(self.snapshot_before_changes)
+        snapshot_layout.addWidget(QLabel('最多保留:'))
+        self.snapshot_keep = QSpinBox()
+        self.snapshot_keep.setRange(1, 100)
+        self.snapshot_keep.setToolTip('每个环境最多保留的快照数量，超出时删除最旧的快照')
+        snapshot_layout.addWidget(self.snapshot_keep)
+        snapshot_layout.addStretch()
+        pkg_layout.addLayout(snapshot_layout)
+        
+        # 创建方式
+        create_layout = QFormLayout()
+        self.venv_symlinks = QComboBox()
+        self.venv_symlinks.addItem('自动', 'auto')
+        self.venv_symlinks.addItem('符号链接', 'symlinks')
+        self.venv_symlinks.addItem('复制', 'copies')
+        self.venv_symlinks.setToolTip('新环境中的解释器使用符号链接还是复制（自动: Windows 复制，其他平台符号链接）')
+        create_layout.addRow('解释器创建方式:', self.venv_symlinks)
+        
+        self.batch_parallel = QSpinBox()
+        self.batch_parallel.setRange(1, 32)
+        self.batch_parallel.setToolTip('按清单批量创建时同时创建的环境数量')
+        create_layout.addRow('批量创建并行数:', self.batch_parallel)
+        pkg_layout.addLayout(create_layout)
+        
+        # 检查更新使用的索引
+        index_layout = QFormLayout()
+        self.index_url = QLineEdit()
+        self.index_url.setToolTip('PEP 503/691 简单索引地址，可以是远程地址、本地镜像或本地目录')
+        index_layout.addRow('索引地址:', self.index_url)
+        
+        self.index_cache_ttl = QSpinBox()
+        self.index_cache_ttl.setRange(0, 7 * 24 * 3600)
+        self.index_cache_ttl.setSuffix(' 秒')
+        self.index_cache_ttl.setToolTip('索引页面的缓存有效期，过期后按ETag重新验证')
+        index_layout.addRow('索引缓存时间:', self.index_cache_ttl)
+        
+        pkg_layout.addLayout(index_layout)
+        
         pkg_group.setLayout(pkg_layout)
         layout.addWidget(pkg_group)
 
+        # 归档设置组
+        archive_group = QGroupBox('归档设置')
+        archive_layout = QFormLayout()
+        
+        archive_dir_layout = QHBoxLayout()
+        self.archive_dir = QLineEdit()
+        self.archive_dir.setPlaceholderText('默认: ~/.venv_manager/archives')
+        self.archive_dir.setToolTip('归档的虚拟环境保存的目录')
+        archive_dir_layout.addWidget(self.archive_dir)
+        browse_archive_btn = QPushButton('浏览')
+        browse_archive_btn.clicked.connect(self.browse_archive_dir)
+        archive_dir_layout.addWidget(browse_archive_btn)
+        archive_layout.addRow('归档目录:', archive_dir_layout)
+        
+        self.archive_compression = QComboBox()
+        self.archive_compression.addItem('xz（压缩率高）', 'xz')
+        self.archive_compression.addItem('gzip（速度快）', 'gz')
+        self.archive_compression.setToolTip('归档时使用的压缩方式，分块并行压缩')
+        archive_layout.addRow('压缩方式:', self.archive_compression)
+        
+        archive_group.setLayout(archive_layout)
+        layout.addWidget(archive_group)
+
         # 按钮
         btn_layout = QHBoxLayout()
         save_btn = QPushButton('保存')
@@ -91,20 +218,51 @@ class SettingsDialog(QDialog):
         self.auto_refresh.setChecked(self.config.get('auto_refresh'))
         self.scan_depth.setValue(self.config.get('scan_depth'))
         self.max_threads.setValue(self.config.get('max_threads'))
+        self.scan_adaptive.setChecked(self.config.get('scan_adaptive'))
+        self.use_indexer.setChecked(self.config.get('use_indexer'))
+        self.log_level.setCurrentIndex(max(self.log_level.findText(self.config.get('log_level')), 0))
+        self.log_json.setChecked(self.config.get('log_json'))
+        self.prefetch_packages.setChecked(self.config.get('prefetch_packages'))
         self.auto_upgrade_pip.setChecked(self.config.get('auto_upgrade_pip'))
         self.show_pkg_size.setChecked(self.config.get('show_pkg_size'))
         self.show_python_version.setChecked(self.config.get('show_python_version'))
+        self.show_venv_details.setChecked(self.config.get('show_venv_details'))
+        self.parallel_post_create.setChecked(self.config.get('parallel_post_create'))
+        self.snapshot_before_changes.setChecked(self.config.get('snapshot_before_changes'))
+        self.snapshot_keep.setValue(self.config.get('snapshot_keep'))
+        index = self.venv_symlinks.findData(self.config.get('venv_symlinks'))
+        self.venv_symlinks.setCurrentIndex(max(index, 0))
+        self.batch_parallel.setValue(self.config.get('batch_parallel'))
+        self.index_url.setText(self.config.get('index_url'))
+        self.index_cache_ttl.setValue(self.config.get('index_cache_ttl'))
+        self.scan_roots.clear()
+        self.scan_roots.addItems(self.config.get('scan_roots'))
+        self.archive_dir.setText(self.config.get('archive_dir'))
+        index = self.archive_compression.findData(self.config.get('archive_compression'))
+        self.archive_compression.setCurrentIndex(max(index, 0))
 
     def save_settings(self):
         """保存设置到配置"""
-        self.config.set('auto_refresh', self.auto_refresh.isChecked())
-        self.config.set('scan_depth', self.scan_depth.value())
-        self.config.set('max_threads', self.max_threads.value())
-        self.config.set('auto_upgrade_pip', self.auto_upgrade_pip.isChecked())
-        self.config.set('show_pkg_size', self.show_pkg_size.isChecked())
-        self.config.set('show_python_version', self.show_python_version.isChecked())
+        # 实际写入在 accept 中完成，避免重复写入
         self.accept()
 
+    def add_scan_root(self):
+        """添加扫描目录"""
+        path = QFileDialog.getExistingDirectory(self, '选择要扫描的目录')
+        if path and not self.scan_roots.findItems(path, Qt.MatchExactly):
+            self.scan_roots.addItem(path)
+
+    def remove_scan_root(self):
+        """移除选中的扫描目录"""
+        for item in self.scan_roots.selectedItems():
+            self.scan_roots.takeItem(self.scan_roots.row(item))
+
+    def browse_archive_dir(self):
+        """选择归档目录"""
+        path = QFileDialog.getExistingDirectory(self, '选择归档目录', self.archive_dir.text())
+        if path:
+            self.archive_dir.setText(path)
+
     def reset_settings(self):
         """重置为默认设置"""
         self.config.clear()
@@ -113,11 +271,30 @@ class SettingsDialog(QDialog):
 
     def accept(self):
         """保存设置并关闭对话框"""
-        self.config.set('auto_refresh', self.auto_refresh.isChecked())
-        self.config.set('scan_depth', self.scan_depth.value())
-        self.config.set('max_threads', self.max_threads.value())
-        self.config.set('auto_upgrade_pip', self.auto_upgrade_pip.isChecked())
-        self.config.set('show_pkg_size', self.show_pkg_size.isChecked())
-        self.config.set('show_python_version', self.show_python_version.isChecked())
+        # 批量写入，只触发一次同步
+        self.config.update({
+            'auto_refresh': self.auto_refresh.isChecked(),
+            'scan_depth': self.scan_depth.value(),
+            'max_threads': self.max_threads.value(),
+            'scan_adaptive': self.scan_adaptive.isChecked(),
+            'use_indexer': self.use_indexer.isChecked(),
+            'log_level': self.log_level.currentText(),
+            'log_json': self.log_json.isChecked(),
+            'prefetch_packages': self.prefetch_packages.isChecked(),
+            'auto_upgrade_pip': self.auto_upgrade_pip.isChecked(),
+            'show_pkg_size': self.show_pkg_size.isChecked(),
+            'show_python_version': self.show_python_version.isChecked(),
+            'show_venv_details': self.show_venv_details.isChecked(),
+            'parallel_post_create': self.parallel_post_create.isChecked(),
+            'snapshot_before_changes': self.snapshot_before_changes.isChecked(),
+            'snapshot_keep': self.snapshot_keep.value(),
+            'venv_symlinks': self.venv_symlinks.currentData(),
+            'batch_parallel': self.batch_parallel.value(),
+            'index_url': self.index_url.text().strip() or self.config.defaults['index_url'],
+            'index_cache_ttl': self.index_cache_ttl.value(),
+            'scan_roots': [self.scan_roots.item(i).text() for i in range(self.scan_roots.count())],
+            'archive_dir': self.archive_dir.text().strip(),
+            'archive_compression': self.archive_compression.currentData(),
+        })
         
         super().accept() 
\ No newline at end of file
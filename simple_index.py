@@ -0,0 +1,343 @@
+"""PEP 503 / PEP 691 简单索引客户端
+
+用于检查已安装的包是否有新版本。支持三种索引地址：
+  - http(s):// 远程或本地镜像（如 http://localhost:8080/simple/）
+  - file:// 地址
+  - 本地目录（PEP 503 目录结构，或直接存放 wheel/sdist 的平铺目录）
+
+同一主机的请求复用一个 keep-alive 连接池，项目页面并发获取，
+并按 ETag 和 TTL 缓存到磁盘；多个虚拟环境安装了同一个包时只请求一次。
+"""
+import gzip
+import hashlib
+import html
+import http.client
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from urllib.parse import urlsplit, urljoin, unquote
+from urllib.request import url2pathname
+
+from dist_metadata import canonicalize_name, Version, InvalidVersion
+from app_paths import APP_DATA_DIR
+
+# 可更新的包: 包名, 当前版本, 最新版本
+OutdatedPackage = namedtuple('OutdatedPackage', 'name version latest')
+
+_ACCEPT = ('application/vnd.pypi.simple.v1+json, '
+           'application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01')
+_ANCHOR_RE = re.compile(r'<a\s+([^>]*)>([^<]*)</a>', re.IGNORECASE)
+_YANKED_RE = re.compile(r'data-yanked', re.IGNORECASE)
+_SDIST_EXTS = ('.tar.gz', '.zip', '.tar.bz2', '.tgz', '.tar.xz')
+
+
+def version_from_filename(filename, project):
+    """从分发文件名中解析版本号，无法识别时返回 None"""
+    if filename.endswith('.whl'):
+        parts = filename[:-4].split('-')
+        if len(parts) >= 5 and canonicalize_name(parts[0]) == project:
+            return parts[1]
+        return None
+    for ext in _SDIST_EXTS:
+        if filename.endswith(ext):
+            stem = filename[:-len(ext)]
+            name, sep, version = stem.rpartition('-')
+            if sep and canonicalize_name(name) == project:
+                return version
+            return None
+    return None
+
+
+def parse_project_page(body, content_type, project):
+    """解析项目页面，返回 [(版本, 是否已撤回)]"""
+    files = []
+    if 'json' in content_type:
+        data = json.loads(body)
+        for item in data.get('files', []):
+            files.append((item.get('filename', ''), bool(item.get('yanked'))))
+    else:
+        text = body.decode('utf-8', errors='replace') if isinstance(body, bytes) else body
+        for attrs, label in _ANCHOR_RE.findall(text):
+            href = re.search(r'href\s*=\s*["\']([^"\']*)["\']', attrs, re.IGNORECASE)
+            filename = label.strip()
+            if href and not filename:
+                filename = unquote(href.group(1).split('#')[0].rsplit('/', 1)[-1])
+            files.append((html.unescape(filename), bool(_YANKED_RE.search(attrs))))
+
+    versions = {}
+    for filename, yanked in files:
+        version = version_from_filename(filename, project)
+        if version:
+            # 同一版本只要有一个文件未撤回就视为可用
+            versions[version] = versions.get(version, True) and yanked
+    return sorted(versions.items())
+
+
+def _is_prerelease(version):
+    try:
+        return Version(version).is_prerelease
+    except InvalidVersion:
+        return False
+
+
+def latest_version(versions, current=None):
+    """从 [(版本, 是否已撤回)] 中选出最新的可用版本
+
+    当前版本是预发布版本时才考虑预发布版本。
+    """
+    allow_pre = bool(current) and _is_prerelease(current)
+
+    best = None
+    for version, yanked in versions:
+        if yanked:
+            continue
+        try:
+            parsed = Version(version)
+        except InvalidVersion:
+            continue
+        if parsed.is_prerelease and not allow_pre:
+            continue
+        if best is None or parsed > best:
+            best = parsed
+    return str(best) if best is not None else None
+
+
+class _ConnectionPool:
+    """单个主机的 keep-alive 连接池"""
+
+    def __init__(self, scheme, netloc, size, timeout):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return cls(self.netloc, timeout=self.timeout)
+
+    def request(self, path, headers):
+        """发送 GET 请求，返回 (状态码, 响应对象, 响应体)"""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection()
+
+            for attempt in range(2):
+                try:
+                    conn.request('GET', path, headers=headers)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    break
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    if attempt:
+                        raise
+                    # 空闲连接可能已被服务器关闭，换新连接重试一次
+                    conn = self._new_connection()
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+        if resp.getheader('Content-Encoding', '') == 'gzip':
+            body = gzip.decompress(body)
+        return resp.status, resp, body
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class SimpleIndexClient:
+    """简单索引客户端
+
+    Args:
+        index_url: 索引地址（http(s)://、file:// 或本地目录）
+        cache_ttl: 缓存有效期（秒），过期后使用 ETag 发送条件请求
+        max_workers: 并发请求数，也是连接池大小
+        cache_dir: 缓存目录
+    """
+
+    def __init__(self, index_url, cache_ttl=3600, max_workers=8, timeout=15, cache_dir=None):
+        self.index_url = index_url.rstrip('/') + '/'
+        self.cache_ttl = cache_ttl
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+        parts = urlsplit(index_url)
+        if parts.scheme in ('http', 'https'):
+            self.local_dir = None
+        elif parts.scheme == 'file':
+            self.local_dir = Path(url2pathname(parts.path))
+        else:
+            self.local_dir = Path(index_url).expanduser()
+
+        key = hashlib.sha1(self.index_url.encode('utf-8')).hexdigest()[:16]
+        self.cache_dir = Path(cache_dir) if cache_dir else APP_DATA_DIR / 'index_cache' / key
+        if self.local_dir is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def close(self):
+        """关闭连接池中的所有连接"""
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+
+    def _pool(self, scheme, netloc):
+        with self._pools_lock:
+            pool = self._pools.get((scheme, netloc))
+            if pool is None:
+                pool = _ConnectionPool(scheme, netloc, self.max_workers, self.timeout)
+                self._pools[(scheme, netloc)] = pool
+            return pool
+
+    def get_versions(self, project):
+        """获取项目的所有版本 [(版本, 是否已撤回)]，项目不存在时返回空列表"""
+        project = canonicalize_name(project)
+        if self.local_dir is not None:
+            return self._local_versions(project)
+        return self._remote_versions(project)
+
+    def _local_versions(self, project):
+        """从本地目录读取版本"""
+        project_dir = self.local_dir / project
+        if project_dir.is_dir():
+            index_file = project_dir / 'index.html'
+            if index_file.exists():
+                return parse_project_page(index_file.read_bytes(), 'text/html', project)
+            names = os.listdir(project_dir)
+        else:
+            # 平铺目录（类似 --find-links）
+            try:
+                names = os.listdir(self.local_dir)
+            except OSError:
+                return []
+        return parse_project_page(
+            ''.join(f'<a href="{n}">{html.escape(n)}</a>' for n in names), 'text/html', project)
+
+    def _remote_versions(self, project):
+        """通过 HTTP 获取版本，使用磁盘缓存"""
+        cache_file = self.cache_dir / f'{project}.json'
+        cached = None
+        try:
+            cached = json.loads(cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            pass
+
+        if cached and time.time() - cached.get('fetched_at', 0) < self.cache_ttl:
+            return [tuple(v) for v in cached['versions']]
+
+        headers = {'Accept': _ACCEPT, 'Accept-Encoding': 'gzip', 'Connection': 'keep-alive'}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+        url = urljoin(self.index_url, f'{project}/')
+        for _ in range(3):
+            parts = urlsplit(url)
+            path = parts.path + (f'?{parts.query}' if parts.query else '')
+            status, resp, body = self._pool(parts.scheme, parts.netloc).request(path, headers)
+            if status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+                url = urljoin(url, resp.getheader('Location'))
+                continue
+            break
+
+        if status == 304 and cached:
+            versions = [tuple(v) for v in cached['versions']]
+            etag = cached.get('etag')
+        elif status == 404:
+            versions, etag = [], None
+        elif status == 200:
+            versions = parse_project_page(body, resp.getheader('Content-Type', ''), project)
+            etag = resp.getheader('ETag')
+        else:
+            raise Exception(f"请求 {url} 失败: HTTP {status}")
+
+        try:
+            tmp = cache_file.with_suffix('.tmp')
+            tmp.write_text(json.dumps({'etag': etag, 'fetched_at': time.time(),
+                                       'versions': versions}), encoding='utf-8')
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass
+        return versions
+
+    def fetch_latest(self, projects, progress=None, is_cancelled=None):
+        """并发获取多个项目的版本列表
+
+        Args:
+            projects: {规范化包名: 当前版本}，用于判断是否允许预发布版本
+            progress: 可选回调 progress(已完成数, 总数)
+            is_cancelled: 可选回调，返回 True 时停止
+
+        Returns:
+            tuple: ({包名: 最新版本}, {包名: 错误信息})
+        """
+        latest = {}
+        errors = {}
+        total = len(projects)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.get_versions, name): name for name in projects}
+            for done, future in enumerate(as_completed(futures), 1):
+                if is_cancelled and is_cancelled():
+                    for f in futures:
+                        f.cancel()
+                    break
+                name = futures[future]
+                try:
+                    latest[name] = latest_version(future.result(), projects[name])
+                except Exception as e:
+                    errors[name] = str(e)
+                if progress:
+                    progress(done, total)
+        return latest, errors
+
+
+def check_outdated(inventories, client, progress=None, is_cancelled=None):
+    """检查多个虚拟环境中可更新的包
+
+    Args:
+        inventories: {虚拟环境: [DistInfo, ...]}
+        client: SimpleIndexClient
+        progress / is_cancelled: 同 SimpleIndexClient.fetch_latest
+
+    Returns:
+        tuple: ({虚拟环境: [OutdatedPackage, ...]}, {包名: 错误信息})
+    """
+    # 每个包只查询一次；只要有一个环境安装的是正式版本，就只比较正式版本
+    projects = {}
+    for dists in inventories.values():
+        for dist in dists:
+            if dist.name not in projects or _is_prerelease(projects[dist.name]):
+                projects[dist.name] = dist.version
+
+    latest, errors = client.fetch_latest(projects, progress=progress, is_cancelled=is_cancelled)
+
+    results = {}
+    for venv, dists in inventories.items():
+        outdated = []
+        for dist in dists:
+            newest = latest.get(dist.name)
+            if not newest:
+                continue
+            try:
+                if Version(newest) > Version(dist.version):
+                    outdated.append(OutdatedPackage(dist.display_name, dist.version, newest))
+            except InvalidVersion:
+                continue
+        results[venv] = sorted(outdated, key=lambda p: p.name.lower())
+    return results, errors
@@ -0,0 +1,401 @@
+"""虚拟环境归档（冷存储）与恢复
+
+长期不用的虚拟环境可以归档为一个压缩的 tar 包，释放磁盘空间；归档后的环境
+仍以"已归档"条目显示在列表中，需要时再恢复。
+
+- 归档时 tar 数据流按 CHUNK_SIZE 分块，各块在线程池中独立压缩后按顺序写入。
+  每块都是一个完整的 gzip 成员 / xz 流，多个成员首尾相接仍然是合法的
+  .tar.gz / .tar.xz 文件，可以直接用 tar 命令解开。
+- 各块在文件中的位置记录在旁边的 <归档名>.json 中，恢复时同样并行解压。
+  缺少分块信息（如旁路文件丢失后重建）时按普通压缩包顺序解压。
+- 归档包中的第一个成员是 venv-archive.json（环境原路径、Python版本、
+  大小等），旁路文件丢失时可以从归档包本身重建。
+- 恢复到与原路径不同的位置时，用 venv_relocate 改写脚本中的绝对路径。
+"""
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import shutil
+import tarfile
+import time
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app_paths import APP_DATA_DIR
+from venv_details import load_details
+from venv_relocate import relocate_venv
+from log_setup import get_logger
+
+logger = get_logger('archive')
+
+ARCHIVE_DIR = APP_DATA_DIR / 'archives'
+FORMAT_VERSION = 1
+CHUNK_SIZE = 4 * 1024 * 1024     # 每个压缩块的原始大小
+MANIFEST_NAME = 'venv-archive.json'
+CONTENT_PREFIX = 'venv'          # 归档包中环境内容所在的目录
+
+# 压缩方式: 扩展名, 压缩函数, 解压函数
+COMPRESSIONS = {
+    'xz': ('.tar.xz', lambda data: lzma.compress(data, format=lzma.FORMAT_XZ, preset=6), lzma.decompress),
+    'gz': ('.tar.gz', lambda data: gzip.compress(data, compresslevel=6), gzip.decompress),
+}
+
+# 归档信息: 归档文件, 原路径, 根目录, 相对路径, Python版本, 原始大小, 包数量, 归档时间, 压缩方式, 归档文件大小
+ArchiveInfo = namedtuple('ArchiveInfo', 'archive path root rel_path python_version size package_count '
+                                        'archived_at compression archive_size')
+# 恢复结果: 恢复后的路径, 路径重定位结果（原位置恢复时为 None）
+RestoreResult = namedtuple('RestoreResult', 'path relocated')
+
+
+def _default_workers():
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def _shutdown(executor, futures):
+    """取消还没有开始的任务后关闭线程池
+
+    shutdown(cancel_futures=True) 需要 Python 3.9+，这里手动取消以兼容更早的版本。
+    """
+    for future in futures:
+        future.cancel()
+    executor.shutdown(wait=True)
+
+
+def archive_dir(config_value=''):
+    """配置中的归档目录（为空时使用默认目录）"""
+    return Path(config_value) if config_value else ARCHIVE_DIR
+
+
+def _sidecar_path(archive):
+    archive = Path(archive)
+    for ext, _, _ in COMPRESSIONS.values():
+        if archive.name.endswith(ext):
+            return archive.with_name(archive.name[:-len(ext)] + '.json')
+    return archive.with_suffix('.json')
+
+
+class _ChunkWriter:
+    """可供 tarfile 流式写入的文件对象，按块并行压缩后顺序写出"""
+
+    def __init__(self, out, compress, workers, chunk_size=CHUNK_SIZE):
+        self._out = out
+        self._compress = compress
+        self._chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='archive-compress')
+        self._max_pending = workers * 2  # 同时在内存中的块数上限
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._offset = 0
+        self._hash = hashlib.sha256()
+        self.chunks = []  # [(文件中的偏移, 压缩后长度, 原始长度)]
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self._submit(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def _submit(self, chunk):
+        self._pending.append((len(chunk), self._executor.submit(self._compress, chunk)))
+        while len(self._pending) > self._max_pending:
+            self._write_next()
+
+    def _write_next(self):
+        raw_length, future = self._pending.popleft()
+        data = future.result()
+        self._out.write(data)
+        self._hash.update(data)
+        self.chunks.append((self._offset, len(data), raw_length))
+        self._offset += len(data)
+
+    def finish(self):
+        """写出剩余数据，返回整个文件的 sha256"""
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            while self._pending:
+                self._write_next()
+        finally:
+            _shutdown(self._executor, (future for _, future in self._pending))
+        return self._hash.hexdigest()
+
+
+class _ChunkReader:
+    """按分块信息并行解压的只读文件对象（供 tarfile 流式读取）"""
+
+    def __init__(self, path, chunks, decompress, workers):
+        self._file = open(path, 'rb')
+        self._chunks = iter(chunks)
+        self._decompress = decompress
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='archive-decompress')
+        self._max_pending = workers * 2
+        self._pending = deque()
+        self._buffer = b''
+        self._pos = 0
+        self._fill()
+
+    def _fill(self):
+        while len(self._pending) < self._max_pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return
+            offset, length = chunk[0], chunk[1]
+            self._file.seek(offset)
+            self._pending.append(self._executor.submit(self._decompress, self._file.read(length)))
+
+    def read(self, size=-1):
+        out = bytearray()
+        while size < 0 or len(out) < size:
+            if self._pos >= len(self._buffer):
+                if not self._pending:
+                    break
+                self._buffer = self._pending.popleft().result()
+                self._pos = 0
+                self._fill()
+                continue
+            available = len(self._buffer) - self._pos
+            count = available if size < 0 else min(size - len(out), available)
+            out += self._buffer[self._pos:self._pos + count]
+            self._pos += count
+        return bytes(out)
+
+    def close(self):
+        _shutdown(self._executor, self._pending)
+        self._file.close()
+
+
+def _add_tree(tar, venv_path, progress=None, total=0):
+    """把环境目录逐个文件写入 tar（不跟随符号链接），按已写入字节数报告进度"""
+    done = 0
+    tar.add(venv_path, arcname=CONTENT_PREFIX, recursive=False)
+    for dirpath, dirnames, filenames in os.walk(venv_path):
+        dirnames.sort()
+        rel_dir = os.path.relpath(dirpath, venv_path)
+        for name in dirnames + sorted(filenames):
+            path = os.path.join(dirpath, name)
+            arcname = '/'.join(p for p in (CONTENT_PREFIX, rel_dir, name) if p != '.').replace(os.sep, '/')
+            tar.add(path, arcname=arcname, recursive=False)
+            if progress and name in filenames:
+                try:
+                    done += os.lstat(path).st_size
+                except OSError:
+                    pass
+                progress(done, total)
+
+
+def archive_venv(venv_path, root=None, rel_path=None, dest_dir=None, compression='xz',
+                 workers=None, progress=None, remove=True):
+    """把虚拟环境归档为压缩包
+
+    Args:
+        venv_path: 虚拟环境路径
+        root / rel_path: 环境所在的根目录和相对路径（用于列表中显示已归档条目）
+        dest_dir: 归档目录，默认 ARCHIVE_DIR
+        compression: 'xz' 或 'gz'
+        workers: 压缩线程数
+        progress: 可选，回调 progress(已处理字节, 总字节)
+        remove: 归档成功后是否删除原环境
+
+    Returns:
+        ArchiveInfo
+    """
+    venv_path = Path(venv_path).absolute()
+    if not (venv_path / 'pyvenv.cfg').is_file():
+        raise Exception(f"{venv_path} 不是虚拟环境")
+    if compression not in COMPRESSIONS:
+        raise Exception(f"不支持的压缩方式: {compression}")
+    ext, compress, _ = COMPRESSIONS[compression]
+    workers = workers or _default_workers()
+    dest_dir = Path(dest_dir) if dest_dir else ARCHIVE_DIR
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    if root is None:
+        root, rel_path = str(venv_path.parent), venv_path.name
+    details = load_details(venv_path, use_cache=False)
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'path': str(venv_path),
+        'root': str(root),
+        'rel_path': str(rel_path),
+        'python_version': details.python_version,
+        'size': details.size,
+        'package_count': details.package_count,
+        'archived_at': time.time(),
+        'compression': compression,
+    }
+    stem = f"{venv_path.name}-{time.strftime('%Y%m%d-%H%M%S')}"
+    archive = dest_dir / (stem + ext)
+    suffix = 1
+    while archive.exists():
+        archive = dest_dir / f"{stem}-{suffix}{ext}"
+        suffix += 1
+    tmp = archive.with_name(archive.name + '.part')
+
+    logger.info(f"开始归档虚拟环境: {venv_path} -> {archive}")
+    try:
+        with open(tmp, 'wb') as out:
+            writer = _ChunkWriter(out, compress, workers)
+            try:
+                with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                    data = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+                    info = tarfile.TarInfo(MANIFEST_NAME)
+                    info.size = len(data)
+                    info.mtime = int(manifest['archived_at'])
+                    tar.addfile(info, io.BytesIO(data))
+                    _add_tree(tar, str(venv_path), progress, details.size)
+            finally:
+                digest = writer.finish()
+        os.replace(tmp, archive)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    sidecar = dict(manifest, archive_size=archive.stat().st_size, sha256=digest, chunks=writer.chunks)
+    _sidecar_path(archive).write_text(json.dumps(sidecar, ensure_ascii=False), encoding='utf-8')
+    logger.info(f"归档完成: {archive}（{len(writer.chunks)} 块，{sidecar['archive_size']} 字节）")
+
+    if remove:
+        shutil.rmtree(venv_path)
+    return _archive_info(archive, sidecar)
+
+
+def _archive_info(archive, data):
+    return ArchiveInfo(str(archive), data['path'], data.get('root', str(Path(data['path']).parent)),
+                       data.get('rel_path', Path(data['path']).name), data.get('python_version', ''),
+                       data.get('size'), data.get('package_count'), data.get('archived_at'),
+                       data.get('compression', ''), data.get('archive_size'))
+
+
+def read_manifest(archive):
+    """从归档包的第一个成员读取环境信息"""
+    with tarfile.open(archive, 'r:*') as tar:
+        member = tar.next()
+        if member is None or member.name != MANIFEST_NAME:
+            raise Exception(f"{archive} 不是虚拟环境归档")
+        return json.loads(tar.extractfile(member).read().decode('utf-8'))
+
+
+def _load_sidecar(archive):
+    """读取旁路文件，丢失或损坏时从归档包重建（不含分块信息）"""
+    sidecar = _sidecar_path(archive)
+    try:
+        return json.loads(sidecar.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        pass
+    data = read_manifest(archive)
+    data['archive_size'] = os.path.getsize(archive)
+    try:
+        sidecar.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    except OSError:
+        pass
+    return data
+
+
+def list_archives(dest_dir=None):
+    """列出归档目录中的所有归档（按原路径排序）"""
+    dest_dir = Path(dest_dir) if dest_dir else ARCHIVE_DIR
+    archives = []
+    try:
+        entries = sorted(os.scandir(dest_dir), key=lambda e: e.name)
+    except OSError:
+        return archives
+    for entry in entries:
+        if not entry.name.endswith(tuple(ext for ext, _, _ in COMPRESSIONS.values())):
+            continue
+        try:
+            archives.append(_archive_info(entry.path, _load_sidecar(entry.path)))
+        except Exception as e:
+            logger.warning(f"无法读取归档: {entry.path}, 错误: {e}")
+    archives.sort(key=lambda a: a.path)
+    return archives
+
+
+def _check_members(tar):
+    """逐个检查成员名称（没有 extraction filter 的旧版本 Python）"""
+    for member in tar:
+        name = member.name
+        if name.startswith('/') or '..' in name.split('/'):
+            raise Exception(f"归档中包含不安全的路径: {name}")
+        yield member
+
+
+def _extract(tar, dest):
+    if hasattr(tarfile, 'tar_filter'):
+        # 虚拟环境中的 bin/python 是指向系统解释器的绝对路径符号链接，不能用 data 过滤器
+        tar.extractall(dest, filter='tar')
+    else:
+        tar.extractall(dest, members=_check_members(tar))
+
+
+def restore_archive(archive, target=None, workers=None, remove=True):
+    """把归档恢复为虚拟环境
+
+    Args:
+        archive: 归档文件路径
+        target: 恢复到的路径，默认恢复到原路径
+        workers: 解压线程数
+        remove: 恢复成功后是否删除归档
+
+    Returns:
+        RestoreResult
+    """
+    archive = Path(archive)
+    data = _load_sidecar(archive)
+    original = data['path']
+    target = Path(target or original).absolute()
+    if target.exists():
+        raise Exception(f"目标路径 {target} 已存在")
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"开始恢复虚拟环境: {archive} -> {target}")
+    tmp = target.parent / f".{target.name}.restore-{os.getpid()}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    try:
+        chunks = data.get('chunks')
+        compression = data.get('compression')
+        if chunks and compression in COMPRESSIONS:
+            reader = _ChunkReader(archive, chunks, COMPRESSIONS[compression][2], workers or _default_workers())
+            try:
+                with tarfile.open(fileobj=reader, mode='r|') as tar:
+                    _extract(tar, tmp)
+            finally:
+                reader.close()
+        else:
+            with tarfile.open(archive, 'r:*') as tar:
+                _extract(tar, tmp)
+        content = tmp / CONTENT_PREFIX
+        if not (content / 'pyvenv.cfg').is_file():
+            raise Exception(f"{archive} 中没有虚拟环境")
+        os.rename(content, target)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    relocated = None
+    if str(target) != original:
+        relocated = relocate_venv(target, original)
+        if relocated.skipped:
+            logger.warning(f"以下文件包含原路径但无法改写: {', '.join(relocated.skipped)}")
+    logger.info(f"虚拟环境已恢复: {target}")
+
+    if remove:
+        delete_archive(archive)
+    return RestoreResult(str(target), relocated)
+
+
+def delete_archive(archive):
+    """删除归档及其旁路文件"""
+    for path in (Path(archive), _sidecar_path(archive)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
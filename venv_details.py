@@ -0,0 +1,140 @@
+"""虚拟环境的附加信息（Python版本、占用空间、包数量、最近使用时间）
+
+列表只按需为可见的行读取这些信息。占用空间需要遍历整个环境目录，
+结果和包数量一起按 pyvenv.cfg、site-packages 的修改时间缓存在磁盘上；
+Python版本来自解释器探测缓存；最近使用时间每次重新读取（只是一次 stat）。
+
+最近使用时间取 pyvenv.cfg 的访问时间：虚拟环境中的解释器每次启动都会
+读取这个文件（文件系统以 noatime 挂载时退化为修改时间）。
+"""
+import json
+import os
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from app_paths import APP_DATA_DIR
+from dist_metadata import find_site_packages, python_executable
+from interpreter_probe import interpreter_version
+
+CACHE_FILE = APP_DATA_DIR / 'details_cache.json'
+CACHE_VERSION = 1
+
+# 附加信息: Python版本, 占用空间（字节）, 包数量, 创建时间, 最近修改时间, 最近使用时间
+VenvDetails = namedtuple('VenvDetails', 'python_version size package_count created modified last_used')
+
+_cache = None
+_cache_dirty = False
+_cache_lock = threading.Lock()
+
+
+def _load_cache():
+    """加载磁盘缓存（调用方需持有 _cache_lock）"""
+    global _cache
+    if _cache is None:
+        try:
+            data = json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+            _cache = data.get('entries', {}) if data.get('version') == CACHE_VERSION else {}
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def save_cache():
+    """有新的结果时写回磁盘缓存"""
+    global _cache_dirty
+    with _cache_lock:
+        if _cache is None or not _cache_dirty:
+            return
+        try:
+            CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp = CACHE_FILE.with_suffix('.tmp')
+            tmp.write_text(json.dumps({'version': CACHE_VERSION, 'entries': _cache}), encoding='utf-8')
+            os.replace(tmp, CACHE_FILE)
+            _cache_dirty = False
+        except OSError:
+            pass
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def directory_size(path):
+    """目录中所有文件的总大小（不跟随符号链接，硬链接只计算一次）"""
+    total = 0
+    seen = set()  # 有多个硬链接的文件 (设备, inode)
+    stack = [str(path)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            st = entry.stat(follow_symlinks=False)
+                            if st.st_nlink > 1:
+                                key = (st.st_dev, st.st_ino)
+                                if key in seen:
+                                    continue
+                                seen.add(key)
+                            total += st.st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+def _count_packages(locations):
+    count = 0
+    for location in locations:
+        try:
+            with os.scandir(location) as it:
+                count += sum(1 for entry in it if entry.name.endswith(('.dist-info', '.egg-info')))
+        except OSError:
+            continue
+    return count
+
+
+def load_details(venv_path, use_cache=True):
+    """读取虚拟环境的附加信息
+
+    Args:
+        venv_path: 虚拟环境路径
+        use_cache: 是否使用缓存的占用空间和包数量
+
+    Returns:
+        VenvDetails
+    """
+    global _cache_dirty
+    venv_path = str(venv_path)
+    cfg_stat = _stat(Path(venv_path) / 'pyvenv.cfg')
+    locations = find_site_packages(venv_path)
+    mtimes = [s.st_mtime for s in map(_stat, locations) if s is not None]
+    key = '|'.join(str(m) for m in [cfg_stat.st_mtime if cfg_stat else 0.0] + mtimes)
+
+    entry = None
+    if use_cache:
+        with _cache_lock:
+            entry = _load_cache().get(venv_path)
+        if entry and entry['key'] != key:
+            entry = None
+    if entry is None:
+        entry = {'key': key, 'size': directory_size(venv_path), 'packages': _count_packages(locations)}
+        with _cache_lock:
+            _load_cache()[venv_path] = entry
+            _cache_dirty = True
+
+    if cfg_stat is not None:
+        created = getattr(cfg_stat, 'st_birthtime', cfg_stat.st_mtime)
+        last_used = max(cfg_stat.st_atime, cfg_stat.st_mtime)
+    else:
+        created = last_used = None
+    return VenvDetails(interpreter_version(python_executable(venv_path), ''), entry['size'],
+                       entry['packages'], created, max(mtimes) if mtimes else None, last_used)
@@ -0,0 +1,56 @@
+"""虚拟环境对比
+
+直接读取 dist-info 元数据和 pyvenv.cfg，不启动解释器和 pip，
+多个环境两两对比时每个环境只读取一次。
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+from dist_metadata import iter_distributions, read_pyvenv_cfg
+
+# 环境清单: 路径, Python版本（来自 pyvenv.cfg）, {规范化包名: (包名, 版本)}
+VenvInventory = namedtuple('VenvInventory', 'path python_version packages')
+
+# 对比结果: 两个环境路径和Python版本, 新增/删除的 [(包名, 版本)], 变更的 [(包名, 旧版本, 新版本)]
+VenvDiff = namedtuple('VenvDiff', 'a b python_a python_b added removed changed')
+
+
+def read_inventory(venv_path):
+    """读取单个虚拟环境的包清单"""
+    cfg = read_pyvenv_cfg(venv_path)
+    python_version = cfg.get('version') or cfg.get('version_info') or ''
+    packages = {}
+    for dist in iter_distributions(venv_path):
+        packages[dist.name] = (dist.display_name, dist.version)
+    return VenvInventory(str(venv_path), python_version, packages)
+
+
+def load_inventories(venv_paths, max_workers=8):
+    """并行读取多个虚拟环境的包清单，返回与输入顺序一致的列表"""
+    venv_paths = list(venv_paths)
+    workers = max(1, min(max_workers, len(venv_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_inventory, venv_paths))
+
+
+def diff_inventories(a, b):
+    """对比两个环境清单（以 a 为基准）"""
+    added = [b.packages[name] for name in sorted(b.packages.keys() - a.packages.keys())]
+    removed = [a.packages[name] for name in sorted(a.packages.keys() - b.packages.keys())]
+    changed = []
+    for name in sorted(a.packages.keys() & b.packages.keys()):
+        display, old_version = a.packages[name]
+        new_version = b.packages[name][1]
+        if old_version != new_version:
+            changed.append((display, old_version, new_version))
+    return VenvDiff(a.path, b.path, a.python_version, b.python_version, added, removed, changed)
+
+
+def diff_venvs(venv_paths, max_workers=8):
+    """对比多个虚拟环境
+
+    两个环境时返回一个对比结果，多个环境时返回所有两两组合的结果。
+    """
+    inventories = load_inventories(venv_paths, max_workers)
+    return [diff_inventories(a, b) for a, b in combinations(inventories, 2)]
@@ -0,0 +1,149 @@
+"""批量导出虚拟环境
+
+并行读取每个环境的安装元数据（不启动 pip），逐个写入一个归档文件：
+
+- zip:   每个环境一个目录，包含 requirements.txt 和 interpreter.json，
+         最后写入汇总的 manifest.json
+- jsonl: 每个环境一行 JSON，包含解释器信息和依赖列表
+
+同时在内存中的结果数量不超过线程数的两倍，环境再多内存占用也保持不变。
+归档先写入临时文件，全部完成后再替换目标文件。
+"""
+import json
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+from dist_metadata import iter_distributions, read_pyvenv_cfg, freeze_requirement, python_executable
+from interpreter_probe import probe_interpreter
+
+EXPORT_FORMAT_VERSION = 1
+
+
+def export_record(venv_path):
+    """读取单个环境的导出内容"""
+    cfg = read_pyvenv_cfg(venv_path)
+    info = probe_interpreter(python_executable(venv_path))
+    if not cfg and info is None:
+        raise Exception("不是有效的虚拟环境")
+    requirements = sorted((freeze_requirement(d) for d in iter_distributions(venv_path)),
+                          key=str.lower)
+    return {
+        'venv': str(venv_path),
+        'python_version': info['version'] if info else cfg.get('version', ''),
+        'interpreter': info or {},
+        'pyvenv_cfg': cfg,
+        'requirements': requirements,
+    }
+
+
+def _iter_bounded(func, items, max_workers):
+    """并行执行 func，按输入顺序产出结果，同时进行中的任务不超过 max_workers 的两倍
+
+    生成器提前关闭时不再提交新任务，并取消还没有开始的任务。
+    """
+    items = iter(items)
+    window = max(1, max_workers) * 2
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append((item, executor.submit(func, item)))
+                if len(pending) >= window:
+                    yield pending[0][0], pending.popleft()[1]
+            while pending:
+                yield pending[0][0], pending.popleft()[1]
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _requirements_text(record, exported_at):
+    header = [
+        f"# 导出时间: {exported_at}",
+        f"# 虚拟环境: {record['venv']}",
+        f"# {record['python_version']}",
+        '',
+    ]
+    return '\n'.join(header + record['requirements']) + '\n'
+
+
+def export_all(venv_paths, dest, fmt=None, max_workers=8, progress=None, is_cancelled=None):
+    """把多个虚拟环境导出到一个归档文件
+
+    Args:
+        venv_paths: 虚拟环境路径列表
+        dest: 目标文件路径
+        fmt: 'zip' 或 'jsonl'，默认根据扩展名判断
+        max_workers: 并行读取的线程数
+        progress: 可选回调 progress(已完成数, 总数)
+        is_cancelled: 可选回调，返回 True 时停止导出（不会生成目标文件）
+
+    Returns:
+        tuple: (成功导出的环境数, {虚拟环境路径: 错误信息})
+    """
+    dest = Path(dest)
+    fmt = fmt or ('jsonl' if dest.suffix.lower() in ('.jsonl', '.ndjson') else 'zip')
+    venv_paths = [str(p) for p in venv_paths]
+    total = len(venv_paths)
+    exported_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    errors = {}
+    exported = []
+    tmp = dest.with_name(dest.name + '.tmp')
+
+    try:
+        if fmt == 'zip':
+            out = zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            out = open(tmp, 'w', encoding='utf-8')
+        with out, closing(_iter_bounded(export_record, venv_paths, max_workers)) as results:
+            for done, (venv_path, future) in enumerate(results, 1):
+                if is_cancelled and is_cancelled():
+                    # 关闭生成器：停止提交新任务，取消排队中的任务
+                    future.cancel()
+                    break
+                try:
+                    record = future.result()
+                except Exception as e:
+                    errors[venv_path] = str(e)
+                else:
+                    if fmt == 'zip':
+                        folder = f"{len(exported):04d}_{Path(venv_path).name}"
+                        out.writestr(f"{folder}/requirements.txt", _requirements_text(record, exported_at))
+                        out.writestr(f"{folder}/interpreter.json", json.dumps(
+                            {k: record[k] for k in ('venv', 'python_version', 'interpreter', 'pyvenv_cfg')},
+                            ensure_ascii=False, indent=2))
+                        exported.append({'venv': venv_path, 'folder': folder,
+                                         'python_version': record['python_version'],
+                                         'packages': len(record['requirements'])})
+                    else:
+                        record['exported_at'] = exported_at
+                        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                        exported.append(venv_path)
+                if progress:
+                    progress(done, total)
+
+            if fmt == 'zip':
+                out.writestr('manifest.json', json.dumps({
+                    'format_version': EXPORT_FORMAT_VERSION,
+                    'exported_at': exported_at,
+                    'venvs': exported,
+                    'errors': errors,
+                }, ensure_ascii=False, indent=2))
+
+        if is_cancelled and is_cancelled():
+            os.remove(tmp)
+        else:
+            os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    return len(exported), errors
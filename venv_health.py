@@ -0,0 +1,221 @@
+"""虚拟环境健康检查
+
+基础解释器升级或删除后，虚拟环境中的 bin/python 会变成失效的符号链接，
+这类环境仍然出现在列表中，直到 pip 报错才会被发现。这里并行检查：
+
+- 解释器: bin/python 等文件存在，符号链接目标存在
+- pyvenv.cfg: 文件存在，home 目录存在
+- pip: site-packages 中安装了 pip
+- 可选的深度检查: pip check 和各发行包 RECORD 中列出的文件是否存在
+
+解释器和 pyvenv.cfg 只是几次 stat，每次都重新检查；pip 和深度检查的结果
+按 pyvenv.cfg、site-packages 的修改时间缓存在磁盘上，环境没有变化时不再重复。
+"""
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from app_paths import APP_DATA_DIR
+from dist_metadata import find_site_packages, iter_distributions, python_executable, read_pyvenv_cfg
+
+CACHE_FILE = APP_DATA_DIR / 'health_cache.json'
+CACHE_VERSION = 1
+
+STATUS_OK = 'ok'
+STATUS_WARNING = 'warning'
+STATUS_BROKEN = 'broken'
+
+# 检查结果: 虚拟环境路径, 状态（ok / warning / broken）, 问题列表, 是否包含深度检查, 检查时间
+HealthResult = namedtuple('HealthResult', 'path status issues deep checked_at')
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _load_cache():
+    """加载磁盘缓存（调用方需持有 _cache_lock）"""
+    global _cache
+    if _cache is None:
+        try:
+            data = json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+            _cache = data.get('entries', {}) if data.get('version') == CACHE_VERSION else {}
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save_cache():
+    """写回磁盘缓存（调用方需持有 _cache_lock）"""
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CACHE_FILE.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'version': CACHE_VERSION, 'entries': _cache}), encoding='utf-8')
+        os.replace(tmp, CACHE_FILE)
+    except OSError:
+        pass
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _cache_key(venv_path):
+    """pyvenv.cfg 和 site-packages 的修改时间（安装、卸载包或重建环境时会变化）"""
+    parts = [_mtime(Path(venv_path) / 'pyvenv.cfg')]
+    parts += [_mtime(location) for location in find_site_packages(venv_path)]
+    return '|'.join(str(p) for p in parts)
+
+
+def _check_interpreter(venv_path):
+    """检查解释器文件和 pyvenv.cfg，返回 (严重问题, 一般问题)"""
+    broken = []
+    warnings = []
+    python = python_executable(venv_path)
+    if not os.path.lexists(python):
+        broken.append(f"缺少解释器: {python}")
+    elif not os.path.exists(python):
+        broken.append(f"解释器符号链接已失效: {python} -> {os.readlink(python)}")
+
+    # bin 目录下其他失效的 python* 链接（如 python3.x）
+    bin_dir = python.parent
+    try:
+        with os.scandir(bin_dir) as it:
+            for entry in it:
+                if (entry.name.startswith('python') and entry.path != str(python)
+                        and entry.is_symlink() and not os.path.exists(entry.path)):
+                    warnings.append(f"符号链接已失效: {entry.path}")
+    except OSError:
+        pass
+
+    cfg_path = Path(venv_path) / 'pyvenv.cfg'
+    if not cfg_path.exists():
+        broken.append("缺少 pyvenv.cfg")
+    else:
+        home = read_pyvenv_cfg(venv_path).get('home')
+        if not home:
+            warnings.append("pyvenv.cfg 中没有 home")
+        elif not os.path.isdir(home):
+            broken.append(f"基础解释器目录不存在: {home}")
+    return broken, warnings
+
+
+def _check_record(dist):
+    """检查 RECORD 中列出的文件是否存在，返回缺失的文件数"""
+    missing = 0
+    try:
+        with open(os.path.join(dist.path, 'RECORD'), 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                rel_path = line.rstrip('\r\n').rsplit(',', 2)[0]
+                if not rel_path or rel_path.endswith('.pyc') or '__pycache__' in rel_path:
+                    continue
+                if not os.path.lexists(os.path.join(dist.location, rel_path)):
+                    missing += 1
+    except OSError:
+        pass
+    return missing
+
+
+def _check_packages(venv_path, deep, interpreter_ok):
+    """检查 pip 和（可选的）深度检查，返回一般问题列表"""
+    issues = []
+    dists = list(iter_distributions(venv_path))
+    has_pip = any(d.name == 'pip' for d in dists)
+    if not has_pip:
+        issues.append("未安装 pip")
+
+    if deep:
+        for dist in dists:
+            if dist.path.endswith('.dist-info'):
+                missing = _check_record(dist)
+                if missing:
+                    issues.append(f"{dist.display_name} {dist.version}: RECORD 中 {missing} 个文件缺失")
+        if has_pip and interpreter_ok:
+            try:
+                result = subprocess.run([str(python_executable(venv_path)), '-m', 'pip', 'check',
+                                         '--disable-pip-version-check'],
+                                        capture_output=True, text=True, timeout=120)
+                if result.returncode != 0:
+                    issues += [line for line in result.stdout.splitlines() if line.strip()][:20]
+            except (OSError, subprocess.SubprocessError) as e:
+                issues.append(f"pip check 失败: {e}")
+    return issues
+
+
+def check_venv(venv_path, deep=False, use_cache=True):
+    """检查单个虚拟环境
+
+    Args:
+        venv_path: 虚拟环境路径
+        deep: 是否执行 pip check 和 RECORD 检查
+        use_cache: 是否使用缓存的 pip / 深度检查结果
+
+    Returns:
+        HealthResult
+    """
+    venv_path = str(venv_path)
+    broken, warnings = _check_interpreter(venv_path)
+
+    key = _cache_key(venv_path)
+    cached = None
+    if use_cache:
+        with _cache_lock:
+            entry = _load_cache().get(venv_path)
+        # 已有深度检查结果时，普通检查也可以沿用
+        if entry and entry['key'] == key and (entry['deep'] or not deep):
+            cached = entry
+
+    if cached is not None:
+        package_issues = cached['issues']
+        deep = cached['deep']
+    else:
+        package_issues = _check_packages(venv_path, deep, not broken)
+        # 解释器损坏时 pip check 没有执行，结果不缓存
+        if not broken:
+            with _cache_lock:
+                _load_cache()[venv_path] = {'key': key, 'deep': deep, 'issues': package_issues}
+
+    warnings += package_issues
+    status = STATUS_BROKEN if broken else STATUS_WARNING if warnings else STATUS_OK
+    return HealthResult(venv_path, status, broken + warnings, deep, time.time())
+
+
+def check_venvs(venv_paths, deep=False, max_workers=8, progress=None, is_cancelled=None):
+    """并行检查多个虚拟环境
+
+    Args:
+        venv_paths: 虚拟环境路径列表
+        deep: 是否执行 pip check 和 RECORD 检查
+        max_workers: 线程数
+        progress: 可选回调 progress(已完成数, 总数, HealthResult)
+        is_cancelled: 可选回调，返回 True 时停止检查
+
+    Returns:
+        dict: {虚拟环境路径: HealthResult}
+    """
+    venv_paths = [str(p) for p in venv_paths]
+    results = {}
+    total = len(venv_paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total or 1))) as executor:
+        futures = [executor.submit(check_venv, p, deep) for p in venv_paths]
+        for done, future in enumerate(as_completed(futures), 1):
+            if is_cancelled and is_cancelled():
+                for f in futures:
+                    f.cancel()
+                break
+            result = future.result()
+            results[result.path] = result
+            if progress:
+                progress(done, total, result)
+
+    with _cache_lock:
+        if _cache is not None:
+            _save_cache()
+    return results
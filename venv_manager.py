@@ -1,13 +1,14 @@
 import os
-import venv
 import shutil
 import subprocess
 import logging
-import logging.handlers
 from pathlib import Path
 from datetime import datetime
 import threading
 from queue import Queue
+from interpreter_probe import interpreter_version
+from create_pipeline import CreatePipeline, PipelineError
+from log_setup import setup_logging
 
 class VenvManager:
     def __init__(self):
@@ -18,31 +19,15 @@ class VenvManager:
         self.base_path = Path.home() / '.virtualenvs'
         self.base_path.mkdir(exist_ok=True)
         self.logger.info(f"虚拟环境基础路径: {self.base_path}")
+        
+        # 除基础路径外额外扫描的根目录
+        self.extra_roots = []
+        # 每个根目录的扫描结果缓存 {根目录: (扫描参数, [(相对路径, Python版本)])}
+        self._scan_cache = {}
 
     def setup_logging(self):
-        self.logger = logging.getLogger('VenvManager')
-        self.logger.setLevel(logging.INFO)
-        
-        # 确保日志目录存在
-        log_dir = os.path.expanduser('~/.virtualenvs')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # 设置日志文件路径
-        log_path = os.path.join(log_dir, 'venv_manager.log')
-        
-        # 创建日志滚动处理器 (512K/文件，保留3个备份)
-        fh = logging.handlers.RotatingFileHandler(
-            log_path, 
-            maxBytes=512*1024, 
-            backupCount=3,
-            encoding='utf-8'
-        )
-        fh.setLevel(logging.INFO)
-        
-        # 设置日志格式
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        fh.setFormatter(formatter)
-        self.logger.addHandler(fh)
+        # 日志处理器只注册一次，重复创建 VenvManager 不会重复写入日志
+        self.logger = setup_logging()
 
     def set_base_path(self, path):
         """设置虚拟环境基础路径"""
@@ -51,12 +36,55 @@ class VenvManager:
         self.base_path = new_path
         self.logger.info(f"更新虚拟环境基础路径为: {self.base_path}")
 
-    def create_venv(self, name, python_path=None):
+    def set_extra_roots(self, roots):
+        """设置额外扫描的根目录"""
+        self.extra_roots = [Path(r).expanduser() for r in roots if r]
+        self.logger.info(f"额外扫描目录: {[str(r) for r in self.extra_roots]}")
+
+    def get_roots(self):
+        """获取所有需要扫描的根目录（基础路径在前，已去重）"""
+        roots = []
+        seen = set()
+        for root in [self.base_path] + self.extra_roots:
+            key = os.path.normcase(os.path.abspath(root))
+            if key not in seen:
+                seen.add(key)
+                roots.append(root)
+        return roots
+
+    def store_scan_results(self, root, results, scan_depth):
+        """缓存根目录的扫描结果"""
+        self._scan_cache[str(root)] = (scan_depth, list(results))
+
+    def get_cached_scan(self, root, scan_depth):
+        """获取根目录的缓存扫描结果，扫描深度不一致或没有缓存时返回 None"""
+        cached = self._scan_cache.get(str(root))
+        if cached and cached[0] == scan_depth:
+            return cached[1]
+        return None
+
+    def clear_scan_cache(self, root=None):
+        """清除扫描缓存"""
+        if root is None:
+            self._scan_cache.clear()
+        else:
+            self._scan_cache.pop(str(root), None)
+
+    def create_venv(self, name, python_path=None, upgrade_pip=False, symlinks=None,
+                    parallel=True, post_steps=(), progress=None):
         """创建虚拟环境
         
         Args:
             name: 虚拟环境名称
             python_path: 可选，指定Python解释器路径
+            upgrade_pip: 是否把 pip、setuptools、wheel 升级到最新版本
+            symlinks: 可选，True 使用符号链接，False 复制解释器，默认按平台选择
+            parallel: 后续步骤是否并行执行
+            post_steps: 额外的后续步骤，见 CreatePipeline
+            progress: 可选回调 progress(百分比, 信息)
+
+        Returns:
+            list[StageResult]: 各阶段的执行结果和耗时
         """
         venv_path = self.base_path / name
         if venv_path.exists():
@@ -64,38 +92,21 @@ class VenvManager:
         
         try:
             self.logger.info(f"开始创建虚拟环境: {name}")
-            
-            if python_path:
-                # 使用指定的Python解释器创建虚拟环境
-                try:
-                    subprocess.run([
-                        python_path,
-                        '-m',
-                        'venv',
-                        str(venv_path)
-                    ], check=True, capture_output=True, text=True)
-                except subprocess.CalledProcessError as e:
-                    raise Exception(f"创建虚拟环境失败: {e.stderr}")
-            else:
-                # 使用当前Python解释器
-                venv.create(venv_path, with_pip=True)
-            
-            # 获取python和pip路径
-            if os.name == 'nt':
-                python_path = venv_path / 'Scripts' / 'python.exe'
-                pip_path = venv_path / 'Scripts' / 'pip.exe'
-            else:
-                python_path = venv_path / 'bin' / 'python'
-                pip_path = venv_path / 'bin' / 'pip'
-                
-            # 确保pip已安装并可用
+            pipeline = CreatePipeline(venv_path, python_path=python_path, upgrade=upgrade_pip,
+                                      symlinks=symlinks, parallel=parallel,
+                                      post_steps=post_steps, progress=progress)
             try:
-                subprocess.run([str(python_path), '-m', 'ensurepip', '--upgrade'],
-                             check=True, capture_output=True, text=True)
-            except subprocess.CalledProcessError:
-                pass  # 忽略错误，继续执行
+                results = pipeline.run()
+            except PipelineError as e:
+                # 不保留创建了一半的环境
+                shutil.rmtree(venv_path, ignore_errors=True)
+                raise Exception(f"创建虚拟环境失败: {e}")
             
+            for r in results:
+                level = logging.INFO if r.ok else logging.WARNING
+                self.logger.log(level, f"{name} - {r.label}: {r.duration:.2f}s {r.message}")
             self.logger.info(f"虚拟环境 {name} 创建成功")
+            return results
         except Exception as e:
             self.logger.error(f"创建虚拟环境失败: {str(e)}")
             raise
@@ -143,17 +154,11 @@ class VenvManager:
 
     def _get_python_version(self, venv_path):
         """获取虚拟环境的Python版本"""
-        try:
-            if os.name == 'nt':
-                python_path = venv_path / 'Scripts' / 'python.exe'
-            else:
-                python_path = venv_path / 'bin' / 'python'
-                
-            result = subprocess.run([str(python_path), '--version'], 
-                                  capture_output=True, text=True)
-            return result.stdout.strip()
-        except:
-            return "未知"
+        if os.name == 'nt':
+            python_path = venv_path / 'Scripts' / 'python.exe'
+        else:
+            python_path = venv_path / 'bin' / 'python'
+        return interpreter_version(python_path, "未知")
 
     def list_venvs(self):
         """列出所有虚拟环境（包括子文件夹）"""
@@ -200,20 +205,9 @@ class VenvManager:
         return (path / 'bin' / 'python').exists()
         
     def get_python_version(self, path):
-        """获取虚拟环境的Python版本"""
-        try:
-            python_exe = path / 'Scripts' / 'python.exe' if os.name == 'nt' else path / 'bin' / 'python'
-            if python_exe.exists():
-                result = subprocess.run([str(python_exe), '--version'], 
-                                       capture_output=True, text=True, timeout=3)
-                if result.returncode == 0:
-                    # 通常输出格式为 "Python 3.x.y"
-                    return result.stdout.strip()
-                else:
-                    return "未知版本"
-            return "未知版本"
-        except Exception:
-            return "未知版本"
+        """获取虚拟环境的Python版本（通过解释器探测缓存，格式为 "Python 3.x.y"）"""
+        python_exe = path / 'Scripts' / 'python.exe' if os.name == 'nt' else path / 'bin' / 'python'
+        return interpreter_version(python_exe)
 
 class ActivateWorker(threading.Thread):
     """虚拟环境激活工作线程"""
@@ -1,17 +1,25 @@
-import logging
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                           QPushButton, QLineEdit, QLabel, QListWidget, QListWidgetItem,
+                           QPushButton, QLineEdit, QLabel, QListView, QAbstractItemView,
                            QMessageBox, QFileDialog, QProgressBar, QDialog,
                            QInputDialog, QMenuBar, QMenu, QAction)
-from PyQt5.QtCore import Qt, QTimer, QSettings
+from PyQt5.QtCore import Qt, QTimer, QSettings, QPoint
 from venv_manager import VenvManager
 from pathlib import Path
 from package_manager_ui import PackageManagerDialog
+from inventory_cache import prefetch_inventory
+from venv_archive import list_archives, archive_dir
 from settings_dialog import SettingsDialog
+from package_query_ui import PackageQueryDialog, HostInventoryDialog
+from batch_create_ui import BatchCreateDialog
 from config_manager import ConfigManager
-from components import PathSelector, ProgressWidget, InputWithButton, PythonSelector, VenvItemDelegate
-from workers import VenvWorker
+from components import (PathSelector, ProgressWidget, InputWithButton, PythonSelector, VenvItemDelegate,
+                        ResultTableDialog, VenvListModel, VenvFilterProxyModel)
+from venv_store import VenvStore
+from workers import VenvWorker, DetailsLoader
+from log_setup import setup_logging
 import os
+import socket
+from datetime import datetime
 
 # 应用版本信息
 APP_NAME = "Python虚拟环境管理器"
@@ -25,6 +33,8 @@ class VenvManagerWindow(QMainWindow):
         # 移除帮助按钮
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
         self.config = ConfigManager()
+        # 日志在后台线程写入，处理器只注册一次
+        self.logger = setup_logging(self.config.get('log_level'), self.config.get('log_json'))
         self.venv_manager = VenvManager()
         self.worker = None
         self.is_scanning = False  # 添加扫描状态标志
@@ -36,6 +46,14 @@ class VenvManagerWindow(QMainWindow):
         # 从配置加载基础路径
         base_path = self.config.get('base_path')
         self.venv_manager.set_base_path(base_path)
+        self.venv_manager.set_extra_roots(self.config.get('scan_roots'))
+        self.root_progress = {}  # 各根目录的扫描进度
+        self.last_scan_summary = None  # 最近一次扫描的摘要
+        self.venv_store = VenvStore()  # 列表中所有虚拟环境的记录
+        self._stale = set()  # 重新扫描前已有、扫描中尚未再次发现的记录
+        # 可见行的版本、大小等信息在后台按需读取
+        self.details_loader = DetailsLoader(parent=self)
+        self.details_loader.loaded.connect(self._apply_details)
         
         self.init_ui()
         # 恢复窗口位置
@@ -47,7 +65,10 @@ class VenvManagerWindow(QMainWindow):
         self.config.save_window_geometry(self)
         # 保存当前路径
         self.config.set('base_path', str(self.venv_manager.base_path))
+        # 退出前立即写回所有未保存的配置
+        self.config.flush()
         
+        self.details_loader.shutdown()
         if self.worker:
             if self.worker.is_scanning:
                 self.worker.cancel()
@@ -78,57 +99,92 @@ class VenvManagerWindow(QMainWindow):
         )
         self.worker.progress.connect(self.update_progress)
         if operation == 'list':
-            self.venv_list.clear()
             self.worker.venv_found.connect(self.add_venv_to_list)
+            self.worker.root_progress.connect(self.update_root_progress)
+            self.worker.scan_finished.connect(self._handle_scan_summary)
         return self.worker
 
-    def add_venv_to_list(self, venv_path, python_version=""):
+    def _handle_scan_summary(self, summary):
+        """保存扫描摘要，无法读取的目录显示在状态提示中"""
+        self.last_scan_summary = summary
+        tooltip = ''
+        if summary.errors:
+            tooltip = '无法读取的目录:\n' + '\n'.join(summary.errors[:20])
+            if summary.error_count > 20:
+                tooltip += f'\n... 共 {summary.error_count} 个'
+        self.progress_widget.status_label.setToolTip(tooltip)
+
+    def add_venv_to_list(self, venv_path, python_version="", root=""):
         """添加发现的虚拟环境到列表"""
-        # 检查是否已存在
-        items = self.venv_list.findItems(venv_path, Qt.MatchExactly)
-        if not items:
-            item = QListWidgetItem()
-            item.setData(Qt.UserRole, venv_path)  # 存储原始路径
-            
-            if python_version and self.config.get('show_python_version'):
-                # 创建自定义显示，确保版本信息在最右边
-                item.setText(venv_path)
-                item.setData(Qt.UserRole + 1, python_version)  # 存储Python版本
-            else:
-                item.setText(venv_path)
-                
-            self.venv_list.addItem(item)
-            
-            # 如果有搜索条件，应用过滤
-            if hasattr(self, 'current_search_text') and self.current_search_text:
-                # 检查是否匹配搜索条件
-                if (self.current_search_text in venv_path.lower() or 
-                    (python_version and self.current_search_text in python_version.lower())):
-                    item.setHidden(False)
-                else:
-                    item.setHidden(True)
-            # 按字母顺序排序
-            self.venv_list.sortItems()
-
-    def get_venv_path_from_text(self, item_or_text):
-        """从列表项或文本中提取虚拟环境路径"""
-        # 如果是QListWidgetItem对象
-        if isinstance(item_or_text, QListWidgetItem):
-            # 优先使用存储的原始路径
-            stored_path = item_or_text.data(Qt.UserRole)
-            if stored_path:
-                return stored_path
-            return item_or_text.text()
-        
-        # 如果是文本字符串（兼容旧代码）
-        text = item_or_text
-        if '[' in text and ']' in text:
-            # 处理制表符分隔的格式
-            if '\t' in text:
-                return text.split('\t')[0].strip()
-            # 兼容旧格式
-            return text.split('[')[0].strip()
-        return text
+        root = root or str(self.venv_manager.base_path)
+        # 不同根目录下可能有相同的相对路径，记录按 (根目录, 相对路径) 区分
+        record, _ = self.venv_store.add(root, venv_path, python_version)
+        if record.archive is not None:
+            # 归档后原位置又出现了环境（已恢复或重新创建），显示为普通环境
+            record.archive = None
+            record.package_count = None
+        self._stale.discard(record)
+        self.venv_model.add_record(record)
+
+    def _remove_records(self, records):
+        """从记录存储和列表中移除"""
+        for record in records:
+            self.venv_store.remove(record)
+        self.venv_model.remove_records(records)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if hasattr(self, '_details_timer'):
+            self._schedule_details()
+
+    def _schedule_details(self, *args):
+        """稍后读取可见行的附加信息（连续滚动时只读取最后停留的位置）"""
+        self._details_timer.start(50)
+
+    def _load_visible_details(self):
+        """读取可见行及上下各一屏范围内尚未加载的版本、大小等信息"""
+        if not (self.venv_model.show_python_version or self.venv_model.show_details):
+            self.details_loader.request([])
+            return
+        rows = self.venv_proxy.rowCount()
+        if not rows:
+            return
+        viewport = self.venv_list.viewport()
+        first = self.venv_list.indexAt(QPoint(0, 0)).row()
+        last = self.venv_list.indexAt(QPoint(0, viewport.height() - 1)).row()
+        first = max(first, 0)
+        last = rows - 1 if last < 0 else last
+        page = last - first + 1
+        # 先读取可见行，再读取下方和上方各一屏
+        order = list(range(first, last + 1))
+        order += range(last + 1, min(rows, last + 1 + page))
+        order += range(first - 1, max(-1, first - 1 - page), -1)
+        records = [self.venv_proxy.index(row, 0).data(VenvListModel.RecordRole) for row in order]
+        self.details_loader.request([r for r in records if r.package_count is None and r.archive is None])
+
+    def _apply_details(self, record, details):
+        """保存读取到的附加信息并重绘对应的行"""
+        record.python_version = details.python_version or record.python_version
+        record.size = details.size
+        record.package_count = details.package_count
+        record.created = details.created
+        record.modified = details.modified
+        record.last_used = details.last_used
+        self.venv_model.record_changed(record)
+
+    def get_venv_full_path(self, record):
+        """获取记录对应虚拟环境的完整路径"""
+        return record.full_path
+
+    def current_record(self):
+        """当前项对应的记录（没有时返回 None）"""
+        index = self.venv_list.currentIndex()
+        return index.data(VenvListModel.RecordRole) if index.isValid() else None
+
+    def selected_records(self):
+        """所有选中项对应的记录"""
+        return [index.data(VenvListModel.RecordRole)
+                for index in self.venv_list.selectionModel().selectedRows()]
         
     def init_ui(self):
         self.setWindowTitle(f'{APP_NAME} v{APP_VERSION}')
@@ -148,11 +204,29 @@ class VenvManagerWindow(QMainWindow):
         layout.addWidget(self.path_selector)
         
         # 虚拟环境列表
-        self.venv_list = QListWidget()
+        self.venv_model = VenvListModel(self)
+        self.venv_model.show_python_version = self.config.get('show_python_version')
+        self.venv_model.show_details = self.config.get('show_venv_details')
+        self.venv_proxy = VenvFilterProxyModel(self)
+        self.venv_proxy.setSourceModel(self.venv_model)
+        self.venv_list = QListView()
+        self.venv_list.setModel(self.venv_proxy)
         self.venv_list.setAlternatingRowColors(True)
-        self.venv_list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.venv_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        # 所有行高度相同，视图不需要逐行计算
+        self.venv_list.setUniformItemSizes(True)
+        
+        # 滚动、插入或过滤后，合并成一次可见行信息的读取
+        self._details_timer = QTimer(self)
+        self._details_timer.setSingleShot(True)
+        self._details_timer.timeout.connect(self._load_visible_details)
+        self.venv_list.verticalScrollBar().valueChanged.connect(self._schedule_details)
+        self.venv_proxy.rowsInserted.connect(self._schedule_details)
+        self.venv_proxy.layoutChanged.connect(self._schedule_details)
+        self.venv_proxy.modelReset.connect(self._schedule_details)
         # 设置自定义代理，确保Python版本显示在最右边
-        self.venv_list.setItemDelegate(VenvItemDelegate())
+        self.venv_delegate = VenvItemDelegate()
+        self.venv_list.setItemDelegate(self.venv_delegate)
         
         # 启用右键菜单
         self.venv_list.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -204,7 +278,8 @@ class VenvManagerWindow(QMainWindow):
         layout.addWidget(self.progress_widget)
         
         # 列表设置
-        self.venv_list.itemDoubleClicked.connect(self.show_venv_info)
+        self.venv_list.doubleClicked.connect(self.show_venv_info)
+        self.venv_list.selectionModel().currentChanged.connect(self._prefetch_packages)
         
         # 初始化列表
         self.refresh_venv_list()
@@ -245,12 +320,15 @@ class VenvManagerWindow(QMainWindow):
             QMessageBox.critical(self, '错误', f'创建虚拟环境失败: {msg}')
 
     def activate_venv(self):
-        selected = self.venv_list.currentItem()
+        selected = self.current_record()
         if not selected:
             QMessageBox.warning(self, '警告', '请选择要激活的虚拟环境')
             return
+        if selected.archive is not None:
+            QMessageBox.warning(self, '警告', '该虚拟环境已归档，请先恢复')
+            return
             
-        venv_name = self.get_venv_path_from_text(selected)
+        venv_name = str(self.get_venv_full_path(selected))
         try:
             # 启动激活线程
             worker = self.venv_manager.activate_venv(venv_name)
@@ -266,20 +344,21 @@ class VenvManagerWindow(QMainWindow):
 
     def delete_venv(self):
         """删除虚拟环境(支持批量删除)"""
-        selected_items = self.venv_list.selectedItems()
+        selected_items = self.selected_records()
         if not selected_items:
             QMessageBox.warning(self, '警告', '请选择要删除的虚拟环境')
             return
         
-        # 获取所有选中的环境名称
-        venv_names = [item.text() for item in selected_items]
-        count = len(venv_names)
+        # 获取所有选中的环境名称（已归档的环境删除归档文件）
+        venv_names = [str(self.get_venv_full_path(item)) for item in selected_items if item.archive is None]
+        archives = [item.archive.archive for item in selected_items if item.archive is not None]
+        count = len(venv_names) + len(archives)
         
         # 构建确认消息
         if count == 1:
-            message = f'确定要删除虚拟环境 {venv_names[0]} 吗？'
+            message = f'确定要删除虚拟环境 {(venv_names or archives)[0]} 吗？'
         else:
-            message = f'确定要删除以下 {count} 个虚拟环境吗？\n\n' + '\n'.join(venv_names)
+            message = f'确定要删除以下 {count} 个虚拟环境吗？\n\n' + '\n'.join(venv_names + archives)
         
         reply = QMessageBox.question(
             self, '确认删除', message,
@@ -288,7 +367,7 @@ class VenvManagerWindow(QMainWindow):
         
         if reply == QMessageBox.Yes:
             self.progress_widget.update_progress(0, self.progress_widget.status_label.text())
-            worker = self._create_worker('batch_delete', names=venv_names)
+            worker = self._create_worker('batch_delete', names=venv_names, archives=archives)
             worker.finished.connect(self._handle_delete_result)
             worker.start()
 
@@ -299,18 +378,137 @@ class VenvManagerWindow(QMainWindow):
         else:
             QMessageBox.critical(self, '错误', f'删除虚拟环境失败: {msg}')
 
-    def refresh_venv_list(self):
+    def archive_venvs(self):
+        """把选中的虚拟环境归档为压缩包并删除原目录"""
+        records = [r for r in self.selected_records() if r.archive is None]
+        if not records:
+            QMessageBox.warning(self, '警告', '请选择要归档的虚拟环境')
+            return
+        names = [str(r.full_path) for r in records]
+        reply = QMessageBox.question(
+            self, '确认归档',
+            f'以下 {len(names)} 个虚拟环境将压缩保存到归档目录，原目录会被删除:\n\n' + '\n'.join(names),
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        self.progress_widget.update_progress(0, '正在归档...')
+        worker = self._create_worker('archive', venvs=[(str(r.full_path), r.root, r.rel_path) for r in records])
+        worker.finished.connect(self._handle_archive_result)
+        worker.start()
+
+    def _handle_archive_result(self, success, msg):
+        # 部分环境可能已经归档，无论成功与否都重新读取归档目录；扫描缓存中还有原来的环境
+        self.venv_manager.clear_scan_cache()
+        self._load_cold_entries()
+        if success:
+            self.progress_widget.status_label.setText(msg)
+        else:
+            QMessageBox.critical(self, '错误', f'归档失败: {msg}')
+
+    def restore_venv(self, record=None, choose_target=False):
+        """从归档恢复虚拟环境（默认恢复到原位置）"""
+        record = record or self.current_record()
+        if record is None or record.archive is None:
+            QMessageBox.warning(self, '警告', '请选择已归档的虚拟环境')
+            return
+        target = None
+        if choose_target:
+            parent = QFileDialog.getExistingDirectory(self, '选择恢复到的目录', record.root)
+            if not parent:
+                return
+            target = str(Path(parent) / record.parts[-1])
+        self.progress_widget.update_progress(0, '正在恢复...')
+        worker = self._create_worker('restore', archive=record.archive.archive, target=target)
+        worker.finished.connect(self._handle_restore_result)
+        worker.start()
+
+    def _handle_restore_result(self, success, msg):
+        if success:
+            self.refresh_venv_list()
+            QMessageBox.information(self, '成功', msg)
+        else:
+            QMessageBox.critical(self, '错误', f'恢复虚拟环境失败: {msg}')
+
+    def refresh_venv_list(self, use_cache=False):
+        """刷新虚拟环境列表
+
+        Args:
+            use_cache: 为 True 时只扫描没有缓存结果的根目录（根目录集合变化时使用）
+        """
         # 如果正在扫描，先取消当前扫描
         if self.worker and self.worker.is_scanning:
             self.worker.cancel()
             self.progress_widget.status_label.setText("正在取消扫描...")
             return
-            
+        
+        if not use_cache:
+            self.venv_manager.clear_scan_cache()
+        self.details_loader.clear_failed()
+        
+        config = self.config.snapshot()
+        roots = self.venv_manager.get_roots()
+        self.venv_delegate.show_root = len(roots) > 1
+        if (self.venv_model.show_python_version, self.venv_model.show_details) != \
+                (config.show_python_version, config.show_venv_details):
+            self.venv_model.show_python_version = config.show_python_version
+            self.venv_model.show_details = config.show_venv_details
+            self.venv_model.refresh_all()
+            self._schedule_details()
+        
+        # 移除已不在根目录集合中的条目
+        self.venv_model.remove_records(self.venv_store.retain_roots(roots))
+        listed = self.venv_store.roots()
+        self._load_cold_entries()
+        
+        # 有缓存的根目录直接使用缓存结果，其余的重新扫描；
+        # 重新扫描的根目录先保留原有记录（连同健康状态等信息），扫描结束后移除没有再次发现的
+        to_scan = []
+        self._stale = set()
+        for root in roots:
+            cached = self.venv_manager.get_cached_scan(root, config.scan_depth)
+            if cached is None:
+                self._stale.update(r for r in self.venv_store.records(root) if r.archive is None)
+                to_scan.append(root)
+            elif str(root) not in listed:
+                for venv_path, python_version in cached:
+                    self.add_venv_to_list(venv_path, python_version, str(root))
+        self.venv_model.flush()
+        
+        if not to_scan:
+            return
+        
+        self.root_progress = {str(root): 0 for root in to_scan}
         self.progress_widget.update_progress(0, self.progress_widget.status_label.text())
-        worker = self._create_worker('list')
+        # 不使用缓存的刷新（手动刷新、创建删除等操作之后）要求后台索引服务也重新扫描
+        worker = self._create_worker('list', roots=to_scan, rescan=not use_cache)
         worker.finished.connect(self._handle_refresh_result)
         worker.start()
 
+    def _load_cold_entries(self):
+        """把归档目录中属于当前根目录的归档显示为已归档条目"""
+        roots = {str(root) for root in self.venv_manager.get_roots()}
+        archives = {info.archive: info for info in list_archives(archive_dir(self.config.get('archive_dir')))
+                    if info.root in roots}
+        # 归档已被恢复或删除的条目
+        self._remove_records([r for r in self.venv_store.records()
+                              if r.archive is not None and r.archive.archive not in archives])
+        for info in archives.values():
+            record, new = self.venv_store.add(info.root, info.rel_path, info.python_version)
+            if not new and record.archive is None and (record.full_path / 'pyvenv.cfg').exists():
+                continue  # 原位置已有同名的环境
+            record.archive = info
+            record.size = info.size
+            record.package_count = info.package_count
+            self.venv_model.add_record(record)
+        self.venv_model.flush()
+
+    def update_root_progress(self, root, value):
+        """更新单个根目录的扫描进度"""
+        self.root_progress[root] = value
+        self.progress_widget.setToolTip('\n'.join(
+            f'{path}: {percent}%' for path, percent in self.root_progress.items()))
+
     def _handle_refresh_result(self, success, msg):
         """扫描完成的处理"""
         if not success and msg != "扫描已取消":  # 不显示取消的错误消息
@@ -320,9 +518,9 @@ class VenvManagerWindow(QMainWindow):
         if msg == "扫描已取消":
             QTimer.singleShot(100, self.refresh_venv_list)
         elif success:
-            # 如果搜索框有内容，应用过滤
-            if hasattr(self, 'search_input') and self.search_input.text():
-                self.filter_venv_list(self.search_input.text())
+            # 移除已经不存在的环境
+            self._remove_records(list(self._stale))
+            self._stale = set()
 
     def change_base_path(self):
         """更改虚拟环境基础路径"""
@@ -336,19 +534,249 @@ class VenvManagerWindow(QMainWindow):
                 self.venv_manager.set_base_path(new_path)
                 self.path_selector.path_display.setText(new_path)
                 self.config.add_recent_path(new_path)
-                self.refresh_venv_list()
+                # 已扫描过的根目录使用缓存结果
+                self.refresh_venv_list(use_cache=True)
             except KeyboardInterrupt:
-                logging.warning("用户中断了路径更改操作")
+                self.logger.warning("用户中断了路径更改操作")
                 QMessageBox.information(self, '提示', '操作已取消')
             except Exception as e:
-                logging.error(f"更改路径失败: {new_path}, 错误: {str(e)}")
+                self.logger.error(f"更改路径失败: {new_path}, 错误: {str(e)}")
                 QMessageBox.critical(self, '错误', f'更改路径失败: {str(e)}')
     
-    def show_venv_info(self, item):
+    def _prefetch_packages(self, current, previous=None):
+        """选中环境时在后台预读包列表，打开包管理器时可以直接显示"""
+        if not current.isValid() or not self.config.get('prefetch_packages'):
+            return
+        record = current.data(VenvListModel.RecordRole)
+        if record.archive is None:
+            prefetch_inventory(record.full_path)
+
+    def show_venv_info(self, index):
         """显示包管理器"""
-        venv_path_text = self.get_venv_path_from_text(item.text())
-        venv_path = self.venv_manager.base_path / venv_path_text
-        dialog = PackageManagerDialog(venv_path, self)
+        record = index.data(VenvListModel.RecordRole)
+        if record.archive is not None:
+            reply = QMessageBox.question(self, '已归档', f'虚拟环境 {record.rel_path} 已归档，是否恢复？',
+                                         QMessageBox.Yes | QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                self.restore_venv(record)
+            return
+        dialog = PackageManagerDialog(record.full_path, self, config=self.config)
+        dialog.exec_()
+        # 包可能有变化，重新读取大小和包数量
+        record.package_count = None
+        self._schedule_details()
+
+    def get_all_venv_paths(self):
+        """获取列表中所有虚拟环境的完整路径"""
+        return [record.full_path for record in self.venv_model.records() if record.archive is None]
+
+    def show_package_query(self):
+        """显示跨环境包查询对话框"""
+        dialog = PackageQueryDialog(self.venv_manager, self.get_all_venv_paths(), self.config, self)
+        dialog.exec_()
+
+    def show_batch_create(self):
+        """显示按清单批量创建对话框"""
+        dialog = BatchCreateDialog(self.venv_manager, self.config, self)
+        dialog.exec_()
+        if dialog.created:
+            self.refresh_venv_list()
+
+    def export_all_venvs(self):
+        """把列表中所有虚拟环境导出到一个归档文件"""
+        venv_paths = self.get_all_venv_paths()
+        if not venv_paths:
+            QMessageBox.warning(self, '警告', '列表中没有虚拟环境')
+            return
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            '导出所有环境',
+            str(Path.home() / f'venvs_{timestamp}.zip'),
+            'Zip 归档 (*.zip);;JSON Lines (*.jsonl)'
+        )
+        if not file_path:
+            return
+        
+        self.progress_widget.update_progress(0, '正在导出...')
+        worker = self._create_worker('export_all', venv_paths=venv_paths, dest=file_path)
+        worker.finished.connect(self._handle_export_all_result)
+        worker.start()
+
+    def _handle_export_all_result(self, success, msg):
+        if success:
+            QMessageBox.information(self, '导出完成', msg)
+        elif msg != "导出已取消":
+            QMessageBox.critical(self, '错误', f'导出失败: {msg}')
+
+    def export_host_inventory(self):
+        """导出本机的环境清单，用于在其他机器上合并"""
+        venv_paths = self.get_all_venv_paths()
+        if not venv_paths:
+            QMessageBox.warning(self, '警告', '列表中没有虚拟环境')
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            '导出主机清单',
+            str(Path.home() / f'inventory_{socket.gethostname()}.sqlite'),
+            '清单文件 (*.sqlite)'
+        )
+        if not file_path:
+            return
+        
+        self.progress_widget.update_progress(0, '正在导出清单...')
+        worker = self._create_worker('inventory_export', venv_paths=venv_paths, dest=file_path)
+        worker.finished.connect(self._handle_export_all_result)
+        worker.start()
+
+    def merge_host_inventories(self):
+        """合并多台主机导出的清单并打开查看"""
+        sources, _ = QFileDialog.getOpenFileNames(self, '选择要合并的清单', str(Path.home()),
+                                                  '清单文件 (*.sqlite);;所有文件 (*)')
+        if not sources:
+            return
+        dest, _ = QFileDialog.getSaveFileName(
+            self,
+            '保存合并后的清单（可选择已有文件追加）',
+            str(Path.home() / 'inventory_merged.sqlite'),
+            '清单文件 (*.sqlite)',
+            options=QFileDialog.DontConfirmOverwrite
+        )
+        if not dest:
+            return
+        
+        self.progress_widget.update_progress(0, '正在合并清单...')
+        worker = self._create_worker('inventory_merge', sources=sources, dest=dest)
+        worker.finished.connect(lambda success, msg: self._handle_inventory_merge_result(success, msg, dest))
+        worker.start()
+
+    def _handle_inventory_merge_result(self, success, msg, dest):
+        if not success:
+            QMessageBox.critical(self, '错误', f'合并失败: {msg}')
+            return
+        self.progress_widget.status_label.setText(msg)
+        self.show_host_inventory(dest)
+
+    def show_host_inventory(self, path=None):
+        """打开合并后的多主机清单"""
+        if not path:
+            path, _ = QFileDialog.getOpenFileName(self, '打开主机清单', str(Path.home()),
+                                                  '清单文件 (*.sqlite);;所有文件 (*)')
+            if not path:
+                return
+        try:
+            dialog = HostInventoryDialog(path, self)
+        except Exception as e:
+            QMessageBox.critical(self, '错误', f'无法打开清单: {e}')
+            return
+        dialog.exec_()
+
+    def check_health(self, deep=False):
+        """并行检查所有虚拟环境的健康状态"""
+        venv_paths = self.get_all_venv_paths()
+        if not venv_paths:
+            QMessageBox.warning(self, '警告', '列表中没有虚拟环境')
+            return
+        
+        self.progress_widget.update_progress(0, '正在检查...')
+        worker = self._create_worker('health', venv_paths=venv_paths, deep=deep)
+        worker.venv_checked.connect(self._apply_health_result)
+        worker.finished.connect(self._handle_health_result)
+        worker.start()
+
+    def _apply_health_result(self, result):
+        """把健康状态保存到记录中，列表中随之显示"""
+        record = self.venv_store.find(result.path)
+        if record is not None:
+            record.health = result.status
+            record.issues = tuple(result.issues)
+            self.venv_model.record_changed(record)
+
+    def _handle_health_result(self, success, msg):
+        if success:
+            self.progress_widget.status_label.setText(msg)
+        elif msg != "检查已取消":
+            QMessageBox.critical(self, '错误', f'健康检查失败: {msg}')
+
+    def check_all_outdated(self):
+        """检查所有虚拟环境中可更新的包"""
+        venv_paths = self.get_all_venv_paths()
+        if not venv_paths:
+            QMessageBox.warning(self, '警告', '列表中没有虚拟环境')
+            return
+        
+        self.progress_widget.update_progress(0, self.progress_widget.status_label.text())
+        worker = self._create_worker('outdated', venv_paths=venv_paths)
+        worker.result_ready.connect(self._store_outdated_result)
+        worker.finished.connect(self._handle_outdated_result)
+        worker.start()
+
+    def _store_outdated_result(self, result):
+        self._outdated_result = result
+
+    def _handle_outdated_result(self, success, msg):
+        """显示检查更新结果"""
+        if not success:
+            if msg != "检查已取消":
+                QMessageBox.critical(self, '错误', f'检查更新失败: {msg}')
+            return
+        
+        outdated, errors = self._outdated_result
+        rows = []
+        for venv_path, packages in sorted(outdated.items()):
+            for pkg in packages:
+                rows.append((str(venv_path), pkg.name, pkg.version, pkg.latest))
+        summary = f'{len(rows)} 个包可以更新'
+        if errors:
+            summary += f'，{len(errors)} 个包查询失败: ' + ', '.join(sorted(errors)[:10])
+        dialog = ResultTableDialog('检查更新', ['虚拟环境', '包名', '当前版本', '最新版本'],
+                                   rows, summary, self)
+        dialog.exec_()
+
+    def diff_venvs(self):
+        """比较选中的虚拟环境"""
+        selected_items = self.selected_records()
+        if len(selected_items) < 2:
+            QMessageBox.warning(self, '警告', '请至少选择两个虚拟环境')
+            return
+        
+        venv_paths = [self.get_venv_full_path(item) for item in selected_items]
+        self.progress_widget.update_progress(0, self.progress_widget.status_label.text())
+        worker = self._create_worker('diff', venv_paths=venv_paths)
+        worker.result_ready.connect(self._store_diff_result)
+        worker.finished.connect(self._handle_diff_result)
+        worker.start()
+
+    def _store_diff_result(self, diffs):
+        self._diff_result = diffs
+
+    def _handle_diff_result(self, success, msg):
+        """显示对比结果"""
+        if not success:
+            QMessageBox.critical(self, '错误', f'比较虚拟环境失败: {msg}')
+            return
+        
+        diffs = self._diff_result
+        if len(diffs) == 1:
+            diff = diffs[0]
+            rows = [('新增', name, '', version) for name, version in diff.added]
+            rows += [('删除', name, version, '') for name, version in diff.removed]
+            rows += [('变更', name, old, new) for name, old, new in diff.changed]
+            summary = (f'A: {diff.a} (Python {diff.python_a or "未知"})\n'
+                       f'B: {diff.b} (Python {diff.python_b or "未知"})\n'
+                       f'新增 {len(diff.added)} 个，删除 {len(diff.removed)} 个，变更 {len(diff.changed)} 个')
+            dialog = ResultTableDialog('比较环境', ['变化', '包名', 'A 版本', 'B 版本'],
+                                       rows, summary, self)
+        else:
+            rows = [(diff.a, diff.b,
+                     diff.python_a if diff.python_a == diff.python_b
+                     else f'{diff.python_a or "未知"} / {diff.python_b or "未知"}',
+                     len(diff.added), len(diff.removed), len(diff.changed))
+                    for diff in diffs]
+            dialog = ResultTableDialog('比较环境', ['环境 A', '环境 B', 'Python版本', '新增', '删除', '变更'],
+                                       rows, f'共 {len(diffs)} 组两两对比结果', self)
         dialog.exec_()
 
     def update_progress(self, value, message):
@@ -368,6 +796,9 @@ class VenvManagerWindow(QMainWindow):
 
     def apply_settings(self):
         """应用新的设置"""
+        self.venv_manager.set_extra_roots(self.config.get('scan_roots'))
+        setup_logging(self.config.get('log_level'), self.config.get('log_json'))
+        
         # 直接从 config 获取设置
         self.max_scan_depth = self.config.get('scan_depth')
         self.max_threads = self.config.get('max_threads')
@@ -383,9 +814,8 @@ class VenvManagerWindow(QMainWindow):
             self.show_pkg_size_action.setChecked(self.config.get('show_pkg_size'))
             
         # 如果设置改变了，刷新列表
-        # 当显示Python版本设置改变时，始终刷新列表
-        if self.config.get('auto_refresh') or self.config.get('show_python_version'):
-            self.refresh_venv_list() 
+        # 扫描参数未变的根目录沿用缓存结果，只有新增的根目录或扫描参数变化时才会重新扫描
+        self.refresh_venv_list(use_cache=True)
             
     def create_menu_bar(self):
         """创建菜单栏"""
@@ -447,6 +877,58 @@ class VenvManagerWindow(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # 工具菜单
+        tools_menu = menubar.addMenu('工具')
+        
+        # 按清单批量创建
+        batch_create_action = QAction('批量创建...', self)
+        batch_create_action.triggered.connect(self.show_batch_create)
+        tools_menu.addAction(batch_create_action)
+        
+        # 跨环境查询包
+        package_query_action = QAction('查询包...', self)
+        package_query_action.setToolTip('查询哪些虚拟环境安装了指定版本的包')
+        package_query_action.triggered.connect(self.show_package_query)
+        tools_menu.addAction(package_query_action)
+        
+        # 健康检查
+        health_action = QAction('检查环境健康', self)
+        health_action.setToolTip('检查解释器链接、pyvenv.cfg 和 pip 是否正常')
+        health_action.triggered.connect(lambda: self.check_health(deep=False))
+        tools_menu.addAction(health_action)
+        
+        deep_health_action = QAction('深度检查（pip check / RECORD）', self)
+        deep_health_action.setToolTip('额外执行 pip check 并校验已安装文件，耗时较长')
+        deep_health_action.triggered.connect(lambda: self.check_health(deep=True))
+        tools_menu.addAction(deep_health_action)
+        
+        # 导出所有环境
+        export_all_action = QAction('导出所有环境...', self)
+        export_all_action.setToolTip('把所有虚拟环境的包列表和解释器信息导出到一个归档文件')
+        export_all_action.triggered.connect(self.export_all_venvs)
+        tools_menu.addAction(export_all_action)
+        
+        # 多主机清单
+        inventory_menu = tools_menu.addMenu('主机清单')
+        export_inventory_action = QAction('导出本机清单...', self)
+        export_inventory_action.setToolTip('把本机所有虚拟环境和包导出为可合并的清单文件')
+        export_inventory_action.triggered.connect(self.export_host_inventory)
+        inventory_menu.addAction(export_inventory_action)
+        
+        merge_inventory_action = QAction('合并清单...', self)
+        merge_inventory_action.setToolTip('把多台主机导出的清单合并为一个可查询的文件')
+        merge_inventory_action.triggered.connect(self.merge_host_inventories)
+        inventory_menu.addAction(merge_inventory_action)
+        
+        open_inventory_action = QAction('打开清单...', self)
+        open_inventory_action.triggered.connect(lambda: self.show_host_inventory())
+        inventory_menu.addAction(open_inventory_action)
+        
+        # 检查所有环境中可更新的包
+        outdated_action = QAction('检查所有环境更新', self)
+        outdated_action.triggered.connect(self.check_all_outdated)
+        tools_menu.addAction(outdated_action)
+        
         # 帮助菜单
         help_menu = menubar.addMenu('帮助')
         
@@ -457,12 +939,16 @@ class VenvManagerWindow(QMainWindow):
 
     def copy_venv(self):
         """复制虚拟环境"""
-        selected = self.venv_list.currentItem()
+        selected = self.current_record()
         if not selected:
             QMessageBox.warning(self, '警告', '请选择要复制的虚拟环境')
             return
+        if selected.archive is not None:
+            QMessageBox.warning(self, '警告', '该虚拟环境已归档，请先恢复')
+            return
         
-        source_name = self.get_venv_path_from_text(selected)
+        source_name = selected.rel_path
+        source_path = str(self.get_venv_full_path(selected))
         target_name, ok = QInputDialog.getText(
             self, '复制虚拟环境',
             '请输入新环境名称:',
@@ -481,10 +967,44 @@ class VenvManagerWindow(QMainWindow):
                 parent_dir.mkdir(parents=True, exist_ok=True)
             
             self.progress_widget.update_progress(0, self.progress_widget.status_label.text())
-            worker = self._create_worker('copy', source=source_name, target=target_name)
+            worker = self._create_worker('copy', source=source_path, target=target_name)
             worker.finished.connect(self._handle_copy_result)
             worker.start()
 
+    def move_venv(self):
+        """移动或重命名虚拟环境（不重新安装包）"""
+        selected = self.current_record()
+        if not selected:
+            QMessageBox.warning(self, '警告', '请选择要移动的虚拟环境')
+            return
+        if selected.archive is not None:
+            QMessageBox.warning(self, '警告', '该虚拟环境已归档，请先恢复')
+            return
+        
+        target_name, ok = QInputDialog.getText(
+            self, '移动/重命名虚拟环境',
+            '请输入新名称或路径（相对路径基于环境所在的根目录）:',
+            QLineEdit.Normal, selected.rel_path
+        )
+        if not ok or not target_name.strip() or target_name.strip() == selected.rel_path:
+            return
+        target_path = Path(selected.root) / target_name.strip()
+        if target_path.exists():
+            QMessageBox.warning(self, '警告', f'{target_path} 已存在')
+            return
+        
+        self.progress_widget.update_progress(0, self.progress_widget.status_label.text())
+        worker = self._create_worker('move', source=str(selected.full_path), target=str(target_path))
+        worker.finished.connect(self._handle_move_result)
+        worker.start()
+
+    def _handle_move_result(self, success, msg):
+        if success:
+            self.refresh_venv_list()
+            QMessageBox.information(self, '成功', msg)
+        else:
+            QMessageBox.critical(self, '错误', f'移动虚拟环境失败: {msg}')
+
     def _handle_copy_result(self, success, msg):
         """处理复制结果"""
         if success:
@@ -502,8 +1022,8 @@ class VenvManagerWindow(QMainWindow):
         """切换显示Python版本设置"""
         value = self.show_python_version_action.isChecked()
         self.config.set('show_python_version', value)
-        # 刷新列表以应用新设置
-        self.refresh_venv_list()
+        # 版本按可见行读取，不需要重新扫描
+        self.refresh_venv_list(use_cache=True)
         
     def toggle_auto_upgrade_pip(self):
         """切换自动升级pip设置"""
@@ -516,35 +1036,15 @@ class VenvManagerWindow(QMainWindow):
         self.config.set('show_pkg_size', value)
     
     def filter_venv_list(self, text):
-        """根据搜索文本过滤虚拟环境列表"""
-        # 保存当前搜索文本，以便在扫描过程中添加新项目时使用
+        """根据搜索文本过滤虚拟环境列表（按名称和版本）"""
         self.current_search_text = text.lower()
-        
-        # 如果搜索文本为空，显示所有项
-        if not self.current_search_text:
-            for i in range(self.venv_list.count()):
-                self.venv_list.item(i).setHidden(False)
-            return
-            
-        # 遍历所有项，根据名称和版本过滤
-        for i in range(self.venv_list.count()):
-            item = self.venv_list.item(i)
-            venv_path = item.text().lower()
-            python_version = item.data(Qt.UserRole + 1)
-            
-            # 检查路径或版本是否包含搜索文本
-            if self.current_search_text in venv_path or (python_version and self.current_search_text in python_version.lower()):
-                item.setHidden(False)
-            else:
-                item.setHidden(True)
+        self.venv_proxy.set_filter_text(self.current_search_text)
                 
     def clear_search(self):
         """清除搜索框并显示所有项"""
         self.search_input.clear()
         self.current_search_text = ""
-        # 显示所有项
-        for i in range(self.venv_list.count()):
-            self.venv_list.item(i).setHidden(False)
+        self.venv_proxy.set_filter_text("")
         
     def set_scan_depth(self):
         """设置扫描深度"""
@@ -599,18 +1099,42 @@ class VenvManagerWindow(QMainWindow):
         menu = QMenu()
         
         # 获取当前选中项
-        selected_items = self.venv_list.selectedItems()
+        selected_items = self.selected_records()
         
         # 只有在有选中项时才显示激活、复制和删除选项
         if selected_items:
             # 添加菜单项
-            activate_action = QAction('激活环境', self)
-            activate_action.triggered.connect(self.activate_venv)
-            menu.addAction(activate_action)
+            current = self.current_record()
+            if current is not None and current.archive is not None:
+                restore_action = QAction('恢复环境', self)
+                restore_action.triggered.connect(lambda: self.restore_venv(current))
+                menu.addAction(restore_action)
+                
+                restore_to_action = QAction('恢复到...', self)
+                restore_to_action.triggered.connect(lambda: self.restore_venv(current, choose_target=True))
+                menu.addAction(restore_to_action)
+            else:
+                activate_action = QAction('激活环境', self)
+                activate_action.triggered.connect(self.activate_venv)
+                menu.addAction(activate_action)
+                
+                copy_action = QAction('复制环境', self)
+                copy_action.triggered.connect(self.copy_venv)
+                menu.addAction(copy_action)
+                
+                move_action = QAction('移动/重命名', self)
+                move_action.triggered.connect(self.move_venv)
+                menu.addAction(move_action)
+            
+            if any(r.archive is None for r in selected_items):
+                archive_action = QAction('归档环境', self)
+                archive_action.triggered.connect(self.archive_venvs)
+                menu.addAction(archive_action)
             
-            copy_action = QAction('复制环境', self)
-            copy_action.triggered.connect(self.copy_venv)
-            menu.addAction(copy_action)
+            if len(selected_items) >= 2:
+                diff_action = QAction('比较环境', self)
+                diff_action.triggered.connect(self.diff_venvs)
+                menu.addAction(diff_action)
             
             delete_action = QAction('删除环境', self)
             delete_action.triggered.connect(self.delete_venv)
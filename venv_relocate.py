@@ -0,0 +1,175 @@
+"""虚拟环境路径重定位
+
+虚拟环境中有不少文件写入了创建时的绝对路径：
+
+- bin/（Windows 为 Scripts/）下的 activate 脚本（VIRTUAL_ENV=...）
+- pip 安装的命令行脚本的 shebang（#!/旧路径/bin/python）
+- pyvenv.cfg 中的 command 行（Python 3.11+）
+- site-packages 中的 .pth 文件
+- 指向环境内部的绝对路径符号链接
+
+环境移动或从归档恢复到其他位置后，把这些文件中的旧路径替换为新路径。
+二进制文件（如 Windows 下 pip 生成的 .exe 启动器）不做修改，只在结果中列出，
+需要重新安装对应的包才能使用。
+
+move_venv 移动或重命名虚拟环境：同一文件系统内直接 os.rename，
+跨文件系统时流式复制到目标位置后再删除原目录，不重新安装任何包。
+"""
+import errno
+import os
+import re
+import shutil
+from collections import namedtuple
+from pathlib import Path
+
+from dist_metadata import find_site_packages
+from venv_details import directory_size
+
+MAX_TEXT_SIZE = 1024 * 1024  # 超过该大小的文件不当作脚本处理
+
+# 重定位结果: 改写的文件, 重新指向的符号链接, 含有旧路径但未修改的二进制文件
+RelocateResult = namedtuple('RelocateResult', 'rewritten relinked skipped')
+# 移动结果: 新路径, 是否跨文件系统复制, 重定位结果
+MoveResult = namedtuple('MoveResult', 'path copied relocated')
+
+
+def _path_pattern(old_path):
+    """匹配旧路径（后面必须是路径分隔符、引号、空白或结尾，避免误伤前缀相同的路径）"""
+    return re.compile(re.escape(os.fsencode(old_path)) + rb'(?=[/\\"\'\s:;]|$)', re.MULTILINE)
+
+
+def _is_text(data):
+    return data.startswith(b'#!') or b'\0' not in data[:8192]
+
+
+def _rewrite_file(path, pattern, new_bytes, result):
+    try:
+        if os.path.islink(path) or os.path.getsize(path) > MAX_TEXT_SIZE:
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return
+    if not pattern.search(data):
+        return
+    if not _is_text(data):
+        result.skipped.append(str(path))
+        return
+    mode = os.stat(path).st_mode
+    tmp = f"{path}.relocate"
+    with open(tmp, 'wb') as f:
+        f.write(pattern.sub(lambda m: new_bytes, data))
+    os.chmod(tmp, mode)
+    os.replace(tmp, path)
+    result.rewritten.append(str(path))
+
+
+def relocate_venv(venv_path, old_path):
+    """把虚拟环境中的旧绝对路径替换为当前路径
+
+    Args:
+        venv_path: 虚拟环境当前所在路径
+        old_path: 虚拟环境原来的路径
+
+    Returns:
+        RelocateResult
+    """
+    venv_path = Path(venv_path).absolute()
+    old_path = str(Path(old_path).absolute())
+    result = RelocateResult([], [], [])
+    if old_path == str(venv_path):
+        return result
+    pattern = _path_pattern(old_path)
+    new_bytes = os.fsencode(str(venv_path))
+
+    _rewrite_file(venv_path / 'pyvenv.cfg', pattern, new_bytes, result)
+
+    bin_dir = venv_path / ('Scripts' if os.name == 'nt' else 'bin')
+    try:
+        entries = list(os.scandir(bin_dir))
+    except OSError:
+        entries = []
+    for entry in entries:
+        if entry.is_symlink():
+            target = os.readlink(entry.path)
+            if target == old_path or target.startswith(old_path + os.sep):
+                new_target = str(venv_path) + target[len(old_path):]
+                os.remove(entry.path)
+                os.symlink(new_target, entry.path)
+                result.relinked.append(entry.path)
+        elif entry.is_file():
+            _rewrite_file(entry.path, pattern, new_bytes, result)
+
+    for location in find_site_packages(venv_path):
+        try:
+            pth_files = [e.path for e in os.scandir(location) if e.name.endswith('.pth') and e.is_file()]
+        except OSError:
+            continue
+        for path in pth_files:
+            _rewrite_file(path, pattern, new_bytes, result)
+    return result
+
+
+def _copy_tree(source, target, progress=None, total=0):
+    """复制目录（保留符号链接），按已复制字节数报告进度"""
+    done = [0]
+
+    def copy_file(src, dst):
+        shutil.copy2(src, dst)
+        if progress:
+            done[0] += os.path.getsize(dst)
+            progress(done[0], total)
+
+    shutil.copytree(source, target, symlinks=True, copy_function=copy_file)
+
+
+def move_venv(source, target, progress=None):
+    """移动或重命名虚拟环境，并改写其中的绝对路径
+
+    Args:
+        source: 虚拟环境当前路径
+        target: 新路径（不能已存在）
+        progress: 可选，跨文件系统复制时回调 progress(已复制字节, 总字节)
+
+    Returns:
+        MoveResult
+    """
+    source = Path(source).absolute()
+    target = Path(target).absolute()
+    if not (source / 'pyvenv.cfg').is_file():
+        raise Exception(f"{source} 不是虚拟环境")
+    if target.exists():
+        raise Exception(f"目标路径 {target} 已存在")
+    if target == source or source in target.parents:
+        raise Exception("不能移动到环境自身的子目录中")
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    copied = False
+    try:
+        os.rename(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # 跨文件系统: 先复制到目标目录中的临时位置，完成后再改名，中途失败不留下半个环境
+        tmp = target.parent / f".{target.name}.move-{os.getpid()}"
+        try:
+            _copy_tree(source, tmp, progress, directory_size(source) if progress else 0)
+            os.rename(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        copied = True
+
+    try:
+        relocated = relocate_venv(target, source)
+    except BaseException:
+        # 改写失败时恢复原状
+        if copied:
+            shutil.rmtree(target, ignore_errors=True)
+        else:
+            os.rename(target, source)
+            relocate_venv(source, target)  # 把已经改写的文件改回来
+        raise
+    if copied:
+        shutil.rmtree(source)
+    return MoveResult(str(target), copied, relocated)
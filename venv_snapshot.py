@@ -0,0 +1,243 @@
+"""虚拟环境快照与回滚
+
+安装、升级、卸载包之前为 site-packages 和 bin/（Windows 为 Scripts/）建立
+快照，升级出问题时可以整体回滚。
+
+快照是硬链接树：目录逐个重建，文件用 os.link 指向同一个 inode，几乎不占用
+额外空间，上千个包的环境也只需要零点几秒。这依赖 pip 的写入方式——pip 覆盖
+文件前会先删除旧文件再写新文件，卸载时把文件移走，从不在原 inode 上修改，
+所以快照中的文件内容不会被之后的操作改变。文件系统不支持硬链接时退化为复制。
+
+快照保存在环境内的 .snapshots/<快照ID>/ 中（保证与环境在同一文件系统），
+随环境一起移动、归档。回滚时先用快照为每个目录建立新的硬链接树，再通过
+rename 逐个替换当前目录；所有目录替换成功后才删除旧目录，中途失败时把已
+替换的目录全部换回。
+"""
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from dist_metadata import find_site_packages, iter_distributions
+from venv_relocate import relocate_venv
+from log_setup import get_logger
+
+logger = get_logger('snapshot')
+
+SNAPSHOT_DIR_NAME = '.snapshots'
+SNAPSHOT_META = 'snapshot.json'
+DEFAULT_KEEP = 5
+
+# 快照: 快照ID, 快照目录, 创建时间, 说明, 包列表（名称==版本）
+Snapshot = namedtuple('Snapshot', 'id path created label packages')
+
+
+def _snapshot_root(venv_path):
+    return Path(venv_path) / SNAPSHOT_DIR_NAME
+
+
+def _trees(venv_path):
+    """需要快照的目录（相对环境的路径）"""
+    venv_path = Path(venv_path)
+    trees = ['Scripts' if os.name == 'nt' else 'bin']
+    for location in find_site_packages(venv_path):
+        trees.append(os.path.relpath(location, venv_path))
+    return [t for t in trees if (venv_path / t).is_dir()]
+
+
+def _link_tree(source, target):
+    """用硬链接复制目录树（符号链接按原样复制，不支持硬链接时复制文件）
+
+    Returns:
+        int: 链接或复制的文件数
+    """
+    count = 0
+    os.makedirs(target)
+    stack = [(source, target)]
+    while stack:
+        src_dir, dst_dir = stack.pop()
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                dst = os.path.join(dst_dir, entry.name)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), dst)
+                elif entry.is_dir():
+                    os.mkdir(dst)
+                    stack.append((entry.path, dst))
+                else:
+                    try:
+                        os.link(entry.path, dst)
+                    except OSError:
+                        shutil.copy2(entry.path, dst)
+                    count += 1
+        shutil.copystat(src_dir, dst_dir)
+    return count
+
+
+def _read_meta(path):
+    try:
+        data = json.loads((Path(path) / SNAPSHOT_META).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return Snapshot(data['id'], str(path), data['created'], data.get('label', ''),
+                    tuple(data.get('packages', ())))
+
+
+def list_snapshots(venv_path):
+    """列出环境的所有快照（最新的在前）"""
+    snapshots = []
+    try:
+        entries = list(os.scandir(_snapshot_root(venv_path)))
+    except OSError:
+        return snapshots
+    for entry in entries:
+        if entry.is_dir() and not entry.name.startswith('.'):
+            snapshot = _read_meta(entry.path)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+    snapshots.sort(key=lambda s: s.created, reverse=True)
+    return snapshots
+
+
+def create_snapshot(venv_path, label='', keep=DEFAULT_KEEP):
+    """为环境的 site-packages 和 bin 建立硬链接快照
+
+    Args:
+        venv_path: 虚拟环境路径
+        label: 快照说明（如"升级 requests 前"）
+        keep: 最多保留的快照数，超出的旧快照被删除；0 表示不限制
+
+    Returns:
+        Snapshot
+    """
+    venv_path = Path(venv_path).absolute()
+    if not (venv_path / 'pyvenv.cfg').is_file():
+        raise Exception(f"{venv_path} 不是虚拟环境")
+    root = _snapshot_root(venv_path)
+    snapshot_id = time.strftime('%Y%m%d-%H%M%S')
+    suffix = 1
+    while (root / snapshot_id).exists():
+        snapshot_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+        suffix += 1
+
+    start = time.perf_counter()
+    packages = sorted(f"{d.display_name}=={d.version}" for d in iter_distributions(venv_path))
+    trees = _trees(venv_path)
+    # 先在隐藏目录中建立，完成后改名，列表中不会出现不完整的快照
+    tmp = root / f".{snapshot_id}.tmp"
+    files = 0
+    try:
+        tmp.mkdir(parents=True)
+        for tree in trees:
+            files += _link_tree(str(venv_path / tree), str(tmp / tree))
+        meta = {'id': snapshot_id, 'created': time.time(), 'label': label,
+                'venv_path': str(venv_path), 'trees': trees, 'packages': packages}
+        (tmp / SNAPSHOT_META).write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+        os.rename(tmp, root / snapshot_id)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    logger.info(f"已建立快照: {venv_path} {snapshot_id}（{files} 个文件，"
+                f"{time.perf_counter() - start:.2f} 秒）")
+    if keep:
+        prune_snapshots(venv_path, keep)
+    return _read_meta(root / snapshot_id)
+
+
+def prune_snapshots(venv_path, keep=DEFAULT_KEEP):
+    """只保留最新的 keep 个快照，返回被删除的快照"""
+    removed = list_snapshots(venv_path)[keep:]
+    for snapshot in removed:
+        shutil.rmtree(snapshot.path, ignore_errors=True)
+    # 中断留下的临时目录
+    for tmp in _snapshot_root(venv_path).glob('.*.tmp'):
+        shutil.rmtree(tmp, ignore_errors=True)
+    return removed
+
+
+def delete_snapshot(venv_path, snapshot_id):
+    path = _snapshot_root(venv_path) / snapshot_id
+    if not (path / SNAPSHOT_META).is_file():
+        raise Exception(f"快照 {snapshot_id} 不存在")
+    shutil.rmtree(path)
+
+
+def _swap_trees(pairs):
+    """用 replacement 逐个替换 current 目录（每个两次 rename）
+
+    所有目录都替换成功后才删除旧目录；任何一步失败时把已替换的目录全部换回，
+    保证回滚要么完整完成，要么环境保持原样。
+    """
+    swapped = []  # [(current, replacement, 旧目录或 None)]
+    try:
+        for current, replacement in pairs:
+            old = f"{current}.rollback-old"
+            if os.path.lexists(old):
+                shutil.rmtree(old)
+            if os.path.exists(current):
+                os.rename(current, old)
+            else:
+                old = None
+            try:
+                os.rename(replacement, current)
+            except BaseException:
+                if old is not None:
+                    os.rename(old, current)
+                raise
+            swapped.append((current, replacement, old))
+    except BaseException:
+        for current, replacement, old in reversed(swapped):
+            os.rename(current, replacement)
+            if old is not None:
+                os.rename(old, current)
+        raise
+    for _, _, old in swapped:
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def rollback(venv_path, snapshot_id, keep=DEFAULT_KEEP, save_current=True):
+    """把 site-packages 和 bin 回滚到快照时的状态
+
+    Args:
+        venv_path: 虚拟环境路径
+        snapshot_id: 快照ID
+        keep: 回滚前为当前状态建立快照时使用的保留数量
+        save_current: 回滚前是否为当前状态建立快照（可以撤销回滚）
+
+    Returns:
+        Snapshot: 回滚前建立的快照（save_current 为 False 时为 None）
+    """
+    venv_path = Path(venv_path).absolute()
+    path = _snapshot_root(venv_path) / snapshot_id
+    try:
+        meta = json.loads((path / SNAPSHOT_META).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        raise Exception(f"快照 {snapshot_id} 不存在或已损坏")
+
+    saved = None
+    if save_current:
+        # 保留数量加一，避免刚建立的快照把要回滚的目标淘汰掉
+        saved = create_snapshot(venv_path, f"回滚到 {snapshot_id} 前", keep=keep + 1 if keep else 0)
+
+    # 先为所有目录建立新的硬链接树，再逐个替换，快照本身保持不变可以重复使用
+    staged = []
+    try:
+        for tree in meta['trees']:
+            staging = f"{venv_path / tree}.rollback-new"
+            if os.path.lexists(staging):
+                shutil.rmtree(staging)
+            _link_tree(str(path / tree), staging)
+            staged.append((str(venv_path / tree), staging))
+        _swap_trees(staged)
+    finally:
+        for _, staging in staged:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    # 快照之后环境被移动过时，快照中脚本的路径还是旧的
+    if meta.get('venv_path') and meta['venv_path'] != str(venv_path):
+        relocate_venv(venv_path, meta['venv_path'])
+    logger.info(f"已回滚: {venv_path} -> {snapshot_id}")
+    return saved
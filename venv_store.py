@@ -0,0 +1,151 @@
+"""虚拟环境记录存储
+
+每个虚拟环境对应一个 VenvRecord（__slots__，没有实例字典），保存路径、
+Python版本、大小、包数量、健康状态和时间戳。根目录和路径的每一级都经过
+sys.intern，大量环境共享同一批字符串对象，十万条记录也只占用很少的内存。
+
+界面列表模型和命令行都从 VenvStore 读取，不再把状态分散在列表项的各个
+数据角色和显示文本中。
+"""
+import os
+import sys
+from pathlib import Path
+
+
+class VenvRecord:
+    """单个虚拟环境的记录
+
+    root 和 parts 中的字符串都已 intern；尚未获取的字段为 None。
+    """
+    __slots__ = ('root', 'parts', 'python_version', 'size', 'package_count',
+                 'health', 'issues', 'created', 'modified', 'last_used', 'archive')
+
+    def __init__(self, root, parts, python_version=''):
+        self.root = root
+        self.parts = parts
+        self.python_version = python_version
+        self.size = None            # 占用空间（字节）
+        self.package_count = None   # 已安装的包数量
+        self.health = None          # 健康状态（ok / warning / broken）
+        self.issues = None          # 健康检查发现的问题
+        self.created = None         # 创建时间（时间戳）
+        self.modified = None        # 最近修改时间（时间戳）
+        self.last_used = None       # 最近使用时间（时间戳）
+        self.archive = None         # 已归档时为 ArchiveInfo（环境目录已不存在）
+
+    @property
+    def rel_path(self):
+        """相对根目录的路径"""
+        return os.sep.join(self.parts)
+
+    @property
+    def full_path(self):
+        return Path(self.root, *self.parts)
+
+    def to_dict(self):
+        return {
+            'root': self.root,
+            'rel_path': self.rel_path,
+            'path': str(self.full_path),
+            'python_version': self.python_version,
+            'size': self.size,
+            'package_count': self.package_count,
+            'health': self.health,
+            'issues': list(self.issues) if self.issues else [],
+            'created': self.created,
+            'modified': self.modified,
+            'last_used': self.last_used,
+            'archive': self.archive.archive if self.archive else None,
+        }
+
+    def __repr__(self):
+        return f"VenvRecord({str(self.full_path)!r})"
+
+
+def _split(rel_path):
+    """把相对路径拆分为 intern 后的各级名称"""
+    rel_path = str(rel_path)
+    if os.altsep:
+        rel_path = rel_path.replace(os.altsep, os.sep)
+    return tuple(sys.intern(part) for part in rel_path.split(os.sep) if part and part != '.')
+
+
+class VenvStore:
+    """按根目录分组、按相对路径索引的虚拟环境记录集合
+
+    只在一个线程中修改（界面线程或命令行主线程），工作线程的结果通过信号交回。
+    """
+
+    def __init__(self):
+        self._roots = {}  # {根目录: {路径各级名称: VenvRecord}}
+
+    def __len__(self):
+        return sum(len(records) for records in self._roots.values())
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def add(self, root, rel_path, python_version=''):
+        """添加记录，已存在时更新Python版本
+
+        Returns:
+            tuple: (VenvRecord, 是否为新记录)
+        """
+        root = sys.intern(str(root))
+        parts = _split(rel_path)
+        records = self._roots.setdefault(root, {})
+        record = records.get(parts)
+        if record is not None:
+            if python_version:
+                record.python_version = python_version
+            return record, False
+        record = records[parts] = VenvRecord(root, parts, python_version)
+        return record, True
+
+    def add_scan_result(self, result):
+        """添加扫描器产出的 ScanResult"""
+        return self.add(result.root, result.rel_path, result.python_version)
+
+    def get(self, root, rel_path):
+        return self._roots.get(str(root), {}).get(_split(rel_path))
+
+    def find(self, path):
+        """按完整路径查找记录（遍历所有根目录）"""
+        path = Path(path)
+        for root, records in self._roots.items():
+            try:
+                rel = path.relative_to(root)
+            except ValueError:
+                continue
+            record = records.get(rel.parts)
+            if record is not None:
+                return record
+        return None
+
+    def roots(self):
+        return set(self._roots)
+
+    def records(self, root=None):
+        """返回记录列表，可按根目录筛选"""
+        if root is None:
+            return [r for records in self._roots.values() for r in records.values()]
+        return list(self._roots.get(str(root), {}).values())
+
+    def remove(self, record):
+        records = self._roots.get(record.root)
+        if records is not None and records.pop(record.parts, None) is not None:
+            if not records:
+                del self._roots[record.root]
+            return True
+        return False
+
+    def retain_roots(self, roots):
+        """移除不在给定根目录集合中的记录，返回被移除的记录"""
+        roots = {str(r) for r in roots}
+        removed = []
+        for root in [r for r in self._roots if r not in roots]:
+            removed.extend(self._roots.pop(root).values())
+        return removed
+
+    def clear(self):
+        self._roots.clear()
@@ -1,15 +1,38 @@
-import logging
 import os
 import subprocess
-from PyQt5.QtCore import QThread, pyqtSignal
-from multiprocessing import Value, Lock
+from pathlib import Path
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
+from dist_metadata import iter_distributions
+from simple_index import SimpleIndexClient, check_outdated
+from venv_diff import diff_venvs
+from scanner import VenvScanner
+from create_pipeline import resolve_symlinks, format_stage_times
+from batch_create import BatchCreator, format_results
+from venv_export import export_all
+from host_inventory import export_inventory, merge_inventories
+from venv_health import check_venvs, STATUS_OK, STATUS_BROKEN
+import venv_details
+from venv_archive import archive_venv, restore_archive, delete_archive, archive_dir
+from venv_relocate import move_venv
+from index_daemon import connect_indexer
+from dist_metadata import format_size
+from log_setup import get_logger
+
+logger = get_logger('workers')
 
 class VenvWorker(QThread):
     """工作线程类，用于处理耗时的虚拟环境操作"""
     finished = pyqtSignal(bool, str)  # 操作完成信号
     progress = pyqtSignal(int, str)   # 进度信号
-    venv_found = pyqtSignal(str, str)  # 发现虚拟环境信号 (路径, Python版本)
+    venv_found = pyqtSignal(str, str, str)  # 发现虚拟环境信号 (相对路径, Python版本, 根目录)
+    root_progress = pyqtSignal(str, int)  # 单个根目录的扫描进度 (根目录, 百分比)
+    scan_finished = pyqtSignal(object)  # 扫描摘要 (ScanSummary)
+    result_ready = pyqtSignal(object)  # 结构化结果信号（检查更新等操作）
+    venv_checked = pyqtSignal(object)  # 单个环境的健康检查结果 (HealthResult)
+    env_progress = pyqtSignal(str, int, str)  # 批量创建中单个环境的进度 (名称, 百分比, 信息)
 
     def __init__(self, operation, venv_manager, config=None, **kwargs):
         super().__init__()
@@ -24,6 +47,41 @@ class VenvWorker(QThread):
         """取消扫描"""
         self.is_cancelled = True
 
+    def _store_scan_results(self, venvs):
+        """保存扫描结果，根目录集合变化时未变化的根目录无需重新扫描"""
+        config = self.config.snapshot()
+        for root, results in venvs.items():
+            self.venv_manager.store_scan_results(root, sorted(results), config.scan_depth)
+
+    def _list_from_indexer(self, roots, depth, rescan=False):
+        """后台索引服务在运行时直接从服务获取列表，返回是否成功
+
+        rescan 为 True 时服务忽略已有结果重新扫描（手动刷新、创建或删除环境之后）。
+        """
+        client = connect_indexer()
+        if client is None:
+            return False
+        start = time.perf_counter()
+        try:
+            with client:
+                venvs = client.call('list_venvs', roots=[str(r) for r in roots], depth=depth,
+                                    rescan=rescan)
+        except Exception as e:
+            logger.warning(f"后台索引服务查询失败，改为直接扫描: {e}")
+            return False
+        results = {str(root): [] for root in roots}
+        for venv in venvs:
+            self.venv_found.emit(venv['rel_path'], venv['python_version'], venv['root'])
+            results.setdefault(venv['root'], []).append((venv['rel_path'], venv['python_version']))
+        for root in results:
+            self.root_progress.emit(root, 100)
+        self._store_scan_results(results)
+        message = (f"从后台索引服务获取 {len(venvs)} 个虚拟环境，"
+                   f"用时 {(time.perf_counter() - start) * 1000:.0f} 毫秒")
+        self.progress.emit(100, message)
+        self.finished.emit(True, message)
+        return True
+
     def run(self):
         try:
             if self.operation == 'copy':
@@ -36,7 +94,8 @@ class VenvWorker(QThread):
                 
                 # 创建新环境
                 self.progress.emit(30, "创建目标环境...")
-                self.venv_manager.create_venv(target_name)
+                self.venv_manager.create_venv(
+                    target_name, symlinks=resolve_symlinks(self.config.snapshot().venv_symlinks))
                 
                 # 获取源环境的包列表
                 self.progress.emit(50, "获取包列表...")
@@ -55,46 +114,50 @@ class VenvWorker(QThread):
                                 subprocess.run([str(target_python), '-m', 'pip', 'install', req.strip()],
                                             check=True, capture_output=True, text=True)
                             except subprocess.CalledProcessError as e:
-                                logging.error(f"安装包失败: {req}, 错误: {e.stderr}")
-                                print(f"Warning: Failed to install {req}: {e.stderr}")
+                                logger.warning(f"安装包失败: {req}, 错误: {e.stderr}")
                 
                 self.progress.emit(100, "完成")
                 self.finished.emit(True, f"虚拟环境 {source_name} 已复制到 {target_name}")
                 
             elif self.operation == 'create':
-                # 创建环境的进度步骤
-                self.progress.emit(10, "正在创建虚拟环境...")
-                python_path = self.kwargs.get('python_path')
-                self.venv_manager.create_venv(
+                config = self.config.snapshot()
+                results = self.venv_manager.create_venv(
                     self.kwargs['name'],
-                    python_path=python_path
+                    python_path=self.kwargs.get('python_path'),
+                    upgrade_pip=config.auto_upgrade_pip,
+                    symlinks=resolve_symlinks(config.venv_symlinks),
+                    parallel=config.parallel_post_create,
+                    progress=self.progress.emit
                 )
                 
-                # 使用新创建环境的Python解释器
-                if self.config.get('auto_upgrade_pip', True):
-                    self.progress.emit(50, "正在升级pip...")
-                    venv_path = self.venv_manager.base_path / self.kwargs['name']
-                    python_path = venv_path / ('Scripts' if os.name == 'nt' else 'bin') / ('python.exe' if os.name == 'nt' else 'python')
-                    
-                    try:
-                        # 首先确保pip已安装
-                        subprocess.run([str(python_path), '-m', 'ensurepip', '--upgrade'],
-                                    check=True, capture_output=True, text=True)
-                        
-                        # 升级pip
-                        subprocess.run([str(python_path), '-m', 'pip', 'install', '--upgrade', 'pip'],
-                                    check=True, capture_output=True, text=True)
-                        
-                        # 安装基本包
-                        subprocess.run([str(python_path), '-m', 'pip', 'install', 'setuptools', 'wheel'],
-                                    check=True, capture_output=True, text=True)
-                        
-                    except subprocess.CalledProcessError as e:
-                        print(f"Warning: Failed to upgrade pip: {e.stderr}")
-                        # 继续执行，不中断创建过程
-                
                 self.progress.emit(100, "完成")
-                self.finished.emit(True, f"虚拟环境 {self.kwargs['name']} 创建成功")
+                self.finished.emit(True, f"虚拟环境 {self.kwargs['name']} 创建成功\n\n"
+                                         f"{format_stage_times(results)}")
+            elif self.operation == 'batch_create':
+                # 按清单并行创建多个虚拟环境
+                self.is_cancelled = False
+                config = self.config.snapshot()
+                envs = self.kwargs['envs']
+                done = []
+
+                def on_progress(name, value, message):
+                    self.env_progress.emit(name, value, message)
+                    if value >= 100:
+                        done.append(name)
+                        self.progress.emit(int(len(done) * 100 / len(envs)),
+                                           f"已完成 {len(done)}/{len(envs)}")
+
+                self.progress.emit(0, "正在批量创建虚拟环境...")
+                creator = BatchCreator(self.venv_manager, envs,
+                                       max_parallel=self.kwargs.get('max_parallel', config.batch_parallel),
+                                       upgrade_pip=config.auto_upgrade_pip,
+                                       symlinks=resolve_symlinks(config.venv_symlinks),
+                                       on_progress=on_progress,
+                                       is_cancelled=lambda: self.is_cancelled)
+                results = creator.run()
+                self.result_ready.emit(results)
+                self.progress.emit(100, "完成")
+                self.finished.emit(all(r.ok for r in results), format_results(results))
             elif self.operation == 'delete':
                 self.progress.emit(30, "正在删除虚拟环境...")
                 self.venv_manager.delete_venv(self.kwargs['name'])
@@ -106,87 +169,229 @@ class VenvWorker(QThread):
             elif self.operation == 'list':
                 self.is_scanning = True
                 self.is_cancelled = False
+                # 扫描期间使用配置快照，线程池中读取无需加锁
+                config = self.config.snapshot()
                 try:
-                    root_dirs = [d for d in self.venv_manager.base_path.iterdir() if d.is_dir()]
-                    total_items = len(root_dirs)
+                    # 需要扫描的根目录，默认只扫描基础路径
+                    roots = [Path(r) for r in self.kwargs.get('roots') or [self.venv_manager.base_path]]
+                    if config.use_indexer and self._list_from_indexer(roots, config.scan_depth,
+                                                                    self.kwargs.get('rescan', False)):
+                        return
                     self.progress.emit(0, "开始扫描...")
                     
-                    if total_items == 0:
-                        self.progress.emit(100, "扫描完成")
-                        self.finished.emit(True, str([]))
-                        return
-                        
-                    venvs = []
-                    venvs_lock = Lock()
-                    scanned_count = Value('i', 0)
+                    last_report = [0.0]
                     
-                    def scan_dir(root_dir):
-                        if self.is_cancelled:
+                    def on_progress(root, visited, discovered):
+                        # 限制进度信号频率，避免大目录树淹没界面线程
+                        now = time.monotonic()
+                        if now - last_report[0] < 0.1:
                             return
-                        try:
-                            def scan_single_dir(path, depth=0, max_depth=None):
-                                if self.is_cancelled:
-                                    return []
-                                if max_depth is not None and depth > max_depth:
-                                    return []
-                                    
-                                results = []
-                                try:
-                                    if self.venv_manager._is_valid_venv(path):
-                                        rel_path = str(path.relative_to(self.venv_manager.base_path))
-                                        # 获取Python版本
-                                        python_version = ""
-                                        if self.config.get('show_python_version'):
-                                            python_version = self.venv_manager.get_python_version(path)
-                                        self.venv_found.emit(rel_path, python_version)
-                                        results.append(rel_path)
-                                    
-                                    for item in path.iterdir():
-                                        if self.is_cancelled:
-                                            return results
-                                        if item.is_dir():
-                                            results.extend(scan_single_dir(item, depth + 1, max_depth))
-                                except Exception:
-                                    pass
-                                return results
-                            
-                            # 从配置获取扫描深度
-                            max_depth = self.config.get('scan_depth', 100)  # 默认值改为100
-                            dir_results = scan_single_dir(root_dir, 0, max_depth)
-                            
-                            with venvs_lock:
-                                venvs.extend(dir_results)
-                                with scanned_count.get_lock():
-                                    scanned_count.value += 1
-                                    progress = int((scanned_count.value / total_items) * 100)
-                                self.progress.emit(progress, "正在扫描...")
-                                
-                        except Exception as e:
-                            logging.error(f"扫描目录失败: {root_dir}, 错误: {str(e)}")
-                            print(f"Error scanning directory {root_dir}: {e}")
+                        last_report[0] = now
+                        # 进度按实际扫描和已发现的目录数计算，而不是按顶层目录数
+                        self.root_progress.emit(root, int(visited * 100 / max(discovered, 1)))
+                        total_visited = sum(scanner.visited.values())
+                        total_discovered = max(sum(scanner.discovered.values()), 1)
+                        self.progress.emit(int(total_visited * 100 / total_discovered),
+                                           f"正在扫描... ({total_visited}/{total_discovered} 个目录)")
                     
-                    # 使用配置的线程数
-                    max_threads = self.config.get('max_threads', 32)
+                    # 使用配置的线程数和扫描深度；Python版本等信息由列表按可见行另行读取
+                    scanner = VenvScanner(roots, config.scan_depth, config.max_threads,
+                                          is_cancelled=lambda: self.is_cancelled,
+                                          adaptive=config.scan_adaptive)
                     
-                    with ThreadPoolExecutor(max_workers=min(max_threads, total_items)) as executor:
-                        if not self.is_cancelled:
-                            executor.map(scan_dir, root_dirs)
+                    # 每个根目录的扫描结果 {根目录: [(相对路径, Python版本)]}，用于根目录缓存；
+                    # 缓存需要完整列表，只保存这两个字段，不保留 ScanResult
+                    venvs = {str(root): [] for root in roots}
+                    for record in scanner.iter_scan(on_progress):
+                        self.venv_found.emit(record.rel_path, record.python_version, record.root)
+                        venvs[record.root].append((record.rel_path, record.python_version))
                     
+                    summary = scanner.summary
+                    self.scan_finished.emit(summary)
                     if self.is_cancelled:
                         self.progress.emit(0, "扫描已取消")
                         self.finished.emit(False, "扫描已取消")
                     else:
-                        self.progress.emit(100, "扫描完成")
-                        self.finished.emit(True, str(sorted(venvs)))
+                        for root in venvs:
+                            self.root_progress.emit(root, 100)
+                        self._store_scan_results(venvs)
+                        message = (f"扫描完成，找到 {summary.count} 个虚拟环境，用时 {summary.duration:.2f} 秒，"
+                                   f"{summary.workers} 个线程")
+                        if summary.error_count:
+                            message += f"，{summary.error_count} 个目录无法读取"
+                        self.progress.emit(100, message)
+                        self.finished.emit(True, message)
                     
                 except Exception as e:
                     self.progress.emit(0, f"扫描出错: {str(e)}")
                     self.finished.emit(False, str(e))
                 finally:
                     self.is_scanning = False
+            elif self.operation == 'index':
+                # 增量更新跨环境包索引
+                self.is_scanning = True
+                self.is_cancelled = False
+                try:
+                    index = self.kwargs['index']
+                    self.progress.emit(0, "正在更新包索引...")
+
+                    def report(done, total):
+                        self.progress.emit(int(done * 100 / total), f"正在更新包索引... ({done}/{total})")
+
+                    stats = index.refresh(
+                        self.kwargs['venv_paths'],
+                        max_workers=self.config.snapshot().max_threads,
+                        progress=report,
+                        is_cancelled=lambda: self.is_cancelled
+                    )
+                    if self.is_cancelled:
+                        self.progress.emit(0, "索引更新已取消")
+                        self.finished.emit(False, "索引更新已取消")
+                    else:
+                        self.progress.emit(100, "索引更新完成")
+                        self.finished.emit(True, f"已索引 {stats['venvs']} 个环境、{stats['packages']} 个包"
+                                                 f"（重新读取 {stats['scanned']} 个环境，用时 {stats['elapsed']:.2f} 秒）")
+                finally:
+                    self.is_scanning = False
+            elif self.operation == 'outdated':
+                # 检查所有虚拟环境中可更新的包
+                self.is_scanning = True
+                self.is_cancelled = False
+                config = self.config.snapshot()
+                client = SimpleIndexClient(config.index_url, cache_ttl=config.index_cache_ttl,
+                                           max_workers=min(config.max_threads, 16))
+                try:
+                    self.progress.emit(0, "正在读取已安装的包...")
+                    venv_paths = self.kwargs['venv_paths']
+                    with ThreadPoolExecutor(max_workers=min(config.max_threads, max(1, len(venv_paths)))) as executor:
+                        inventories = dict(zip(
+                            venv_paths,
+                            executor.map(lambda p: list(iter_distributions(p)), venv_paths)
+                        ))
+
+                    def report(done, total):
+                        self.progress.emit(int(done * 100 / total), f"正在查询索引... ({done}/{total})")
+
+                    results, errors = check_outdated(inventories, client, progress=report,
+                                                     is_cancelled=lambda: self.is_cancelled)
+                    if self.is_cancelled:
+                        self.progress.emit(0, "检查已取消")
+                        self.finished.emit(False, "检查已取消")
+                    else:
+                        self.result_ready.emit((results, errors))
+                        count = sum(len(pkgs) for pkgs in results.values())
+                        self.progress.emit(100, "检查完成")
+                        self.finished.emit(True, f"共有 {count} 个包可以更新")
+                finally:
+                    client.close()
+                    self.is_scanning = False
+            elif self.operation == 'diff':
+                # 对比选中的虚拟环境
+                venv_paths = self.kwargs['venv_paths']
+                self.progress.emit(10, "正在读取包信息...")
+                diffs = diff_venvs(venv_paths, max_workers=self.config.snapshot().max_threads)
+                self.result_ready.emit(diffs)
+                self.progress.emit(100, "对比完成")
+                self.finished.emit(True, f"已对比 {len(diffs)} 组虚拟环境")
+            elif self.operation == 'export_all':
+                # 把所有虚拟环境导出到一个归档文件
+                self.is_scanning = True
+                self.is_cancelled = False
+                try:
+                    venv_paths = self.kwargs['venv_paths']
+                    dest = self.kwargs['dest']
+
+                    def report(done, total):
+                        self.progress.emit(int(done * 100 / total), f"正在导出... ({done}/{total})")
+
+                    self.progress.emit(0, "正在导出...")
+                    count, errors = export_all(venv_paths, dest, max_workers=self.config.snapshot().max_threads,
+                                               progress=report, is_cancelled=lambda: self.is_cancelled)
+                    if self.is_cancelled:
+                        self.progress.emit(0, "导出已取消")
+                        self.finished.emit(False, "导出已取消")
+                        return
+                    self.progress.emit(100, "导出完成")
+                    msg = f"已导出 {count} 个虚拟环境到 {dest}"
+                    if errors:
+                        msg += f"\n{len(errors)} 个环境导出失败:\n" + '\n'.join(
+                            f"{p}: {e}" for p, e in sorted(errors.items())[:10])
+                    self.finished.emit(True, msg)
+                finally:
+                    self.is_scanning = False
+            elif self.operation == 'inventory_export':
+                # 导出本机的环境清单（用于多主机合并）
+                self.is_scanning = True
+                self.is_cancelled = False
+                try:
+                    venv_paths = self.kwargs['venv_paths']
+                    dest = self.kwargs['dest']
+
+                    def report(done, total):
+                        self.progress.emit(int(done * 100 / total), f"正在导出清单... ({done}/{total})")
+
+                    self.progress.emit(0, "正在导出清单...")
+                    count, errors = export_inventory(venv_paths, dest,
+                                                     max_workers=self.config.snapshot().max_threads,
+                                                     progress=report, is_cancelled=lambda: self.is_cancelled)
+                    if self.is_cancelled:
+                        self.progress.emit(0, "导出已取消")
+                        self.finished.emit(False, "导出已取消")
+                        return
+                    self.progress.emit(100, "导出完成")
+                    msg = f"已导出 {count} 个虚拟环境的清单到 {dest}"
+                    if errors:
+                        msg += f"\n{len(errors)} 个环境读取失败:\n" + '\n'.join(
+                            f"{p}: {e}" for p, e in sorted(errors.items())[:10])
+                    self.finished.emit(True, msg)
+                finally:
+                    self.is_scanning = False
+            elif self.operation == 'inventory_merge':
+                # 把多台主机导出的清单合并到一个文件
+                sources = self.kwargs['sources']
+                dest = self.kwargs['dest']
+
+                def report(done, total):
+                    self.progress.emit(int(done * 100 / total), f"正在合并清单... ({done}/{total})")
+
+                self.progress.emit(0, "正在合并清单...")
+                stats = merge_inventories(sources, dest, progress=report)
+                self.progress.emit(100, "合并完成")
+                msg = (f"已合并 {stats['hosts']} 台主机，共 {stats['venvs']} 个虚拟环境、"
+                       f"{stats['packages']} 个不同的包")
+                if stats['skipped']:
+                    msg += f"\n{stats['skipped']} 台主机的清单比已有数据旧，已跳过"
+                self.finished.emit(True, msg)
+            elif self.operation == 'health':
+                # 并行检查所有虚拟环境
+                self.is_scanning = True
+                self.is_cancelled = False
+                try:
+                    venv_paths = self.kwargs['venv_paths']
+                    deep = self.kwargs.get('deep', False)
+
+                    def report(done, total, result):
+                        self.venv_checked.emit(result)
+                        self.progress.emit(int(done * 100 / total), f"正在检查... ({done}/{total})")
+
+                    self.progress.emit(0, "正在检查虚拟环境...")
+                    results = check_venvs(venv_paths, deep=deep, max_workers=self.config.snapshot().max_threads,
+                                          progress=report, is_cancelled=lambda: self.is_cancelled)
+                    if self.is_cancelled:
+                        self.progress.emit(0, "检查已取消")
+                        self.finished.emit(False, "检查已取消")
+                        return
+                    broken = sum(1 for r in results.values() if r.status == STATUS_BROKEN)
+                    warning = sum(1 for r in results.values() if r.status not in (STATUS_OK, STATUS_BROKEN))
+                    self.progress.emit(100, "检查完成")
+                    self.finished.emit(True, f"已检查 {len(results)} 个虚拟环境: "
+                                             f"{broken} 个损坏, {warning} 个有警告")
+                finally:
+                    self.is_scanning = False
             elif self.operation == 'batch_delete':
                 venv_names = self.kwargs['names']
-                total = len(venv_names)
+                archives = self.kwargs.get('archives', [])
+                total = len(venv_names) + len(archives)
                 
                 for i, name in enumerate(venv_names, 1):
                     try:
@@ -194,19 +399,141 @@ class VenvWorker(QThread):
                         self.progress.emit(progress, f"正在删除 {name}...")
                         self.venv_manager.delete_venv(name)
                     except Exception as e:
-                        logging.error(f"删除虚拟环境失败: {name}, 错误: {str(e)}")
-                        print(f"Warning: Failed to delete {name}: {str(e)}")
+                        logger.error(f"删除虚拟环境失败: {name}, 错误: {str(e)}")
+                # 已归档的环境只需删除归档文件
+                for archive in archives:
+                    try:
+                        delete_archive(archive)
+                    except Exception as e:
+                        logger.error(f"删除归档失败: {archive}, 错误: {str(e)}")
                 
                 self.progress.emit(100, "完成")
                 if total == 1:
-                    self.finished.emit(True, f"虚拟环境 {venv_names[0]} 删除成功")
+                    self.finished.emit(True, f"虚拟环境 {(venv_names or archives)[0]} 删除成功")
                 else:
                     self.finished.emit(True, f"{total} 个虚拟环境删除成功")
+            elif self.operation == 'move':
+                source = self.kwargs['source']
+                target = self.kwargs['target']
+                last = [-1]
+
+                def report(done, total):
+                    value = int(done * 100 / total) if total else 0
+                    if value != last[0]:
+                        last[0] = value
+                        self.progress.emit(value, "正在复制到其他磁盘...")
+
+                self.progress.emit(0, f"正在移动 {source}...")
+                result = move_venv(source, target, progress=report)
+                self.progress.emit(100, "完成")
+                msg = f"虚拟环境 {source} 已移动到 {result.path}"
+                if result.relocated.skipped:
+                    msg += ("\n\n以下文件包含原路径但无法改写，需要重新安装对应的包:\n"
+                            + '\n'.join(result.relocated.skipped))
+                self.finished.emit(True, msg)
+            elif self.operation == 'archive':
+                # 逐个归档，各环境内部按块并行压缩
+                config = self.config.snapshot()
+                venvs = self.kwargs['venvs']  # [(完整路径, 根目录, 相对路径)]
+                results = []
+                for i, (path, root, rel_path) in enumerate(venvs):
+                    last = [-1]
+
+                    def report(done, total, i=i, rel_path=rel_path, last=last):
+                        value = int((i + min(done / total, 1.0) if total else i) * 100 / len(venvs))
+                        if value != last[0]:
+                            last[0] = value
+                            self.progress.emit(value, f"正在归档 {rel_path}...")
+
+                    report(0, 0)
+                    results.append(archive_venv(path, root, rel_path,
+                                                dest_dir=archive_dir(config.archive_dir),
+                                                compression=config.archive_compression,
+                                                progress=report))
+                self.result_ready.emit(results)
+                self.progress.emit(100, "归档完成")
+                original = sum(info.size or 0 for info in results)
+                archived = sum(info.archive_size or 0 for info in results)
+                self.finished.emit(True, f"已归档 {len(results)} 个虚拟环境: "
+                                         f"{format_size(original)} → {format_size(archived)}")
+            elif self.operation == 'restore':
+                archive = self.kwargs['archive']
+                self.progress.emit(10, "正在恢复虚拟环境...")
+                result = restore_archive(archive, self.kwargs.get('target'))
+                self.result_ready.emit(result)
+                self.progress.emit(100, "恢复完成")
+                msg = f"虚拟环境已恢复到 {result.path}"
+                if result.relocated and result.relocated.skipped:
+                    msg += ("\n\n以下文件包含原路径但无法改写，需要重新安装对应的包:\n"
+                            + '\n'.join(result.relocated.skipped))
+                self.finished.emit(True, msg)
         except FileNotFoundError as e:
-            logging.exception(f"操作失败: {self.operation}, 未找到文件: {str(e)}")
+            logger.exception(f"操作失败: {self.operation}, 未找到文件: {str(e)}")
             self.progress.emit(0, f"错误: 未找到指定的文件，请检查Python路径是否正确")
             self.finished.emit(False, "未找到指定的文件")
         except Exception as e:
-            logging.exception(f"操作失败: {self.operation}")
+            logger.exception(f"操作失败: {self.operation}")
             self.progress.emit(0, f"错误: {str(e)}")
-            self.finished.emit(False, str(e))
\ No newline at end of file
+            self.finished.emit(False, str(e))
+
+
+class DetailsLoader(QObject):
+    """按需在后台读取虚拟环境附加信息（版本、大小、包数量、最近使用时间）
+
+    request 传入当前需要的记录（可见行及其附近），尚未开始的其他请求会被
+    取消，滚动列表时不会积压已经看不到的行。读取失败的记录在 clear_failed
+    （刷新列表）之前不再重试。
+    """
+    loaded = pyqtSignal(object, object)  # VenvRecord, VenvDetails
+
+    def __init__(self, max_workers=4, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='venv-details')
+        self._pending = {}  # {VenvRecord: Future}
+        self._failed = set()  # 读取失败的记录
+        self._lock = threading.Lock()
+
+    def request(self, records):
+        """替换待读取的记录集合（按传入顺序读取）"""
+        wanted = set(records)
+        with self._lock:
+            for record, future in list(self._pending.items()):
+                if record not in wanted and future.cancel():
+                    del self._pending[record]
+            for record in records:
+                if record not in self._pending and record not in self._failed:
+                    self._pending[record] = self._executor.submit(self._load, record)
+
+    def is_pending(self, record):
+        with self._lock:
+            return record in self._pending
+
+    def clear_failed(self):
+        """允许重新读取之前失败的记录"""
+        with self._lock:
+            self._failed.clear()
+
+    def _load(self, record):
+        try:
+            details = venv_details.load_details(record.full_path)
+        except Exception as e:
+            logger.warning(f"读取环境信息失败: {record.full_path}, 错误: {e}")
+            details = None
+        with self._lock:
+            self._pending.pop(record, None)
+            if details is None:
+                self._failed.add(record)
+            idle = not self._pending
+        if details is not None:
+            self.loaded.emit(record, details)
+        if idle:
+            venv_details.save_cache()
+
+    def shutdown(self):
+        """取消所有未开始的读取"""
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+        self._executor.shutdown(wait=False)
+        venv_details.save_cache()